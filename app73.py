@@ -1,37 +1,39 @@
 import streamlit as st
-import pandas as pd
-import requests
-import io
 
-@st.cache_data(ttl=3600)
-def load_data_from_url(url):
+from interlineal import metricas
+from interlineal.perezoso import LibroError, books_store
+from interlineal.presentacion import chapter_html
+
+@st.cache_resource
+def reader_store(books):
     """
-    Función para cargar los datos de un archivo CSV desde una URL pública de GitHub.
+    Los libros para todas las sesiones (ver interlineal.perezoso.books_store): cada libro se lee la primera
+    vez que se abre, desde el corpus local o desde su URL, y los libros vecinos se precargan en segundo plano.
+    Cuando cambian los CSV se reemplazan por otros que se vuelven a leer.
     """
+    return books_store(books)
+
+def get_book(books, book_name):
+    """(DataFrame, índice de capítulos) del libro, o None si no se pudo cargar (el motivo se muestra en la página)."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Lanza una excepción para errores HTTP
-
-        # Usa pandas para leer el archivo CSV directamente desde el contenido
-        text_content = response.content.decode('utf-8')
-        df = pd.read_csv(io.StringIO(text_content), sep=',')
-        
-        # Convierte las columnas a tipos de datos correctos
-        df['Capítulo'] = pd.to_numeric(df['Capítulo'], errors='coerce').fillna(0).astype(int)
-        df['Versículo'] = pd.to_numeric(df['Versículo'], errors='coerce').fillna(0).astype(int)
-
-        if df.empty:
-            st.error("Error: El archivo de texto está vacío o tiene un formato incorrecto.")
-            return None
-        return df
-
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error al cargar datos desde la URL: {e}")
-        return None
-    except Exception as e:
-        st.error(f"Ocurrió un error inesperado al procesar el archivo: {e}. Por favor, verifica el formato.")
+        return books[book_name]
+    except LibroError as e:
+        st.error(str(e))
         return None
 
+@st.cache_data(show_spinner=False)
+def render_chapter(book_name, chapter, font_size, version, _chapter_verses):
+    """
+    Arma el HTML del capítulo una sola vez por (libro, capítulo, tamaño de fuente, versión de los datos).
+    Las filas (_chapter_verses) no forman parte de la clave; la versión sí, para que se vean las correcciones.
+    """
+    metricas.count_miss("capitulo")
+    return chapter_html(
+        zip(_chapter_verses['Versículo'], _chapter_verses['texto_espanol'], _chapter_verses['texto_griego']),
+        font_size,
+        color="#000000",
+    )
+
 def main():
     """
     Función principal de la aplicación.
@@ -71,26 +73,18 @@ def main():
         "Judas": "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/Judas - Judas.csv",
         "Apocalipsis": "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/Apocalipsis - Apocalipsis.csv",
     }
-    # Carga todos los datos de los libros
-    all_books_data = {}
-    for book_name, url in BOOKS.items():
-        all_books_data[book_name] = load_data_from_url(url)
-    
-    # Maneja el caso en que la carga falle
-    if not all_books_data or any(data is None for data in all_books_data.values()):
-        return
+    # Los libros se cargan bajo demanda: solo se lee el libro que se abre (y sus vecinos, en segundo plano)
+    store = reader_store(BOOKS)
+    books = store.get()
 
     # Inicializa el estado de la sesión si no existe
     if 'selected_book' not in st.session_state:
         st.session_state.selected_book = list(BOOKS.keys())[0]
     if 'selected_chapter' not in st.session_state:
         # Obtiene el primer capítulo del primer libro por defecto
-        first_book_df = all_books_data[st.session_state.selected_book]
-        if not first_book_df.empty:
-            first_chapter = sorted(first_book_df['Capítulo'].unique())[0]
-            st.session_state.selected_chapter = first_chapter
-        else:
-            st.session_state.selected_chapter = 1
+        first_book = get_book(books, st.session_state.selected_book)
+        first_chapters = first_book[1].chapters(st.session_state.selected_book) if first_book is not None else ()
+        st.session_state.selected_chapter = first_chapters[0] if first_chapters else 1
     if 'font_size' not in st.session_state:
         st.session_state.font_size = 18
 
@@ -99,35 +93,38 @@ def main():
     if selected_book != st.session_state.selected_book:
         st.session_state.selected_book = selected_book
         # Reinicia el capítulo al cambiar de libro
-        new_book_df = all_books_data[selected_book]
-        if not new_book_df.empty:
-            first_chapter = sorted(new_book_df['Capítulo'].unique())[0]
-            st.session_state.selected_chapter = first_chapter
-        else:
-            st.session_state.selected_chapter = 1
+        new_book = get_book(books, selected_book)
+        new_chapters = new_book[1].chapters(selected_book) if new_book is not None else ()
+        st.session_state.selected_chapter = new_chapters[0] if new_chapters else 1
         st.rerun()
 
     # Obtiene los capítulos del libro seleccionado
-    df = all_books_data[st.session_state.selected_book]
-    chapters = sorted(df['Capítulo'].unique())
+    book_data = get_book(books, st.session_state.selected_book)
+
+    # Maneja el caso en que la carga falle
+    if book_data is None:
+        st.error("No se pudo cargar el libro seleccionado. Por favor, inténtalo de nuevo.")
+        return
+    df, chapter_index = book_data
+    chapters = chapter_index.chapters(st.session_state.selected_book)
     
     # Maneja la selección de capítulo desde el menú desplegable
-    try:
-        current_chapter_index = chapters.index(st.session_state.selected_chapter)
-    except ValueError:
+    current_chapter_index = chapter_index.position(st.session_state.selected_book, st.session_state.selected_chapter)
+    if current_chapter_index is None:
         # Si el capítulo guardado no existe en el nuevo libro, vuelve al primer capítulo
         current_chapter_index = 0
         st.session_state.selected_chapter = chapters[0]
+    previous_chapter, next_chapter = chapter_index.neighbours(st.session_state.selected_book, st.session_state.selected_chapter)
 
     # Botones de navegación de capítulos
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
-        if st.button("Capítulo Anterior", disabled=(current_chapter_index == 0)):
-            st.session_state.selected_chapter = chapters[current_chapter_index - 1]
+        if st.button("Capítulo Anterior", disabled=(previous_chapter is None)):
+            st.session_state.selected_chapter = previous_chapter
             st.rerun()
     with col2:
-        if st.button("Capítulo Siguiente", disabled=(current_chapter_index == len(chapters) - 1)):
-            st.session_state.selected_chapter = chapters[current_chapter_index + 1]
+        if st.button("Capítulo Siguiente", disabled=(next_chapter is None)):
+            st.session_state.selected_chapter = next_chapter
             st.rerun()
     with col3:
         # Control deslizante para el tamaño de la fuente
@@ -142,7 +139,7 @@ def main():
     selected_chapter = st.selectbox(
         "Selecciona un capítulo:",
         chapters,
-        index=chapters.index(st.session_state.selected_chapter)
+        index=current_chapter_index
     )
     if selected_chapter != st.session_state.selected_chapter:
         st.session_state.selected_chapter = selected_chapter
@@ -153,36 +150,29 @@ def main():
         st.markdown("---")
         st.subheader(f"{st.session_state.selected_book} {st.session_state.selected_chapter}")
 
-        # Filtra todas las filas del capítulo seleccionado
-        chapter_verses = df[df['Capítulo'] == st.session_state.selected_chapter]
+        # Obtiene las filas del capítulo seleccionado desde el índice
+        chapter_verses = df.iloc[chapter_index.rows(st.session_state.selected_book, st.session_state.selected_chapter)]
 
         if not chapter_verses.empty:
-            for index, row in chapter_verses.iterrows():
-                full_text = str(row['Texto'])
-                verse_number = row['Versículo']
-
-                spanish_text = ""
-                greek_text = ""
-                found_greek_start = False
-                for char in full_text:
-                    if '\u0370' <= char <= '\u03FF' or '\u1F00' <= char <= '\u1FFF':
-                        found_greek_start = True
-                    
-                    if not found_greek_start:
-                        spanish_text += char
-                    else:
-                        greek_text += char
-                
-                # Muestra cada versículo con el nuevo estilo y tamaño de fuente
-                st.markdown(f"**Versículo {verse_number}**")
-                if found_greek_start:
-                    st.markdown(f"<p style='color:#000000; font-size:{st.session_state.font_size}px;'>{spanish_text.strip()}</p>", unsafe_allow_html=True)
-                    st.markdown(f"<p style='color:#000000; font-size:{st.session_state.font_size}px;'><i>{greek_text.strip()}</i></p>", unsafe_allow_html=True)
-                else:
-                    st.warning("No se pudo separar el texto en español y griego. Verifica el formato del archivo.")
-            
+            # Todo el capítulo se envía como un solo bloque con el estilo y tamaño de fuente elegidos
+            with metricas.span("presentacion"):
+                metricas.count_lookup("capitulo")
+                chapter_block, missing_greek = render_chapter(
+                    st.session_state.selected_book,
+                    st.session_state.selected_chapter,
+                    f"{st.session_state.font_size}px",
+                    store.version,
+                    chapter_verses,
+                )
+                st.markdown(chapter_block, unsafe_allow_html=True)
+            if missing_greek:
+                st.warning(f"No se pudo separar el texto en español y griego en los versículos {', '.join(map(str, missing_greek))}. Verifica el formato del archivo.")
+
         else:
             st.warning("No se encontraron versículos en este capítulo. Por favor, revisa tu selección.")
 
 if __name__ == "__main__":
-    main()
+    # Tiempos por etapa y aciertos de las cachés; ver interlineal/metricas.py
+    metricas.configure()
+    with metricas.run("app73"):
+        main()
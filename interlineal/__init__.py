@@ -0,0 +1,16 @@
+"""
+Núcleo compartido del interlineal español-griego: datos, índices y búsqueda,
+sin dependencias de Streamlit para que lo usen todas las aplicaciones.
+"""
+
+from .archivo import ArchivoError
+from .division import split_series, split_text
+from .concordancia import Concordance, build_concordance, load_concordance
+from .corpus import Corpus, CorpusError, Versiculo, build_corpus, load_corpus
+from .fuente_txt import FuenteError, build_corpus_from_txt, compare_sources, read_interlinear_txt
+from .diccionario import DiccionarioError, Dictionary, build_dictionary, load_dictionary
+from .indice import TokenIndex, build_index, load_index
+from .libros import LIBROS, URL_BASE
+from .normalizacion import normalize_greek, normalize_term, tokenize
+from .subcadena import SubstringIndex, build_substring_index, load_substring_index
+from .tokens import Tokens, build_tokens, load_tokens
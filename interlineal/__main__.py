@@ -0,0 +1,8 @@
+"""
+Permite ejecutar la línea de órdenes con `python -m interlineal` (ver cli.py).
+"""
+
+from .cli import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
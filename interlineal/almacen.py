@@ -0,0 +1,167 @@
+"""
+Datos de solo lectura compartidos por todo el proceso.
+
+Las aplicaciones de Streamlit guardaban el DataFrame y el diccionario en cada sesión (o los
+obtenían de st.cache_data, que entrega una copia nueva en cada llamada), así que la memoria crecía
+con el número de usuarios. Un SharedStore guarda una sola instancia para todas las sesiones y, cuando
+cambia la versión de los datos, carga la nueva y la reemplaza de una sola vez: quien ya tenía la
+anterior la sigue usando hasta terminar y las sesiones nuevas ven la nueva. Con `update`, la nueva
+versión se arma a partir de la anterior (por ejemplo, cambiando solo los libros corregidos).
+Las consultas, las cargas y su duración se registran en las métricas (metricas.py).
+
+QueryCache guarda, también para todas las sesiones, los resultados de las consultas más repetidas,
+con un límite de entradas y de memoria.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from . import metricas
+from .corpus import DIRECTORIO_DATOS, sources_version
+
+
+def data_version(source_dir=DIRECTORIO_DATOS):
+    """Versión de los CSV incluidos, o None si no están (entonces los datos no se recargan)."""
+    try:
+        return sources_version(source_dir)
+    except FileNotFoundError:
+        return None
+
+
+def file_version(path):
+    """Versión de un archivo según su tamaño y fecha de modificación, o None si no existe."""
+    try:
+        estado = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{estado.st_size}-{estado.st_mtime_ns}"
+
+
+class SharedStore:
+    """
+    Datos compartidos que se cargan con `loader()` y se recargan cuando cambia `version()`.
+    La versión se consulta como mucho cada `check_interval` segundos; sin `version` los datos se
+    cargan una sola vez. Si `loader` devuelve None no se guarda nada y se vuelve a intentar después.
+    Si se pasa `update(datos)`, al cambiar la versión se llama con los datos actuales en lugar de
+    volver a cargarlos con `loader()`; debe devolver datos nuevos sin modificar los actuales.
+    Los datos se entregan tal cual a todas las sesiones, que no deben modificarlos.
+    Cada consulta cuenta en las métricas de la caché `name`, y cada carga o actualización como un
+    fallo, medido en la etapa "carga.<name>".
+
+    Los datos reemplazados no se cierran aquí: una sesión o una petición que los obtuvo antes de la
+    recarga puede seguir leyéndolos (sus mmap o su grupo de procesos), y cerrarlos le cortaría la
+    lectura a medias. El SharedStore solo suelta su referencia; cuando la última sesión termina con
+    ellos, el conteo de referencias los libera en ese momento, sin esperar al recolector de ciclos
+    (ninguno de los datos que se cargan tiene ciclos), y con ellos se cierran sus archivos y procesos.
+    """
+
+    def __init__(self, loader, version=None, check_interval=60.0, update=None, name="datos"):
+        self._loader = loader
+        self._update = update
+        self.name = name
+        self._version = version
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        # (versión, datos) se reemplaza entero, así que leerlo no necesita el candado
+        self._actual = None
+        self._revisado = 0.0
+
+    @property
+    def version(self):
+        return self._actual[0] if self._actual is not None else None
+
+    def get(self):
+        """Devuelve los datos actuales, cargándolos o recargándolos si hace falta."""
+        metricas.count_lookup(self.name)
+        actual = self._actual
+        if actual is not None and (self._version is None or
+                                   time.monotonic() - self._revisado < self._check_interval):
+            return actual[1]
+
+        with self._lock:
+            # Otra sesión pudo haber cargado o revisado mientras se esperaba el candado
+            actual = self._actual
+            ahora = time.monotonic()
+            if actual is not None and (self._version is None or ahora - self._revisado < self._check_interval):
+                return actual[1]
+
+            version = self._version() if self._version is not None else None
+            self._revisado = ahora
+            if actual is not None and actual[0] == version:
+                return actual[1]
+
+            metricas.count_miss(self.name)
+            with metricas.span(f"carga.{self.name}"):
+                if actual is not None and self._update is not None:
+                    datos = self._update(actual[1])
+                else:
+                    datos = self._loader()
+            if datos is None:
+                return actual[1] if actual is not None else None
+            self._actual = (version, datos)
+            return datos
+
+
+def _size(objeto):
+    """Tamaño aproximado en bytes de un valor y, si es una tupla, de sus elementos."""
+    if isinstance(objeto, tuple):
+        return sys.getsizeof(objeto) + sum(_size(elemento) for elemento in objeto)
+    return sys.getsizeof(objeto)
+
+
+class QueryCache:
+    """
+    Caché LRU de resultados compartida por todas las sesiones, limitada a `max_entries` entradas y a
+    unos `max_bytes` bytes (el tamaño de claves y valores según sys.getsizeof, así que conviene
+    guardar valores compactos, como un array de identificadores). Al pasar un límite se descartan
+    los resultados usados hace más tiempo; un resultado más grande que `max_bytes` no se guarda.
+    La versión de los datos debe formar parte de la clave, y los valores no deben modificarse.
+    Las consultas y los fallos se registran en las métricas de la caché `name`.
+    """
+
+    def __init__(self, max_bytes=32 * 2**20, max_entries=4096, name="consultas"):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        # clave -> (valor, tamaño), de la usada hace más tiempo a la más reciente
+        self._entradas = OrderedDict()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def get(self, key, compute):
+        """Devuelve el resultado guardado para `key` o, si no está, lo calcula con `compute()` y lo guarda."""
+        metricas.count_lookup(self.name)
+        with self._lock:
+            entrada = self._entradas.get(key)
+            if entrada is not None:
+                self._entradas.move_to_end(key)
+                return entrada[0]
+
+        # Se calcula fuera del candado: las demás consultas no esperan a esta
+        metricas.count_miss(self.name)
+        valor = compute()
+        tamano = _size(key) + _size(valor)
+        if tamano > self.max_bytes:
+            return valor
+
+        with self._lock:
+            anterior = self._entradas.pop(key, None)
+            if anterior is not None:
+                self.nbytes -= anterior[1]
+            self._entradas[key] = (valor, tamano)
+            self.nbytes += tamano
+            while self.nbytes > self.max_bytes or len(self._entradas) > self.max_entries:
+                _, (_, descartado) = self._entradas.popitem(last=False)
+                self.nbytes -= descartado
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self.nbytes = 0
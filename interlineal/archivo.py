@@ -0,0 +1,93 @@
+"""
+Archivos binarios por secciones, compartidos por el corpus y los índices.
+
+    cabecera   magia (8 bytes), formato, longitud de los metadatos (uint32)
+    metadatos  JSON en UTF-8; "secciones" indica la posición, longitud y tipo de cada sección
+    secciones  arrays alineados a 8 bytes, en el orden de bytes de la máquina que los escribió
+
+Las secciones se leen con mmap como memoryview, sin copiar los datos.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+CABECERA = struct.Struct("<8sII")
+
+
+class ArchivoError(Exception):
+    """El archivo no existe, está dañado o tiene un formato distinto."""
+
+
+def write_sections(path, magia, formato, meta, secciones):
+    """
+    Escribe el archivo de forma atómica.
+    `secciones` es una lista de (nombre, array.array o bytes); para los bytes el tipo es 'B'.
+    """
+    meta = dict(meta, orden=sys.byteorder, secciones={})
+    posicion = 0
+    for nombre, datos in secciones:
+        posicion += -posicion % 8
+        tipo = getattr(datos, "typecode", "B")
+        longitud = len(datos) * getattr(datos, "itemsize", 1)
+        meta["secciones"][nombre] = [posicion, longitud, tipo]
+        posicion += longitud
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+
+    # Un temporal por proceso e hilo: dos sesiones pueden reconstruir el mismo archivo a la vez
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CABECERA.pack(magia, formato, len(meta_bytes)))
+        f.write(meta_bytes)
+        for nombre, datos in secciones:
+            f.write(b"\x00" * (-f.tell() % 8))
+            f.write(datos)
+    os.replace(tmp_path, path)
+
+
+class SectionFile:
+    """Archivo por secciones abierto con mmap; `meta` y `secciones` quedan disponibles."""
+
+    def __init__(self, path, magia, formato):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError as e:
+            raise ArchivoError(f"No existe el archivo: {path}") from e
+        except ValueError as e:
+            raise ArchivoError(f"El archivo está vacío: {path}") from e
+
+        try:
+            leida, version_formato, meta_len = CABECERA.unpack_from(self._mm, 0)
+            if leida != magia or version_formato != formato:
+                raise ArchivoError(f"Formato no compatible: {path}")
+            meta = json.loads(self._mm[CABECERA.size:CABECERA.size + meta_len].decode("utf-8"))
+            if meta["orden"] != sys.byteorder:
+                raise ArchivoError(f"El archivo se escribió con otro orden de bytes: {path}")
+        except (struct.error, ValueError, KeyError) as e:
+            self._mm.close()
+            raise ArchivoError(f"El archivo está dañado: {path}") from e
+        except ArchivoError:
+            self._mm.close()
+            raise
+
+        self.meta = meta
+        base = CABECERA.size + meta_len
+        base += -base % 8
+        vista = memoryview(self._mm)
+        self.secciones = {}
+        for nombre, (posicion, longitud, tipo) in meta["secciones"].items():
+            seccion = vista[base + posicion:base + posicion + longitud]
+            self.secciones[nombre] = seccion.cast(tipo) if tipo != "B" else seccion
+        vista.release()
+
+    def close(self):
+        """Libera las vistas y cierra el mmap."""
+        for seccion in self.secciones.values():
+            seccion.release()
+        self.secciones = {}
+        self._mm.close()
@@ -0,0 +1,154 @@
+"""
+Búsqueda de concordancias sobre el corpus, sin Streamlit ni pandas.
+
+Es la misma búsqueda de lecturaybuscadorPRO.py: el término se normaliza (sin acentos y en
+minúsculas) y se busca en el texto en español y en el griego según el modo:
+
+    secuencia  cualquier secuencia de letras (índice de subcadenas)
+    palabra    palabra completa (índice de palabras)
+    prefijo    comienzo de palabra (índice de palabras)
+    regex      expresión regular de Python sobre el texto normalizado (sin índice)
+    consulta   combinación de términos con AND, OR, NOT, frases y ámbitos (ver consulta.py)
+
+Sin índices se recorren las columnas normalizadas del corpus, con el mismo resultado. Las búsquedas
+que recorren el corpus se pueden repartir por libros entre varios procesos (ver paralelo.py).
+Las ocurrencias tienen los campos de CAMPOS_CONCORDANCIA y las de search, además, los fragmentos
+de cada texto que coinciden con la búsqueda ("Coincidencias"), para resaltarlos. Se exportan con
+iter_csv, iter_json (resultados.py) o iter_concordance_txt.
+"""
+
+import re
+
+from .corpus import CAMPOS_NORMALIZADOS
+from .normalizacion import normalize_term, strip_accents, tokenize
+from .resultados import Occurrences
+
+MODOS = ("secuencia", "palabra", "prefijo", "regex", "consulta")
+
+CAMPOS_CONCORDANCIA = ("Libro", "Capítulo", "Versículo", "Texto_Español", "Texto_Griego")
+
+CAMPOS = ("texto_espanol", "texto_griego")
+
+# Campo del corpus -> texto de la ocurrencia
+CAMPOS_OCURRENCIA = {"texto_espanol": "Texto_Español", "texto_griego": "Texto_Griego"}
+
+
+def compile_pattern(term):
+    """Expresión regular del modo regex: sin distinguir mayúsculas y sin los acentos del patrón."""
+    try:
+        return re.compile(strip_accents(term), re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Expresión regular no válida: {e}") from e
+
+
+def word_pattern(words, prefix=False):
+    """
+    Expresión regular de una palabra o una frase (`words`, ya normalizadas) sobre el texto normalizado,
+    con el mismo resultado que el índice de palabras: entre dos palabras consecutivas solo hay caracteres
+    que no son de palabra (espacios o signos). Con `prefix`, la última puede ser solo el comienzo de una palabra.
+    """
+    return re.compile(r"\b" + r"\W+".join(map(re.escape, words)) + ("" if prefix else r"\b"))
+
+
+def matcher(term, modo):
+    """
+    Función que dice si un texto normalizado contiene `term` según el modo. Una expresión regular
+    se aplica sin distinguir mayúsculas y sin los acentos del patrón; si no es válida se lanza ValueError.
+    """
+    if modo not in MODOS or modo == "consulta":
+        # Una consulta abarca los dos campos a la vez: se evalúa con consulta.compile_query
+        raise ValueError(f"Modo de búsqueda desconocido: {modo}")
+    if modo == "secuencia":
+        normalizado = normalize_term(term)
+        return lambda text: normalizado in text
+    if modo == "regex":
+        regex = compile_pattern(term)
+    else:
+        words = tokenize(term)
+        if not words:
+            # Como en el índice: un término sin palabras no coincide con nada
+            return lambda text: False
+        regex = word_pattern(words, prefix=(modo == "prefijo"))
+    return lambda text: regex.search(text) is not None
+
+
+def scan(corpus, term, modo, start=0, stop=None, campos=CAMPOS):
+    """Versículos de [start, stop) que contienen `term` en `campos`, recorriendo las columnas normalizadas del corpus."""
+    coincide = matcher(term, modo)
+    verse_ids = set()
+    for campo in campos:
+        verse_ids.update(i for i, text in enumerate(corpus.column(CAMPOS_NORMALIZADOS[campo], start, stop), start)
+                         if coincide(text))
+    return sorted(verse_ids)
+
+
+def find_verses(term, modo="secuencia", index=None, substring_index=None, corpus=None, executor=None, books=None):
+    """
+    Versículos (identificadores del corpus, en orden canónico) que contienen `term` en español o
+    en griego. Usa el índice que corresponde al modo si se pasa; si no, recorre el corpus, repartido
+    entre los procesos de `executor` (un ParallelSearch) si se pasa o en este proceso con `corpus`.
+    `books` solo se usa al recorrer el corpus con `executor`, para no recorrer los demás libros.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de búsqueda desconocido: {modo}")
+    if modo == "consulta":
+        # consulta.py usa matcher de este módulo
+        from .consulta import compile_query
+
+        return compile_query(term).find(index, substring_index, corpus, executor, books)
+    if modo in ("palabra", "prefijo") and index is not None:
+        return index.find(term, prefix=(modo == "prefijo"))
+    if modo == "secuencia" and substring_index is not None:
+        return sorted(set().union(*(substring_index.search(campo, term) for campo in CAMPOS)))
+    if executor is not None:
+        return executor.find(term, modo, books)
+    if corpus is None:
+        raise ValueError("Sin índice para el modo de búsqueda hace falta el corpus")
+    return scan(corpus, term, modo)
+
+
+def build_occurrences(corpus, ids, query=None):
+    """
+    Ocurrencias (diccionarios con CAMPOS_CONCORDANCIA) de los versículos `ids` del corpus. Con `query`
+    (una consulta.Query) llevan además "Coincidencias": para cada texto, la lista de fragmentos
+    (inicio, fin) que cumplen la búsqueda, en caracteres del texto de la ocurrencia.
+    """
+    ocurrencias = []
+    for i in ids:
+        occ = {
+            "Libro": corpus.libro(i),
+            "Capítulo": corpus.capitulos[i],
+            "Versículo": corpus.versiculos[i],
+            "Texto_Español": corpus.texto_espanol(i).strip(),
+            "Texto_Griego": corpus.texto_griego(i).strip(),
+        }
+        if query is not None:
+            textos = {campo: occ[clave] for campo, clave in CAMPOS_OCURRENCIA.items()}
+            fragmentos = query.highlights(lambda campo: corpus.normalized(campo, i), textos.get)
+            occ["Coincidencias"] = {clave: fragmentos[campo] for campo, clave in CAMPOS_OCURRENCIA.items()}
+        ocurrencias.append(occ)
+    return ocurrencias
+
+
+def search(corpus, term, modo="secuencia", index=None, substring_index=None, books=None, executor=None):
+    """
+    Busca `term` y devuelve un Occurrences perezoso. `books` limita la búsqueda a esos libros
+    (por defecto, todos). Con `executor` (un ParallelSearch) las búsquedas sin índice se reparten por libros.
+    Las ocurrencias llevan sus coincidencias (ver build_occurrences).
+    """
+    from .consulta import term_query
+
+    verse_ids = find_verses(term, modo, index, substring_index, corpus, executor, books)
+    if books:
+        libro_ids = {corpus.libros.index(book) for book in books}
+        verse_ids = [i for i in verse_ids if corpus.libro_ids[i] in libro_ids]
+    query = term_query(term, modo)
+    return Occurrences(verse_ids, lambda ids: build_occurrences(corpus, ids, query))
+
+
+def iter_concordance_txt(occurrences):
+    """Genera el TXT de la concordancia ocurrencia por ocurrencia."""
+    for occ in occurrences:
+        yield (f"{occ['Libro']} {occ['Capítulo']}:{occ['Versículo']}\n"
+               f"  {occ['Texto_Español']}\n"
+               f"  {occ['Texto_Griego']}\n\n")
@@ -0,0 +1,70 @@
+"""
+Índice de capítulos: (libro, capítulo) -> filas de sus versículos.
+
+Se construye una sola vez a partir de las columnas de libro y capítulo, en el orden de las filas.
+Después la lista de capítulos de un libro, las filas de un capítulo y los capítulos anterior y
+siguiente se obtienen con búsquedas en diccionarios, sin volver a filtrar el DataFrame.
+"""
+
+
+class ChapterIndex:
+    """
+    Índice de capítulos sobre filas ordenadas.
+    `rows(libro, capítulo)` devuelve un slice (o una lista de posiciones si el capítulo no está en
+    filas consecutivas) apto para DataFrame.iloc.
+    """
+
+    def __init__(self, book_values, chapter_values):
+        posiciones = {}
+        for fila, clave in enumerate(zip(book_values, chapter_values)):
+            posiciones.setdefault(clave, []).append(fila)
+
+        self._rows = {}
+        capitulos = {}
+        for (libro, capitulo), filas in posiciones.items():
+            if filas[-1] - filas[0] + 1 == len(filas):
+                self._rows[(libro, capitulo)] = slice(filas[0], filas[-1] + 1)
+            else:
+                self._rows[(libro, capitulo)] = filas
+            capitulos.setdefault(libro, []).append(int(capitulo))
+
+        # Libros en el orden en que aparecen y capítulos ordenados, con su posición en la lista
+        self.libros = tuple(capitulos)
+        self._chapters = {libro: tuple(sorted(lista)) for libro, lista in capitulos.items()}
+        self._positions = {
+            libro: {capitulo: i for i, capitulo in enumerate(lista)}
+            for libro, lista in self._chapters.items()
+        }
+
+    @classmethod
+    def from_frame(cls, df, book_name=None):
+        """Índice de un DataFrame; con `book_name` todas las filas se tratan como de ese libro."""
+        books = [book_name] * len(df) if book_name is not None else df['Libro'].tolist()
+        return cls(books, df['Capítulo'].tolist())
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """Índice de las filas del corpus binario (las mismas que las de corpus.to_dataframe())."""
+        return cls((corpus.libros[b] for b in corpus.libro_ids), corpus.capitulos)
+
+    def chapters(self, book_name):
+        """Capítulos del libro, ordenados."""
+        return self._chapters.get(book_name, ())
+
+    def position(self, book_name, chapter):
+        """Posición del capítulo en chapters(libro), o None si el libro no lo tiene."""
+        return self._positions.get(book_name, {}).get(chapter)
+
+    def rows(self, book_name, chapter):
+        """Filas de los versículos del capítulo (slice vacío si no existe)."""
+        return self._rows.get((book_name, chapter), slice(0, 0))
+
+    def neighbours(self, book_name, chapter):
+        """Capítulos anterior y siguiente del mismo libro (None en los extremos)."""
+        posicion = self.position(book_name, chapter)
+        if posicion is None:
+            return None, None
+        capitulos = self._chapters[book_name]
+        anterior = capitulos[posicion - 1] if posicion > 0 else None
+        siguiente = capitulos[posicion + 1] if posicion + 1 < len(capitulos) else None
+        return anterior, siguiente
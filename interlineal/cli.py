@@ -0,0 +1,210 @@
+"""
+Línea de órdenes del paquete (python -m interlineal), sin Streamlit.
+
+    construir   construye el corpus (la orden por defecto; ver corpus.main)
+    buscar      ejecuta las consultas de un archivo y escribe sus ocurrencias
+    servir      atiende la API JSON local (ver servidor.py)
+    medir       mide los caminos críticos y compara con mediciones anteriores (ver rendimiento.py)
+
+`buscar` abre el corpus y los índices una sola vez en cada proceso (con mmap, así que los procesos
+comparten las mismas páginas) y reparte las consultas entre un grupo de procesos. Las ocurrencias
+se escriben a medida que termina cada consulta, en el orden del archivo, como JSONL, CSV o TXT.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from . import corpus as corpus_cli
+from .busqueda import CAMPOS_CONCORDANCIA, MODOS, iter_concordance_txt, matcher, search
+from .consulta import compile_query
+from .corpus import DIRECTORIO_DATOS, Corpus, load_corpus
+from .indice import TokenIndex, load_index
+from .resultados import iter_csv
+from .subcadena import SubstringIndex, load_substring_index
+
+FORMATOS = ("jsonl", "csv", "txt")
+
+CAMPOS_SALIDA = ("Consulta", "Modo") + CAMPOS_CONCORDANCIA
+
+# Corpus e índices abiertos en cada proceso del grupo
+_datos = None
+
+
+def read_queries(lines, modo):
+    """
+    Consultas de un archivo: una por línea, opcionalmente con su modo tras un tabulador
+    ("término\\tpalabra"). Se ignoran las líneas vacías y las que empiezan por #. Las expresiones
+    regulares y las consultas no válidas se detectan aquí, antes de empezar a buscar.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        term, _, modo_linea = line.partition("\t")
+        modo_linea = modo_linea.strip() or modo
+        if modo_linea not in MODOS:
+            raise ValueError(f"Modo de búsqueda desconocido en la consulta {term!r}: {modo_linea}")
+        term = term.strip()
+        if modo_linea == "regex":
+            matcher(term, modo_linea)
+        elif modo_linea == "consulta":
+            compile_query(term)
+        yield term, modo_linea
+
+
+def _open_data(rutas):
+    global _datos
+    corpus_path, index_path, substring_path, books = rutas
+    _datos = (Corpus(corpus_path), TokenIndex(index_path), SubstringIndex(substring_path), books)
+
+
+def _run_query(consulta):
+    term, modo = consulta
+    corpus, index, substring_index, books = _datos
+    return term, modo, list(search(corpus, term, modo, index, substring_index, books))
+
+
+def _rows(resultados):
+    for term, modo, occurrences in resultados:
+        for occ in occurrences:
+            yield {"Consulta": term, "Modo": modo, **occ}
+
+
+def _iter_jsonl(resultados):
+    for row in _rows(resultados):
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def _iter_txt(resultados):
+    for term, modo, occurrences in resultados:
+        yield f"== {term} ({modo}): {len(occurrences)} ocurrencias ==\n\n"
+        yield from iter_concordance_txt(occurrences)
+
+
+def run_queries(consultas, rutas, procesos=None):
+    """
+    Ejecuta las consultas (pares (término, modo)) y genera (término, modo, ocurrencias) en el mismo
+    orden. Con más de un proceso se reparten entre un grupo de procesos; cada uno abre los datos una vez.
+    """
+    if procesos == 1:
+        _open_data(rutas)
+        yield from map(_run_query, consultas)
+        return
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_open_data, initargs=(rutas,)) as executor:
+        yield from executor.map(_run_query, consultas, chunksize=8)
+
+
+def _prepare(source_dir, books):
+    """Construye o actualiza el corpus y sus índices en este proceso y devuelve sus rutas."""
+    with load_corpus(source_dir=source_dir) as corpus:
+        desconocidos = [book for book in books if book not in corpus.libros]
+        if desconocidos:
+            raise ValueError(f"Libros desconocidos: {', '.join(desconocidos)}")
+        index = load_index(corpus)
+        substring_index = load_substring_index(corpus)
+        rutas = (corpus.path, index.path, substring_index.path, tuple(books))
+        index.close()
+        substring_index.close()
+    return rutas
+
+
+def search_main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m interlineal buscar",
+        description="Ejecuta las consultas de un archivo (una por línea) y escribe sus ocurrencias.",
+    )
+    parser.add_argument("consultas", help="Archivo con las consultas, o - para la entrada estándar.")
+    parser.add_argument("--modo", choices=MODOS, default="secuencia",
+                        help="Modo de las consultas que no lo indican (por defecto, secuencia).")
+    parser.add_argument("--libro", action="append", default=[], dest="libros",
+                        help="Limita la búsqueda a este libro (se puede repetir).")
+    parser.add_argument("--formato", choices=FORMATOS, default="jsonl", help="Formato de salida (por defecto, jsonl).")
+    parser.add_argument("--salida", default="-", help="Archivo de salida (por defecto, la salida estándar).")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos de búsqueda (por defecto, uno por CPU; 1 para no crear procesos).")
+    parser.add_argument("--datos", default=DIRECTORIO_DATOS, help="Directorio con los CSV de los libros.")
+    args = parser.parse_args(argv)
+
+    try:
+        rutas = _prepare(args.datos, args.libros)
+        if args.consultas == "-":
+            consultas = list(read_queries(sys.stdin, args.modo))
+        else:
+            with open(args.consultas, encoding="utf-8") as f:
+                consultas = list(read_queries(f, args.modo))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    totales = []
+
+    def contadas(resultados):
+        for resultado in resultados:
+            totales.append(len(resultado[2]))
+            yield resultado
+
+    resultados = contadas(run_queries(consultas, rutas, args.procesos))
+    if args.formato == "jsonl":
+        chunks = _iter_jsonl(resultados)
+    elif args.formato == "csv":
+        chunks = iter_csv(_rows(resultados), CAMPOS_SALIDA)
+    else:
+        chunks = _iter_txt(resultados)
+
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8", newline="")
+    try:
+        for chunk in chunks:
+            salida.write(chunk)
+    except BrokenPipeError:
+        # La salida se cerró antes de tiempo (por ejemplo, con head): no es un error. Python vacía stdout
+        # al terminar y volvería a fallar, así que se redirige a /dev/null; stderr sigue disponible
+        if salida is sys.stdout:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    print(f"{len(totales)} consultas, {sum(totales)} ocurrencias", file=sys.stderr)
+    return 0
+
+
+def _benchmark_main(argv):
+    from .rendimiento import main as benchmark_main
+
+    return benchmark_main(argv)
+
+
+def serve_main(argv=None):
+    from .servidor import serve
+
+    parser = argparse.ArgumentParser(prog="python -m interlineal servir",
+                                     description="Atiende la API JSON del lector y la búsqueda.")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escuchar (por defecto, 127.0.0.1).")
+    parser.add_argument("--puerto", type=int, default=8000, help="Puerto (por defecto, 8000).")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos para las búsquedas sin índice (por defecto, uno por CPU; 1 para no crear procesos).")
+    parser.add_argument("--datos", default=DIRECTORIO_DATOS, help="Directorio con los CSV de los libros.")
+    args = parser.parse_args(argv)
+    serve(args.host, args.puerto, args.datos, args.procesos)
+    return 0
+
+
+ORDENES = {
+    "construir": corpus_cli.main,
+    "buscar": search_main,
+    "servir": serve_main,
+    "medir": _benchmark_main,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in ORDENES:
+        return ORDENES[argv[0]](argv[1:])
+    if argv and argv[0] in ("-h", "--help"):
+        print(__doc__.strip())
+        return 0
+    # Sin orden se construye el corpus, como antes
+    return corpus_cli.main(argv)
@@ -0,0 +1,125 @@
+"""
+El corpus combinado en formato columnar de Arrow, para abrirlo como DataFrame sin copiar los textos.
+
+corpus.to_dataframe() decodifica cada texto en un str de Python y repite el nombre del libro en
+cada fila, en cada proceso. Aquí se escribe una vez por versión del corpus un archivo Feather
+(Arrow IPC sin comprimir) con las mismas columnas:
+
+    Libro                   categoría: códigos int16 sobre la tabla de libros
+    Capítulo, Versículo     uint16
+    Texto, texto_espanol, texto_griego, espanol_normalizado, griego_normalizado
+                            cadenas de Arrow
+
+Las columnas se arman directamente con los buffers del corpus binario (sus offsets y bytes UTF-8
+ya tienen el formato de Arrow), así que escribir el archivo no decodifica ningún texto. Al abrirlo
+con memory map, las columnas de texto del DataFrame quedan respaldadas por las páginas del archivo:
+no se copian y todos los procesos de la máquina comparten las mismas páginas de la caché del sistema.
+write_parquet exporta la misma tabla en Parquet, comprimida, para otras herramientas.
+
+Requiere pyarrow (que Streamlit ya instala); sin él, load_dataframe lanza ImportError y las
+aplicaciones usan corpus.to_dataframe().
+"""
+
+import json
+import os
+import threading
+
+from .corpus import CAMPOS_TEXTO
+
+FORMATO = 1
+ARCHIVO_COLUMNAS = "corpus_nt.arrow"
+
+# Nombre de cada campo de texto del corpus en el DataFrame
+COLUMNAS_TEXTO = {campo: "Texto" if campo == "texto" else campo for campo in CAMPOS_TEXTO}
+
+_CLAVE_VERSION = b"interlineal.version"
+_CLAVE_LIBROS = b"interlineal.libros"
+
+
+def _version(corpus):
+    return f"{FORMATO}:{corpus.version}"
+
+
+def corpus_table(corpus):
+    """
+    Tabla de Arrow con las columnas de to_dataframe(), armada sobre los buffers del corpus (sin copiarlos):
+    solo es válida mientras el corpus esté abierto.
+    """
+    import pyarrow as pa
+
+    n = len(corpus)
+    secciones = corpus._secciones
+    columnas = {
+        # Los códigos de libro son pequeños: el uint16 del corpus se lee como int16
+        "Libro": pa.DictionaryArray.from_arrays(
+            pa.Array.from_buffers(pa.int16(), n, [None, pa.py_buffer(secciones["libro"])]),
+            pa.array(corpus.libros, pa.string()),
+        ),
+        "Capítulo": pa.Array.from_buffers(pa.uint16(), n, [None, pa.py_buffer(secciones["capitulo"])]),
+        "Versículo": pa.Array.from_buffers(pa.uint16(), n, [None, pa.py_buffer(secciones["versiculo"])]),
+    }
+    for campo, columna in COLUMNAS_TEXTO.items():
+        # Offsets uint32 del corpus = offsets int32 de Arrow mientras cada campo ocupe menos de 2 GiB
+        columnas[columna] = pa.Array.from_buffers(pa.string(), n, [
+            None, pa.py_buffer(secciones[f"{campo}.offsets"]), pa.py_buffer(secciones[campo]),
+        ])
+    return pa.table(columnas).replace_schema_metadata({
+        _CLAVE_VERSION: _version(corpus).encode("utf-8"),
+        _CLAVE_LIBROS: json.dumps(corpus.tabla_libros, ensure_ascii=False).encode("utf-8"),
+    })
+
+
+def build_columnar(corpus, path):
+    """Escribe el archivo Feather del corpus de forma atómica."""
+    import pyarrow as pa
+
+    table = corpus_table(corpus)
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_parquet(corpus, path, compression="zstd"):
+    """Exporta el corpus a Parquet (comprimido; para leerlo hay que descomprimirlo, no se abre con mmap)."""
+    import pyarrow.parquet as pq
+
+    pq.write_table(corpus_table(corpus), path, compression=compression)
+    return path
+
+
+def read_dataframe(path, version=None):
+    """
+    Abre el archivo con memory map y devuelve el DataFrame, o None si no existe, no es válido o
+    (si se pasa `version`) corresponde a otra versión del corpus.
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    meta = table.schema.metadata or {}
+    if version is not None and meta.get(_CLAVE_VERSION) != version.encode("utf-8"):
+        return None
+
+    # split_blocks evita juntar las columnas numéricas en un bloque nuevo; los textos quedan en el mmap
+    df = table.to_pandas(split_blocks=True)
+    if _CLAVE_LIBROS in meta:
+        # Igual que to_dataframe(): permite a Corpus.update_dataframe saber qué libros cambiaron
+        df.attrs["libros"] = json.loads(meta[_CLAVE_LIBROS])
+    return df
+
+
+def load_dataframe(corpus, path=None):
+    """
+    El DataFrame completo del corpus, abierto con memory map desde el archivo Feather, que se
+    (re)escribe si falta o si cambió el corpus. Lanza ImportError si pyarrow no está instalado.
+    """
+    path = path or os.path.join(os.path.dirname(corpus.path), ARCHIVO_COLUMNAS)
+    df = read_dataframe(path, _version(corpus))
+    if df is None:
+        build_columnar(corpus, path)
+        df = read_dataframe(path, _version(corpus))
+    return df
@@ -0,0 +1,121 @@
+"""
+Concordancia entre las palabras griegas del corpus y las entradas del diccionario.
+
+Al construirla se cruzan, una sola vez, las claves del diccionario (palabra y formas) con los
+términos griegos del índice de palabras. Se guardan en los dos sentidos:
+
+    entradas    para cada entrada, sus apariciones (versículo, posición) ordenadas
+    versiculos  para cada versículo, sus palabras enlazadas (posición, entrada) ordenadas
+    frecuencias apariciones de cada entrada en cada libro
+
+Los dos sentidos salen de la misma tabla, así que partir de una palabra o de un versículo da la
+misma respuesta, y ninguna consulta recorre el corpus. Se reconstruye cuando cambia la versión
+del corpus o la del diccionario.
+"""
+
+import array
+import os
+
+from .archivo import ArchivoError, SectionFile, write_sections
+
+MAGIA = b"NTCONCOR"
+FORMATO = 1
+ARCHIVO_CONCORDANCIA = "concordancia_nt.bin"
+
+CAMPO = "texto_griego"
+
+
+def _version(corpus, dictionary):
+    return f"{corpus.version}:{dictionary.version}"
+
+
+def build_concordance(corpus, index, dictionary, path):
+    """Construye la concordancia de `corpus` con `dictionary` a partir de su índice de palabras."""
+    apariciones = [set() for _ in range(len(dictionary))]
+    for clave, entry_id in dictionary.keys():
+        pares = index.postings(CAMPO, clave)
+        apariciones[entry_id].update(zip(pares[::2], pares[1::2]))
+
+    libros = len(corpus.libros)
+    offsets = array.array("I", [0])
+    postings = array.array("I")
+    frecuencias = array.array("I", bytes(4 * libros * len(apariciones)))
+    enlaces = {}
+    for entry_id, pares in enumerate(apariciones):
+        for verse_id, position in sorted(pares):
+            postings.append(verse_id)
+            postings.append(position)
+            frecuencias[entry_id * libros + corpus.libro_ids[verse_id]] += 1
+            enlaces.setdefault(verse_id, []).append((position, entry_id))
+        offsets.append(len(postings) // 2)
+
+    verse_offsets = array.array("I", [0])
+    verse_links = array.array("I")
+    for verse_id in range(len(corpus)):
+        for position, entry_id in sorted(enlaces.get(verse_id, ())):
+            verse_links.append(position)
+            verse_links.append(entry_id)
+        verse_offsets.append(len(verse_links) // 2)
+
+    secciones = [
+        ("entradas.offsets", offsets),
+        ("entradas.postings", postings),
+        ("versiculos.offsets", verse_offsets),
+        ("versiculos.enlaces", verse_links),
+        ("frecuencias", frecuencias),
+    ]
+    meta = {"version": _version(corpus, dictionary), "libros": list(corpus.libros)}
+    write_sections(path, MAGIA, FORMATO, meta, secciones)
+    return path
+
+
+class Concordance:
+    """Concordancia abierta con mmap."""
+
+    def __init__(self, path):
+        self._archivo = SectionFile(path, MAGIA, FORMATO)
+        self.version = self._archivo.meta["version"]
+        self.libros = tuple(self._archivo.meta["libros"])
+
+    def close(self):
+        self._archivo.close()
+
+    @staticmethod
+    def _pairs(offsets, datos, i):
+        plano = datos[2 * offsets[i]:2 * offsets[i + 1]]
+        return list(zip(plano[::2], plano[1::2]))
+
+    def occurrences(self, entry_id):
+        """Apariciones (versículo, posición) de una entrada del diccionario, en orden canónico."""
+        secciones = self._archivo.secciones
+        return self._pairs(secciones["entradas.offsets"], secciones["entradas.postings"], entry_id)
+
+    def verses(self, entry_id):
+        """Versículos donde aparece una entrada, sin repetir y en orden canónico."""
+        return list(dict.fromkeys(verse_id for verse_id, _ in self.occurrences(entry_id)))
+
+    def book_counts(self, entry_id):
+        """Pares (libro, apariciones) de una entrada, en orden canónico y solo con los libros donde aparece."""
+        libros = len(self.libros)
+        fila = self._archivo.secciones["frecuencias"][entry_id * libros:(entry_id + 1) * libros]
+        return [(libro, n) for libro, n in zip(self.libros, fila) if n]
+
+    def verse_links(self, verse_id):
+        """Palabras de un versículo enlazadas con el diccionario, como pares (posición, entrada)."""
+        secciones = self._archivo.secciones
+        return self._pairs(secciones["versiculos.offsets"], secciones["versiculos.enlaces"], verse_id)
+
+
+def load_concordance(corpus, index, dictionary, path=None):
+    """Abre la concordancia y la reconstruye si falta o si cambió el corpus o el diccionario."""
+    path = path or os.path.join(os.path.dirname(corpus.path), ARCHIVO_CONCORDANCIA)
+    try:
+        concordance = Concordance(path)
+        if concordance.version == _version(corpus, dictionary):
+            return concordance
+        concordance.close()
+    except ArchivoError:
+        pass
+
+    build_concordance(corpus, index, dictionary, path)
+    return Concordance(path)
@@ -0,0 +1,563 @@
+"""
+Lenguaje de consultas de la concordancia y su plan de ejecución.
+
+    amor fe                 las dos palabras en el mismo versículo (AND implícito)
+    amor AND fe             ídem
+    amor OR caridad         cualquiera de las dos
+    amor NOT odio           amor, pero no odio (NOT odio, solo, son los versículos sin odio)
+    "hijo de david"         frase: palabras consecutivas
+    λογος NEAR/3 θεου       las dos (palabras o frases) a 3 palabras o menos, en cualquier orden y en el
+                            mismo texto (NEAR solo, a 5 palabras; NEAR/1 son palabras contiguas)
+    λογ*                    comienzo de palabra
+    *mor*                   secuencia de letras, como el modo secuencia
+    /θε\\w+ς/                expresión regular sobre el texto normalizado, como el modo regex
+    griego:λογος            solo en el griego (también gr:, y es:, espanol: o español: para el español)
+    es:(amor OR fe)         el ámbito se aplica a todo el grupo
+    (amor OR fe) NOT odio   paréntesis para agrupar; NEAR tiene prioridad sobre AND y AND sobre OR
+
+Los operadores van en mayúsculas: en minúsculas, "and" u "or" son palabras que se buscan. Los
+términos se normalizan como en los demás modos y los resultados son versículos, así que "amor AND
+fe" no exige que las dos palabras estén en el mismo campo.
+
+La consulta se compila en un árbol cuyas hojas estiman, con los offsets de los índices y sin leer
+sus listas, cuántos versículos devolverían. Un AND parte de su hoja más selectiva y, con cada una
+de las demás, intersecta las listas del índice si no son mucho más largas que los candidatos; si
+lo son, o si ningún índice resuelve la hoja (una expresión regular), la verifica solo sobre el
+texto de los candidatos. Así una consulta compleja cuesta más o menos lo que su término más
+selectivo, y el corpus se recorre entero solo cuando ninguna hoja usa un índice. Un NEAR toma sus
+candidatos del índice de palabras, como el AND de sus dos partes, y comprueba la distancia con las
+posiciones de las palabras de cada candidato (las mismas posiciones que guarda el índice).
+
+Query.highlights da, para un versículo, los fragmentos de su texto que cumplen la consulta, para
+resaltarlos sin volver a buscar; term_query arma la Query equivalente a los demás modos de búsqueda.
+"""
+
+import re
+from functools import lru_cache
+
+from .busqueda import CAMPOS, compile_pattern, word_pattern
+from .normalizacion import normalize_term, tokenize, word_spans
+
+# Nombre del ámbito -> campos donde se busca
+AMBITOS = {
+    "griego": ("texto_griego",),
+    "gr": ("texto_griego",),
+    "espanol": ("texto_espanol",),
+    "español": ("texto_espanol",),
+    "es": ("texto_espanol",),
+}
+
+OPERADORES = ("AND", "OR", "NOT")
+
+# NEAR o NEAR/N, y la distancia de NEAR sin número
+_CERCA = re.compile(r"NEAR(?:/(\d+))?")
+DISTANCIA_CERCA = 5
+
+# Una hoja cuyo índice devolvería más de VERIFICACION veces los candidatos se verifica en el texto
+VERIFICACION = 8
+
+_LEXICO = re.compile(r"""
+      \s+
+    | (?P<abre>\() | (?P<cierra>\))
+    | "(?P<frase>[^"]*)"
+    | /(?P<regex>(?:[^/\\]|\\.)*)/
+    | (?P<ambito>[^\W\d_]+):(?=\S)
+    | (?P<termino>[^\s()"]+)
+""", re.VERBOSE)
+
+
+def _error(detalle):
+    return ValueError(f"Consulta no válida: {detalle}")
+
+
+def _tokens(texto):
+    """Pares (tipo, valor) de la consulta; los operadores tienen su propio tipo."""
+    pos = 0
+    while pos < len(texto):
+        match = _LEXICO.match(texto, pos)
+        if match is None:
+            raise _error(f"comillas sin cerrar en la posición {pos + 1}")
+        pos = match.end()
+        tipo = match.lastgroup
+        if tipo is None:
+            continue
+        valor = match.group(tipo)
+        if tipo == "termino":
+            if valor in OPERADORES:
+                tipo = valor
+            elif _CERCA.fullmatch(valor):
+                tipo = "NEAR"
+            elif valor.startswith("/"):
+                raise _error(f"expresión regular sin cerrar: {valor}")
+        yield tipo, valor
+
+
+class _Contexto:
+    """Índices y textos con los que se ejecuta un plan."""
+
+    def __init__(self, index, substring_index, corpus, executor, books):
+        if substring_index is None and corpus is None:
+            raise ValueError("Para verificar la consulta hace falta el corpus o el índice de subcadenas")
+        self.index = index
+        self.substring_index = substring_index
+        self.corpus = corpus
+        self.executor = executor
+        self.books = books
+        self.n = len(corpus) if corpus is not None else len(substring_index)
+
+    def text(self, campo, i):
+        # El índice de subcadenas guarda los mismos textos normalizados, ya decodificados
+        if self.substring_index is not None:
+            return self.substring_index.documents(campo)[i]
+        return self.corpus.normalized(campo, i)
+
+    def texto(self, i):
+        return lambda campo: self.text(campo, i)
+
+    def scan(self, nodo, candidatos=None):
+        """Versículos (de `candidatos`, o de todo el corpus) que cumplen `nodo` según su texto."""
+        verse_ids = range(self.n) if candidatos is None else candidatos
+        return {i for i in verse_ids if nodo.matches(self.texto(i))}
+
+
+class _Nodo:
+    """Nodo del plan: estima, obtiene y verifica los versículos que cumplen su parte de la consulta."""
+
+    def estimate(self, ctx):
+        """Cota del número de versículos según los índices, o None si ningún índice lo resuelve."""
+        return None
+
+    def verses(self, ctx):
+        """Versículos que cumplen el nodo, sin orden."""
+        return ctx.scan(self)
+
+    def matches(self, texto):
+        """Si lo cumple el versículo cuyo texto normalizado en cada campo es texto(campo)."""
+        raise NotImplementedError
+
+    def positions(self, campo, texto, palabras):
+        """
+        Posiciones de las palabras de un campo del versículo que cumplen el nodo (las negaciones no
+        aportan ninguna). `texto` es el texto normalizado y `palabras`, sus word_spans.
+        """
+        return set()
+
+
+def _overlapping(palabras, fragmentos):
+    """Posiciones de las palabras que se superponen con algún fragmento (inicio, fin) del texto."""
+    return {posicion for posicion, (inicio, palabra) in enumerate(palabras)
+            for desde, hasta in fragmentos if inicio < hasta and desde < inicio + len(palabra)}
+
+
+class _Palabras(_Nodo):
+    """Una palabra o una frase; con `prefix`, la última palabra puede ser solo su comienzo."""
+
+    def __init__(self, words, prefix, campos):
+        self.words = words
+        self.prefix = prefix
+        self.campos = campos
+        self._regex = word_pattern(words, prefix)
+
+    def estimate(self, ctx):
+        if ctx.index is None:
+            return None
+        ultima = len(self.words) - 1
+        return sum(min(ctx.index.count(campo, word, self.prefix and k == ultima) for k, word in enumerate(self.words))
+                   for campo in self.campos)
+
+    def verses(self, ctx):
+        if ctx.index is None:
+            return ctx.scan(self)
+        ultima = len(self.words) - 1
+        verse_ids = set()
+        for campo in self.campos:
+            if ultima == 0:
+                verse_ids.update(ctx.index.verses(campo, self.words[0], self.prefix))
+                continue
+            # Frase: los candidatos salen de su palabra más rara y se verifican en el texto, en lugar
+            # de cruzar las posiciones de palabras tan frecuentes como "de"
+            _, k, word = min((ctx.index.count(campo, word, self.prefix and k == ultima), k, word)
+                             for k, word in enumerate(self.words))
+            verse_ids.update(i for i in ctx.index.verses(campo, word, self.prefix and k == ultima)
+                             if self._regex.search(ctx.text(campo, i)))
+        return verse_ids
+
+    def matches(self, texto):
+        return any(self._regex.search(texto(campo)) for campo in self.campos)
+
+    def occurrences(self, palabras):
+        """Intervalos [inicio, fin) de posiciones donde aparece la palabra o la frase entre `palabras`."""
+        n = len(self.words)
+        ultima = n - 1
+        intervalos = []
+        for inicio in range(len(palabras) - ultima):
+            for k, word in enumerate(self.words):
+                palabra = palabras[inicio + k][1]
+                if palabra != word and not (self.prefix and k == ultima and palabra.startswith(word)):
+                    break
+            else:
+                intervalos.append((inicio, inicio + n))
+        return intervalos
+
+    def positions(self, campo, texto, palabras):
+        if campo not in self.campos:
+            return set()
+        return {posicion for inicio, fin in self.occurrences(palabras) for posicion in range(inicio, fin)}
+
+    def index_occurrences(self, index, campo):
+        """Como occurrences, para cada versículo donde aparece en el campo, según las posiciones del índice."""
+        n = len(self.words)
+        por_versiculo = {}
+        for verse_id, posicion in index.occurrences(campo, " ".join(self.words), self.prefix):
+            por_versiculo.setdefault(verse_id, []).append((posicion, posicion + n))
+        return por_versiculo
+
+
+class _Secuencia(_Nodo):
+    """Una secuencia de letras cualquiera (ya normalizada)."""
+
+    def __init__(self, secuencia, campos):
+        self.secuencia = secuencia
+        self.campos = campos
+
+    def estimate(self, ctx):
+        if ctx.substring_index is None:
+            return None
+        return sum(ctx.substring_index.estimate(campo, self.secuencia) for campo in self.campos)
+
+    def verses(self, ctx):
+        if ctx.substring_index is None:
+            return ctx.scan(self)
+        verse_ids = set()
+        for campo in self.campos:
+            verse_ids.update(ctx.substring_index.search(campo, self.secuencia))
+        return verse_ids
+
+    def matches(self, texto):
+        return any(self.secuencia in texto(campo) for campo in self.campos)
+
+    def positions(self, campo, texto, palabras):
+        if campo not in self.campos:
+            return set()
+        fragmentos = []
+        inicio = texto.find(self.secuencia)
+        while inicio != -1:
+            fragmentos.append((inicio, inicio + len(self.secuencia)))
+            inicio = texto.find(self.secuencia, inicio + 1)
+        return _overlapping(palabras, fragmentos)
+
+
+class _Regex(_Nodo):
+    """Una expresión regular, que ningún índice resuelve: se reparte entre los procesos si los hay."""
+
+    def __init__(self, patron, campos):
+        self.patron = patron
+        self.campos = campos
+        self._regex = compile_pattern(patron)
+
+    def verses(self, ctx):
+        if ctx.executor is not None:
+            return set(ctx.executor.find(self.patron, "regex", ctx.books, self.campos))
+        return ctx.scan(self)
+
+    def matches(self, texto):
+        return any(self._regex.search(texto(campo)) for campo in self.campos)
+
+    def positions(self, campo, texto, palabras):
+        if campo not in self.campos:
+            return set()
+        fragmentos = [match.span() for match in self._regex.finditer(texto) if match.end() > match.start()]
+        return _overlapping(palabras, fragmentos)
+
+
+class _No(_Nodo):
+    def __init__(self, hijo):
+        self.hijo = hijo
+
+    def verses(self, ctx):
+        return set(range(ctx.n)).difference(self.hijo.verses(ctx))
+
+    def matches(self, texto):
+        return not self.hijo.matches(texto)
+
+
+class _O(_Nodo):
+    def __init__(self, hijos):
+        self.hijos = hijos
+
+    def estimate(self, ctx):
+        estimados = [hijo.estimate(ctx) for hijo in self.hijos]
+        return None if None in estimados else sum(estimados)
+
+    def verses(self, ctx):
+        # Si varias ramas recorren el corpus, se recorre una sola vez para todas
+        if sum(hijo.estimate(ctx) is None for hijo in self.hijos) > 1:
+            return ctx.scan(self)
+        return set().union(*(hijo.verses(ctx) for hijo in self.hijos))
+
+    def matches(self, texto):
+        return any(hijo.matches(texto) for hijo in self.hijos)
+
+    def positions(self, campo, texto, palabras):
+        return set().union(*(hijo.positions(campo, texto, palabras) for hijo in self.hijos))
+
+
+class _Cerca(_Nodo):
+    """Dos palabras o frases a `distancia` palabras o menos, en cualquier orden y en el mismo campo."""
+
+    def __init__(self, izquierda, derecha, distancia):
+        if not isinstance(izquierda, _Palabras) or not isinstance(derecha, _Palabras):
+            raise _error("NEAR solo relaciona palabras o frases")
+        self.campos = tuple(campo for campo in izquierda.campos if campo in derecha.campos)
+        if not self.campos:
+            raise _error("NEAR relaciona palabras del mismo texto (griego o español)")
+        if distancia < 1:
+            raise _error("la distancia de NEAR debe ser al menos 1")
+        self.izquierda = izquierda
+        self.derecha = derecha
+        self.distancia = distancia
+        self._ambas = _Y([izquierda, derecha])
+
+    def estimate(self, ctx):
+        return self._ambas.estimate(ctx)
+
+    def verses(self, ctx):
+        # Si una parte es mucho más frecuente que la otra, basta verificar en el texto los versículos
+        # que tienen las dos; si no, se cruzan las posiciones de las dos en el índice
+        if ctx.index is None:
+            return ctx.scan(self, self._ambas.verses(ctx))
+        estimados = sorted((self.izquierda.estimate(ctx), self.derecha.estimate(ctx)))
+        if estimados[1] > VERIFICACION * max(estimados[0], 1):
+            return ctx.scan(self, self._ambas.verses(ctx))
+        verse_ids = set()
+        for campo in self.campos:
+            izquierda = self.izquierda.index_occurrences(ctx.index, campo)
+            derecha = self.derecha.index_occurrences(ctx.index, campo)
+            verse_ids.update(verse_id for verse_id in izquierda.keys() & derecha.keys()
+                             if self._close(izquierda[verse_id], derecha[verse_id]))
+        return verse_ids
+
+    def _pairs(self, palabras):
+        return self._close(self.izquierda.occurrences(palabras), self.derecha.occurrences(palabras))
+
+    def _close(self, izquierda, derecha):
+        """Pares de intervalos (izquierda, derecha) que están a la distancia pedida."""
+        pares = []
+        for a in izquierda:
+            for b in derecha:
+                # Palabras contiguas están a distancia 1; las que se superponen no cuentan
+                distancia = b[0] - a[1] + 1 if b[0] >= a[1] else a[0] - b[1] + 1
+                if 1 <= distancia <= self.distancia:
+                    pares.append((a, b))
+        return pares
+
+    def matches(self, texto):
+        return any(self._pairs(word_spans(texto(campo))) for campo in self.campos)
+
+    def positions(self, campo, texto, palabras):
+        if campo not in self.campos:
+            return set()
+        return {posicion for par in self._pairs(palabras) for inicio, fin in par for posicion in range(inicio, fin)}
+
+
+class _Y(_Nodo):
+    def __init__(self, hijos):
+        self.hijos = hijos
+
+    def estimate(self, ctx):
+        estimados = [hijo.estimate(ctx) for hijo in self.hijos if not isinstance(hijo, _No)]
+        conocidos = [estimado for estimado in estimados if estimado is not None]
+        return min(conocidos) if conocidos else None
+
+    def verses(self, ctx):
+        # Primero las ramas más selectivas; las que ningún índice resuelve, al final
+        positivos = sorted(((hijo.estimate(ctx), k, hijo) for k, hijo in enumerate(self.hijos)
+                            if not isinstance(hijo, _No)),
+                           key=lambda paso: (paso[0] is None, paso[0] or 0, paso[1]))
+        if positivos:
+            candidatos = set(positivos[0][2].verses(ctx))
+        else:
+            candidatos = set(range(ctx.n))
+        pasos = [(estimado, hijo, False) for estimado, _, hijo in positivos[1:]]
+        pasos += [(hijo.hijo.estimate(ctx), hijo.hijo, True) for hijo in self.hijos if isinstance(hijo, _No)]
+
+        for estimado, hijo, negado in pasos:
+            if not candidatos:
+                break
+            if estimado is not None and estimado <= VERIFICACION * len(candidatos):
+                encontrados = hijo.verses(ctx)
+                if negado:
+                    candidatos.difference_update(encontrados)
+                else:
+                    candidatos.intersection_update(encontrados)
+            else:
+                candidatos = {i for i in candidatos if hijo.matches(ctx.texto(i)) != negado}
+        return candidatos
+
+    def matches(self, texto):
+        return all(hijo.matches(texto) for hijo in self.hijos)
+
+    def positions(self, campo, texto, palabras):
+        return set().union(*(hijo.positions(campo, texto, palabras) for hijo in self.hijos))
+
+
+class _Parser:
+    """
+    Analizador descendente de la gramática:
+
+        o        := y ("OR" y)*
+        y        := cerca (["AND"] cerca)*
+        cerca    := unario ("NEAR" ["/" número] unario)*
+        unario   := "NOT" unario | primario
+        primario := ámbito primario | "(" o ")" | término | frase | regex
+    """
+
+    def __init__(self, texto):
+        self._tokens = list(_tokens(texto))
+        self._pos = 0
+
+    def _peek(self):
+        return self._tokens[self._pos][0] if self._pos < len(self._tokens) else None
+
+    def _next(self):
+        if self._pos >= len(self._tokens):
+            raise _error("falta un término al final")
+        self._pos += 1
+        return self._tokens[self._pos - 1]
+
+    def parse(self):
+        if not self._tokens:
+            raise _error("la consulta está vacía")
+        nodo = self._or(CAMPOS)
+        if self._pos < len(self._tokens):
+            raise _error(f"sobra {self._tokens[self._pos][1]!r}")
+        return nodo
+
+    def _or(self, campos):
+        hijos = [self._and(campos)]
+        while self._peek() == "OR":
+            self._pos += 1
+            hijos.append(self._and(campos))
+        return hijos[0] if len(hijos) == 1 else _O(hijos)
+
+    def _and(self, campos):
+        hijos = [self._near(campos)]
+        while self._peek() not in (None, "OR", "cierra"):
+            if self._peek() == "AND":
+                self._pos += 1
+            hijos.append(self._near(campos))
+        return hijos[0] if len(hijos) == 1 else _Y(hijos)
+
+    def _near(self, campos):
+        nodo = self._unary(campos)
+        while self._peek() == "NEAR":
+            distancia = _CERCA.fullmatch(self._next()[1]).group(1)
+            nodo = _Cerca(nodo, self._unary(campos), int(distancia) if distancia else DISTANCIA_CERCA)
+        return nodo
+
+    def _unary(self, campos):
+        if self._peek() == "NOT":
+            self._pos += 1
+            return _No(self._unary(campos))
+        return self._primary(campos)
+
+    def _primary(self, campos):
+        tipo, valor = self._next()
+        if tipo == "ambito":
+            ambito = AMBITOS.get(valor.lower())
+            if ambito is None:
+                raise _error(f"ámbito desconocido {valor!r} (se puede usar {', '.join(AMBITOS)})")
+            return self._primary(ambito)
+        if tipo == "abre":
+            nodo = self._or(campos)
+            if self._peek() != "cierra":
+                raise _error("falta cerrar un paréntesis")
+            self._pos += 1
+            return nodo
+        if tipo == "frase":
+            words = tokenize(valor)
+            if not words:
+                raise _error(f"la frase \"{valor}\" no tiene palabras")
+            return _Palabras(words, False, campos)
+        if tipo == "regex":
+            return _Regex(valor, campos)
+        if tipo == "termino":
+            if valor.startswith("*"):
+                secuencia = normalize_term(valor.strip("*"))
+                if not secuencia:
+                    raise _error(f"la secuencia {valor} está vacía")
+                return _Secuencia(secuencia, campos)
+            words = tokenize(valor.rstrip("*"))
+            if not words:
+                raise _error(f"el término {valor!r} no tiene letras")
+            return _Palabras(words, valor.endswith("*"), campos)
+        raise _error(f"se esperaba un término y se encontró {valor!r}")
+
+
+class Query:
+    """Consulta compilada: su texto y el árbol de su plan (si no se pasa, se compila el texto)."""
+
+    def __init__(self, texto, plan=None):
+        self.texto = texto
+        self.plan = plan if plan is not None else _Parser(texto).parse()
+
+    def find(self, index=None, substring_index=None, corpus=None, executor=None, books=None):
+        """
+        Versículos que cumplen la consulta, en orden canónico. Los índices que falten se reemplazan
+        por recorrer el texto, que sale del índice de subcadenas o, sin él, del corpus (hace falta uno
+        de los dos). `executor` y `books` se usan como en busqueda.find_verses, para las expresiones regulares.
+        """
+        return sorted(self.plan.verses(_Contexto(index, substring_index, corpus, executor, books)))
+
+    def matches(self, texto):
+        """Si la cumple un versículo cuyo texto normalizado en cada campo es texto(campo)."""
+        return self.plan.matches(texto)
+
+    def highlights(self, normalizado, texto):
+        """
+        Fragmentos de un versículo que cumplen la consulta (sin contar las negaciones), como
+        {campo: [(inicio, fin), ...]} en caracteres de texto(campo), el texto tal como se muestra;
+        normalizado(campo) es su forma normalizada. Las palabras contiguas forman un solo fragmento.
+        """
+        resultado = {}
+        for campo in CAMPOS:
+            texto_normalizado = normalizado(campo)
+            palabras = word_spans(texto_normalizado)
+            posiciones = self.plan.positions(campo, texto_normalizado, palabras)
+            originales = word_spans(texto(campo))
+            fragmentos = []
+            # La normalización no une ni separa palabras: la posición k es la misma palabra en los dos textos
+            if posiciones and len(originales) == len(palabras):
+                anterior = None
+                for posicion in sorted(posiciones):
+                    inicio, palabra = originales[posicion]
+                    if anterior == posicion - 1:
+                        fragmentos[-1] = (fragmentos[-1][0], inicio + len(palabra))
+                    else:
+                        fragmentos.append((inicio, inicio + len(palabra)))
+                    anterior = posicion
+            resultado[campo] = fragmentos
+        return resultado
+
+
+@lru_cache(maxsize=256)
+def compile_query(texto):
+    """Compila una consulta (con caché, porque se repiten); si no es válida se lanza ValueError."""
+    return Query(texto)
+
+
+@lru_cache(maxsize=256)
+def term_query(term, modo):
+    """
+    Query equivalente a buscar `term` en un modo de busqueda.py (para resaltar sus coincidencias),
+    o None si el término no tiene nada que resaltar.
+    """
+    if modo == "consulta":
+        return compile_query(term)
+    if modo == "regex":
+        return Query(term, _Regex(term, CAMPOS))
+    if modo == "secuencia":
+        secuencia = normalize_term(term)
+        return Query(term, _Secuencia(secuencia, CAMPOS)) if secuencia else None
+    words = tokenize(term)
+    return Query(term, _Palabras(words, modo == "prefijo", CAMPOS)) if words else None
@@ -0,0 +1,409 @@
+"""
+Corpus binario del Nuevo Testamento interlineal.
+
+El paso de construcción lee los CSV de cada libro (Mateo.csv … Apocalipsis.csv) una sola vez
+y escribe un único archivo versionado que las aplicaciones abren con mmap, sin red y sin pandas.
+
+El archivo usa el formato por secciones de archivo.py. Los metadatos guardan la versión de los
+datos y la tabla de libros; las secciones son las columnas libro, capítulo y versículo (uint16) y,
+para cada campo de texto, sus desplazamientos (uint32, n + 1) y sus bytes en UTF-8.
+Además del texto en español y en griego se guardan sus formas normalizadas para la búsqueda,
+calculadas una sola vez al construir el corpus.
+
+La tabla de libros guarda el hash del CSV de cada uno: cuando cambian algunos CSV solo se vuelven
+a leer esos libros y los demás se copian del archivo anterior (ver incremental.py).
+"""
+
+import argparse
+import array
+import csv
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+from .archivo import ArchivoError, SectionFile, write_sections
+from .division import split_text
+from .incremental import copy_texts, plan_update
+from .libros import LIBROS
+from .normalizacion import normalize_greek
+
+MAGIA = b"NTCORPUS"
+FORMATO = 3
+
+# Directorio donde están los CSV incluidos en el repositorio
+DIRECTORIO_DATOS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVO_CORPUS = "corpus_nt.bin"
+
+# Campo de origen -> campo con su forma normalizada (sin acentos y en minúsculas)
+CAMPOS_NORMALIZADOS = {"texto_espanol": "espanol_normalizado", "texto_griego": "griego_normalizado"}
+
+# Las sesiones de una aplicación pueden abrir el corpus a la vez: se actualiza una sola vez
+_ACTUALIZACION = threading.Lock()
+
+CAMPOS_TEXTO = ("texto", "texto_espanol", "texto_griego") + tuple(CAMPOS_NORMALIZADOS.values())
+
+Versiculo = namedtuple("Versiculo", "libro capitulo versiculo texto texto_espanol texto_griego")
+
+
+class CorpusError(ArchivoError):
+    """El archivo del corpus no existe, está dañado o tiene un formato distinto."""
+
+
+def _to_int(value):
+    """Convierte a entero como pd.to_numeric(errors='coerce').fillna(0)."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            return 0
+
+
+def _source_path(source_dir, book_name):
+    return os.path.join(source_dir, LIBROS[book_name])
+
+
+def _book_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def book_hashes(source_dir=DIRECTORIO_DATOS):
+    """Hash del contenido del CSV de cada libro, en orden canónico."""
+    hashes = {}
+    for book_name in LIBROS:
+        with open(_source_path(source_dir, book_name), "rb") as f:
+            hashes[book_name] = _book_hash(f.read())
+    return hashes
+
+
+def _version(hashes):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{FORMATO}".encode())
+    for book_name, book_hash in hashes.items():
+        digest.update(f"{book_name}\x00{book_hash}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def sources_version(source_dir=DIRECTORIO_DATOS):
+    """
+    Calcula la versión de los datos a partir del contenido de los CSV.
+    Cambia si cambia cualquier libro o el formato del archivo.
+    """
+    return _version(book_hashes(source_dir))
+
+
+def read_book_csv(path, book_name):
+    """Lee el CSV de un libro y devuelve sus versículos ya divididos y tipados."""
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            full_text = row.get("Texto") or ""
+            spanish_text, greek_text = split_text(full_text)
+            yield Versiculo(
+                book_name,
+                _to_int(row.get("Capítulo")),
+                _to_int(row.get("Versículo")),
+                full_text,
+                spanish_text,
+                greek_text,
+            )
+
+
+def _verse_texts(verse):
+    """Bytes de cada campo de texto de un versículo, con sus formas normalizadas."""
+    valores = verse._asdict()
+    for origen, campo in CAMPOS_NORMALIZADOS.items():
+        valores[campo] = normalize_greek(valores[origen])
+    return {campo: valores[campo].encode("utf-8") for campo in CAMPOS_TEXTO}
+
+
+def _write(path, version, tabla_libros, columnas, textos):
+    libro_col = array.array("H")
+    for book_id, libro in enumerate(tabla_libros):
+        libro_col.extend([book_id] * (libro["fin"] - libro["inicio"]))
+
+    secciones = [("libro", libro_col), ("capitulo", columnas[0]), ("versiculo", columnas[1])]
+    for campo in CAMPOS_TEXTO:
+        offsets, blob = textos[campo]
+        secciones.append((f"{campo}.offsets", offsets))
+        secciones.append((campo, blob))
+
+    meta = {"version": version, "versiculos": len(libro_col), "libros": tabla_libros}
+    write_sections(path, MAGIA, FORMATO, meta, secciones)
+
+
+def write_corpus(path, books, version):
+    """
+    Escribe el archivo del corpus de forma atómica.
+    `books` es una lista de (nombre, hash del origen, lista de Versiculo) en orden canónico.
+    """
+    capitulo_col = array.array("H")
+    versiculo_col = array.array("H")
+    textos = {campo: (array.array("I", [0]), bytearray()) for campo in CAMPOS_TEXTO}
+    tabla_libros = []
+
+    for book_name, book_hash, verses in books:
+        inicio = len(capitulo_col)
+        for verse in verses:
+            capitulo_col.append(verse.capitulo)
+            versiculo_col.append(verse.versiculo)
+            for campo, texto in _verse_texts(verse).items():
+                offsets, blob = textos[campo]
+                blob += texto
+                offsets.append(len(blob))
+        tabla_libros.append({"nombre": book_name, "inicio": inicio, "fin": len(capitulo_col), "hash": book_hash})
+
+    _write(path, version, tabla_libros, (capitulo_col, versiculo_col), textos)
+
+
+def build_corpus(source_dir=DIRECTORIO_DATOS, path=None):
+    """
+    Paso de construcción: convierte los CSV de todos los libros en el archivo del corpus.
+    Devuelve la ruta del archivo escrito.
+    """
+    path = path or os.path.join(source_dir, ARCHIVO_CORPUS)
+    hashes = book_hashes(source_dir)
+    books = [
+        (book_name, book_hash, list(read_book_csv(_source_path(source_dir, book_name), book_name)))
+        for book_name, book_hash in hashes.items()
+    ]
+    write_corpus(path, books, _version(hashes))
+    return path
+
+
+def update_corpus(corpus, source_dir=DIRECTORIO_DATOS, path=None):
+    """
+    Actualiza `corpus` con los CSV de `source_dir` leyendo solo los libros cuyo hash cambió; los
+    demás se copian tal cual del archivo abierto. El archivo se reemplaza de forma atómica, así que
+    `corpus` sigue siendo válido hasta cerrarlo. Devuelve los nombres de los libros que se leyeron.
+    """
+    path = path or corpus.path
+    hashes = book_hashes(source_dir)
+    leidos = {}
+    tabla_libros = []
+    inicio = 0
+    for book_name, book_hash in hashes.items():
+        if corpus.hashes.get(book_name) == book_hash:
+            previo_inicio, previo_fin = corpus.book_range(book_name)
+            fin = inicio + previo_fin - previo_inicio
+        else:
+            leidos[book_name] = list(read_book_csv(_source_path(source_dir, book_name), book_name))
+            fin = inicio + len(leidos[book_name])
+        tabla_libros.append({"nombre": book_name, "inicio": inicio, "fin": fin, "hash": book_hash})
+        inicio = fin
+
+    tramos = plan_update(corpus.tabla_libros, tabla_libros)
+    # Los tramos que no se copian son, en orden, los libros que se leyeron
+    releidos = dict(zip((i for i, tramo in enumerate(tramos) if not tramo.copia), leidos.values()))
+
+    columnas = []
+    for nombre, campo in (("capitulo", "capitulo"), ("versiculo", "versiculo")):
+        columna = array.array("H")
+        anterior = corpus._secciones[nombre]
+        for i, tramo in enumerate(tramos):
+            if tramo.copia:
+                columna.frombytes(anterior[tramo.inicio:tramo.fin].cast("B"))
+            else:
+                columna.extend(getattr(verse, campo) for verse in releidos[i])
+        columnas.append(columna)
+
+    textos_releidos = {i: [_verse_texts(verse) for verse in verses] for i, verses in releidos.items()}
+    textos = {}
+    for campo in CAMPOS_TEXTO:
+        nuevos = {i: [textos_verso[campo] for textos_verso in lista] for i, lista in textos_releidos.items()}
+        textos[campo] = copy_texts(corpus._secciones[f"{campo}.offsets"], corpus._secciones[campo], tramos, nuevos)
+
+    _write(path, _version(hashes), tabla_libros, columnas, textos)
+    return list(leidos)
+
+
+class Corpus:
+    """
+    Vista de solo lectura sobre el archivo del corpus abierto con mmap.
+    Las columnas numéricas no se copian y los textos se decodifican solo al pedirlos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._archivo = SectionFile(path, MAGIA, FORMATO)
+        except ArchivoError as e:
+            raise CorpusError(str(e)) from e
+
+        meta = self._archivo.meta
+        self.version = meta["version"]
+        self.tabla_libros = meta["libros"]
+        self.libros = tuple(libro["nombre"] for libro in meta["libros"])
+        self.hashes = {libro["nombre"]: libro["hash"] for libro in meta["libros"]}
+        self._rangos = {libro["nombre"]: (libro["inicio"], libro["fin"]) for libro in meta["libros"]}
+        self._n = meta["versiculos"]
+        self._secciones = self._archivo.secciones
+
+        self.libro_ids = self._secciones["libro"]
+        self.capitulos = self._secciones["capitulo"]
+        self.versiculos = self._secciones["versiculo"]
+
+    def __len__(self):
+        return self._n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Libera las vistas y cierra el mmap."""
+        self._archivo.close()
+
+    def _text(self, campo, i):
+        offsets = self._secciones[f"{campo}.offsets"]
+        return str(self._secciones[campo][offsets[i]:offsets[i + 1]], "utf-8")
+
+    def texto(self, i):
+        return self._text("texto", i)
+
+    def texto_espanol(self, i):
+        return self._text("texto_espanol", i)
+
+    def texto_griego(self, i):
+        return self._text("texto_griego", i)
+
+    def normalized(self, campo, i):
+        """Texto normalizado del versículo `i` en un campo de CAMPOS_NORMALIZADOS (texto_espanol o texto_griego)."""
+        return self._text(CAMPOS_NORMALIZADOS[campo], i)
+
+    def libro(self, i):
+        return self.libros[self.libro_ids[i]]
+
+    def verse(self, i):
+        """Devuelve el versículo `i` (en orden canónico) como Versiculo."""
+        return Versiculo(
+            self.libro(i),
+            self.capitulos[i],
+            self.versiculos[i],
+            self.texto(i),
+            self.texto_espanol(i),
+            self.texto_griego(i),
+        )
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self.verse(i)
+
+    def book_range(self, book_name):
+        """Devuelve el rango [inicio, fin) de los versículos de un libro."""
+        return self._rangos[book_name]
+
+    def column(self, campo, start=0, stop=None):
+        """Decodifica un campo de texto completo (o un rango) en una lista de str."""
+        stop = self._n if stop is None else stop
+        offsets = self._secciones[f"{campo}.offsets"]
+        blob = self._secciones[campo]
+        return [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(start, stop)]
+
+    def to_dataframe(self, start=0, stop=None):
+        """
+        Construye el DataFrame con las columnas que usan las aplicaciones
+        (Libro, Capítulo, Versículo, Texto, texto_espanol, texto_griego)
+        y las formas normalizadas (espanol_normalizado, griego_normalizado).
+        """
+        import numpy as np
+        import pandas as pd
+
+        stop = self._n if stop is None else stop
+        df = pd.DataFrame({
+            "Libro": [self.libros[b] for b in self.libro_ids[start:stop]],
+            "Capítulo": np.frombuffer(self.capitulos[start:stop], dtype=np.uint16).astype(int),
+            "Versículo": np.frombuffer(self.versiculos[start:stop], dtype=np.uint16).astype(int),
+            "Texto": self.column("texto", start, stop),
+            "texto_espanol": self.column("texto_espanol", start, stop),
+            "texto_griego": self.column("texto_griego", start, stop),
+            "espanol_normalizado": self.column("espanol_normalizado", start, stop),
+            "griego_normalizado": self.column("griego_normalizado", start, stop),
+        }, index=pd.RangeIndex(start, stop))
+        if start == 0 and stop == self._n:
+            # Permite a update_dataframe saber qué libros cambiaron en la próxima versión
+            df.attrs["libros"] = self.tabla_libros
+        return df
+
+    def update_dataframe(self, df):
+        """
+        Mismo resultado que to_dataframe() a partir de `df`, el DataFrame completo de una versión
+        anterior del corpus: solo se construyen las filas de los libros que cambiaron.
+        """
+        import pandas as pd
+
+        partes = []
+        for tramo in plan_update(df.attrs.get("libros", ()), self.tabla_libros):
+            if tramo.copia:
+                partes.append(df.iloc[tramo.inicio:tramo.fin])
+            else:
+                partes.append(self.to_dataframe(tramo.inicio, tramo.fin))
+        nuevo = pd.concat(partes, ignore_index=True) if partes else self.to_dataframe()
+        nuevo.attrs["libros"] = self.tabla_libros
+        return nuevo
+
+
+def load_corpus(path=None, source_dir=DIRECTORIO_DATOS):
+    """
+    Abre el corpus y lo reconstruye si falta; si los CSV cambiaron desde la última construcción
+    solo vuelve a leer los libros que cambiaron. Si los CSV no están disponibles se usa el archivo
+    existente tal cual.
+    """
+    path = path or os.path.join(source_dir, ARCHIVO_CORPUS)
+    try:
+        version = sources_version(source_dir)
+    except FileNotFoundError:
+        return Corpus(path)
+
+    with _ACTUALIZACION:
+        try:
+            corpus = Corpus(path)
+        except CorpusError:
+            build_corpus(source_dir, path)
+            return Corpus(path)
+
+        if corpus.version == version:
+            return corpus
+        with corpus:
+            update_corpus(corpus, source_dir, path)
+        return Corpus(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construye el corpus binario a partir de los CSV de los libros.")
+    parser.add_argument("--datos", default=DIRECTORIO_DATOS, help="Directorio con los CSV de los libros.")
+    parser.add_argument("--salida", default=None, help=f"Archivo de salida (por defecto {ARCHIVO_CORPUS} en --datos).")
+    parser.add_argument("--txt", nargs="?", const="", default=None, metavar="RUTA",
+                        help="Construye el corpus desde nuevotestamentointerlineal.txt (o RUTA) en lugar de los CSV.")
+    parser.add_argument("--comparar", action="store_true",
+                        help="Compara el archivo de texto con los CSV versículo por versículo en lugar de construir.")
+    parser.add_argument("--parquet", default=None, metavar="RUTA",
+                        help="Exporta además el corpus a Parquet en RUTA (requiere pyarrow).")
+    args = parser.parse_args(argv)
+
+    if args.txt is not None or args.comparar:
+        from .fuente_txt import build_corpus_from_txt, compare_sources
+
+        txt_path = args.txt or None
+        if args.comparar:
+            diferencias = 0
+            for diferencia in compare_sources(txt_path, args.datos):
+                diferencias += 1
+                print(f"{diferencia.libro} {diferencia.capitulo}:{diferencia.versiculo} [{diferencia.campo}]")
+                print(f"  txt: {diferencia.txt if diferencia.txt is not None else '(falta)'}")
+                print(f"  csv: {diferencia.csv if diferencia.csv is not None else '(falta)'}")
+            print(f"{diferencias} diferencias")
+            return 1 if diferencias else 0
+        path = build_corpus_from_txt(txt_path, args.salida)
+    else:
+        path = build_corpus(args.datos, args.salida)
+    with Corpus(path) as corpus:
+        print(f"{path}: {len(corpus)} versículos, {len(corpus.libros)} libros, versión {corpus.version}")
+        if args.parquet:
+            from .columnas import write_parquet
+
+            print(f"{write_parquet(corpus, args.parquet)}: exportado a Parquet")
+    return 0
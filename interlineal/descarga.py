@@ -0,0 +1,143 @@
+"""
+Descarga concurrente de los CSV de los libros con caché en disco.
+
+Todas las descargas comparten una sesión de requests con su grupo de conexiones y se hacen en
+paralelo con hilos. Cada archivo descargado se guarda en la caché junto con su ETag y su
+Last-Modified; la siguiente vez se revalida con If-None-Match/If-Modified-Since, así que un
+archivo que no cambió cuesta una sola petición con respuesta 304 vacía. Si no hay red se usa
+la copia de la caché o, en su defecto, la copia incluida en el repositorio. Un libro que falla
+no interrumpe la carga de los demás, y si la caché no se puede escribir se usa igual lo descargado.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .corpus import DIRECTORIO_DATOS
+from .libros import LIBROS
+
+DIRECTORIO_CACHE = os.environ.get(
+    "INTERLINEAL_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "interlineal"),
+)
+
+# origen es "red", "cache" o "local"; error es la excepción de red, si la hubo
+Descarga = namedtuple("Descarga", "nombre contenido origen error")
+
+
+def book_fallbacks(source_dir=DIRECTORIO_DATOS):
+    """Copias de los CSV incluidas en el repositorio, por nombre de libro."""
+    return {book_name: os.path.join(source_dir, archivo) for book_name, archivo in LIBROS.items()}
+
+
+def _cache_paths(cache_dir, url):
+    clave = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, clave), os.path.join(cache_dir, f"{clave}.json")
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _try_read(path):
+    """Contenido de un archivo, o None si no se puede leer (por ejemplo, si otro proceso borró la caché)."""
+    try:
+        return _read_file(path)
+    except OSError:
+        return None
+
+
+def _read_meta(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(ruta, ruta_meta, contenido, meta):
+    """Guarda el contenido y sus cabeceras de validación; cada archivo se reemplaza de forma atómica."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    for path, datos in ((ruta, contenido), (ruta_meta, json.dumps(meta).encode("utf-8"))):
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(datos)
+        os.replace(tmp_path, path)
+
+
+def _fetch_one(session, nombre, url, cache_dir, timeout, fallback):
+    ruta, ruta_meta = _cache_paths(cache_dir, url)
+    meta = _read_meta(ruta_meta) if os.path.exists(ruta) else {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and meta:
+            contenido = _try_read(ruta)
+            if contenido is not None:
+                return Descarga(nombre, contenido, "cache", None)
+            # La copia desapareció después de revalidarla: se descarga completa
+            response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        contenido = response.content
+        try:
+            _write_cache(ruta, ruta_meta, contenido, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            })
+        except OSError:
+            # Sin caché (por ejemplo, si no se puede escribir en el directorio) lo descargado sirve igual
+            pass
+        return Descarga(nombre, contenido, "red", None)
+    except requests.exceptions.RequestException as e:
+        error = e
+
+    # Sin red o con error del servidor: primero la caché y después la copia incluida
+    if meta:
+        contenido = _try_read(ruta)
+        if contenido is not None:
+            return Descarga(nombre, contenido, "cache", error)
+    if fallback:
+        contenido = _try_read(fallback)
+        if contenido is not None:
+            return Descarga(nombre, contenido, "local", error)
+    return Descarga(nombre, None, None, error)
+
+
+def fetch_all(urls, cache_dir=DIRECTORIO_CACHE, fallbacks=None, max_workers=8, timeout=10, session=None):
+    """
+    Descarga en paralelo todas las URL de `urls` (nombre -> URL).
+    `fallbacks` (nombre -> ruta local) indica la copia que se usa si no hay red ni caché.
+    Devuelve un diccionario nombre -> Descarga en el mismo orden que `urls`.
+    """
+    fallbacks = fallbacks or {}
+    propia = session is None
+    if propia:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                nombre: executor.submit(_fetch_one, session, nombre, url, cache_dir, timeout, fallbacks.get(nombre))
+                for nombre, url in urls.items()
+            }
+            return {nombre: future.result() for nombre, future in futures.items()}
+    finally:
+        if propia:
+            session.close()
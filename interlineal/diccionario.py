@@ -0,0 +1,304 @@
+"""
+Diccionario del vocabulario griego (vocabulario_nt.json) en formato compacto.
+
+Cada entrada del JSON tiene al menos "palabra"; opcionalmente "lema" (la forma de diccionario)
+y "formas" (otras formas flexionadas que remiten a la entrada). Al construir el archivo se guardan:
+
+    entradas   las entradas como JSON compacto, en bloques comprimidos con zlib que se
+               descomprimen solo al consultar una de sus entradas
+    claves     las claves normalizadas (palabra y formas) ordenadas, con su entrada
+    lemas      los lemas normalizados ordenados, con las entradas de cada uno
+
+Así una forma flexionada lleva a su entrada y a las demás formas del mismo lema, las búsquedas
+por comienzo de palabra son búsquedas binarias y las aproximadas solo comparan las claves que
+comparten bigramas con la consulta. El archivo se reconstruye cuando cambia el contenido del JSON.
+"""
+
+import array
+import hashlib
+import json
+import os
+import zlib
+from bisect import bisect_left
+
+from .archivo import ArchivoError, SectionFile, write_sections
+from .corpus import DIRECTORIO_DATOS
+from .normalizacion import normalize_term
+
+MAGIA = b"NTDICCIO"
+FORMATO = 1
+ARCHIVO_DICCIONARIO = "diccionario_nt.bin"
+ARCHIVO_VOCABULARIO = "vocabulario_nt.json"
+
+# Entradas por bloque comprimido
+ENTRADAS_POR_BLOQUE = 32
+
+# Mayor que cualquier carácter, para delimitar el rango de claves con un prefijo
+_FIN_PREFIJO = "\U0010ffff"
+
+
+class DiccionarioError(ArchivoError):
+    """El vocabulario no se puede leer o el archivo del diccionario no es válido."""
+
+
+def dictionary_version(contenido):
+    """Versión del diccionario a partir del contenido del JSON y del formato del archivo."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{FORMATO}".encode())
+    digest.update(contenido)
+    return digest.hexdigest()
+
+
+def _parse_entries(contenido):
+    try:
+        entries = json.loads(contenido.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise DiccionarioError(f"Vocabulario no válido: {e}") from e
+    if not isinstance(entries, list):
+        raise DiccionarioError("El vocabulario debe ser una lista de entradas")
+    return [entry for entry in entries if isinstance(entry, dict) and entry.get("palabra")]
+
+
+def _join_terms(terms):
+    return "\n".join(terms).encode("utf-8")
+
+
+def build_dictionary(contenido, path):
+    """Construye el archivo del diccionario a partir del contenido (bytes) del JSON."""
+    entries = _parse_entries(contenido)
+
+    claves = set()
+    lemas = {}
+    for entry_id, entry in enumerate(entries):
+        for forma in [entry["palabra"]] + list(entry.get("formas") or ()):
+            clave = normalize_term(forma)
+            if clave:
+                claves.add((clave, entry_id))
+        lema = normalize_term(entry.get("lema") or entry["palabra"])
+        lemas.setdefault(lema, []).append(entry_id)
+
+    # JSON compacto escapa los saltos de línea, así que cada bloque es una entrada por línea
+    blob = bytearray()
+    bloques = array.array("I", [0])
+    for inicio in range(0, len(entries), ENTRADAS_POR_BLOQUE):
+        lineas = (json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+                  for entry in entries[inicio:inicio + ENTRADAS_POR_BLOQUE])
+        blob += zlib.compress("\n".join(lineas).encode("utf-8"), 9)
+        bloques.append(len(blob))
+
+    claves = sorted(claves)
+    lemas_ordenados = sorted(lemas)
+    lema_offsets = array.array("I", [0])
+    lema_entradas = array.array("I")
+    for lema in lemas_ordenados:
+        lema_entradas.extend(lemas[lema])
+        lema_offsets.append(len(lema_entradas))
+
+    secciones = [
+        ("entradas", blob),
+        ("entradas.bloques", bloques),
+        ("claves", _join_terms(clave for clave, _ in claves)),
+        ("claves.entrada", array.array("I", (entry_id for _, entry_id in claves))),
+        ("lemas", _join_terms(lemas_ordenados)),
+        ("lemas.offsets", lema_offsets),
+        ("lemas.entradas", lema_entradas),
+    ]
+    meta = {"version": dictionary_version(contenido), "entradas": len(entries)}
+    write_sections(path, MAGIA, FORMATO, meta, secciones)
+    return path
+
+
+def _bigrams(word):
+    padded = f"^{word}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _distance(a, b, limit):
+    """Distancia de edición entre a y b, o limit + 1 si es mayor que limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class Dictionary:
+    """Diccionario abierto con mmap; las entradas se decodifican al consultarlas."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._archivo = SectionFile(path, MAGIA, FORMATO)
+        except ArchivoError as e:
+            raise DiccionarioError(str(e)) from e
+        self.version = self._archivo.meta["version"]
+        self._n = self._archivo.meta["entradas"]
+        secciones = self._archivo.secciones
+        self._claves = self._split(secciones["claves"])
+        self._clave_entrada = secciones["claves.entrada"]
+        self._lemas = self._split(secciones["lemas"])
+        self._lema_ids = {lema: i for i, lema in enumerate(self._lemas)}
+        self._entry_lemma = None
+        self._bigramas = None
+        self._bloque = (None, None)
+
+    @staticmethod
+    def _split(blob):
+        return str(blob, "utf-8").split("\n") if len(blob) else []
+
+    def __len__(self):
+        return self._n
+
+    def close(self):
+        self._archivo.close()
+
+    def entry(self, entry_id):
+        """Entrada `entry_id` como diccionario, tal como está en el JSON."""
+        numero, posicion = divmod(entry_id, ENTRADAS_POR_BLOQUE)
+        # Se guarda el último bloque descomprimido: las entradas vecinas suelen pedirse juntas
+        actual, lineas = self._bloque
+        if actual != numero:
+            bloques = self._archivo.secciones["entradas.bloques"]
+            comprimido = self._archivo.secciones["entradas"][bloques[numero]:bloques[numero + 1]]
+            lineas = zlib.decompress(comprimido).split(b"\n")
+            self._bloque = (numero, lineas)
+        return json.loads(lineas[posicion].decode("utf-8"))
+
+    def _key_range(self, clave, prefix=False):
+        fin = clave + _FIN_PREFIJO if prefix else clave + "\x00"
+        return range(bisect_left(self._claves, clave), bisect_left(self._claves, fin))
+
+    def keys(self):
+        """Pares (clave normalizada, identificador de entrada), ordenados por clave."""
+        return zip(self._claves, self._clave_entrada)
+
+    def entry_id(self, word):
+        """Identificador de la entrada cuya palabra o alguna de sus formas coincide con `word`, o None."""
+        posiciones = self._key_range(normalize_term(word))
+        if not posiciones:
+            return None
+        return self._clave_entrada[posiciones[0]]
+
+    def get(self, word):
+        """Entrada cuya palabra o alguna de sus formas coincide con `word` normalizada, o None."""
+        entry_id = self.entry_id(word)
+        return self.entry(entry_id) if entry_id is not None else None
+
+    def lemma(self, word):
+        """Lema normalizado de la entrada de `word`, o None si no está en el diccionario."""
+        entry_id = self.entry_id(word)
+        if entry_id is None:
+            return None
+        if self._entry_lemma is None:
+            offsets = self._archivo.secciones["lemas.offsets"]
+            entradas = self._archivo.secciones["lemas.entradas"]
+            self._entry_lemma = {
+                entradas[k]: lema for i, lema in enumerate(self._lemas) for k in range(offsets[i], offsets[i + 1])
+            }
+        return self._entry_lemma.get(entry_id)
+
+    def lemma_entries(self, lemma):
+        """Entradas de un lema (normalizado o no), en el orden del vocabulario."""
+        lema_id = self._lema_ids.get(normalize_term(lemma))
+        if lema_id is None:
+            return []
+        offsets = self._archivo.secciones["lemas.offsets"]
+        entradas = self._archivo.secciones["lemas.entradas"]
+        return [self.entry(entradas[k]) for k in range(offsets[lema_id], offsets[lema_id + 1])]
+
+    def forms(self, word):
+        """Todas las formas (palabras y formas flexionadas) del lema de `word`, sin repetir."""
+        lema = self.lemma(word)
+        if lema is None:
+            return []
+        formas = {}
+        for entry in self.lemma_entries(lema):
+            for forma in [entry["palabra"]] + list(entry.get("formas") or ()):
+                formas.setdefault(forma, None)
+        return list(formas)
+
+    def _entries_for_keys(self, posiciones, limit):
+        resultado = {}
+        for posicion in posiciones:
+            entry_id = self._clave_entrada[posicion]
+            if entry_id not in resultado:
+                resultado[entry_id] = self._claves[posicion]
+                if len(resultado) >= limit:
+                    break
+        return [(clave, self.entry(entry_id)) for entry_id, clave in resultado.items()]
+
+    def prefix(self, prefix, limit=10):
+        """Hasta `limit` pares (clave, entrada) cuyas claves empiezan por `prefix`, en orden."""
+        clave = normalize_term(prefix)
+        if not clave:
+            return []
+        return self._entries_for_keys(self._key_range(clave, prefix=True), limit)
+
+    def fuzzy(self, word, limit=5, max_distance=2):
+        """
+        Hasta `limit` pares (clave, entrada) cuyas claves están a una distancia de edición de
+        `word` de como mucho `max_distance`, de la más parecida a la menos.
+        """
+        clave = normalize_term(word)
+        if not clave:
+            return []
+        if self._bigramas is None:
+            bigramas = {}
+            for posicion, candidata in enumerate(self._claves):
+                for bigrama in _bigrams(candidata):
+                    bigramas.setdefault(bigrama, []).append(posicion)
+            self._bigramas = bigramas
+
+        # Cada edición cambia como mucho dos bigramas: solo se comparan las claves que comparten
+        # suficientes bigramas con la consulta (todas, si la consulta es muy corta)
+        propios = _bigrams(clave)
+        minimo = len(propios) - 2 * max_distance
+        if minimo > 0:
+            comunes = {}
+            for bigrama in propios:
+                for posicion in self._bigramas.get(bigrama, ()):
+                    comunes[posicion] = comunes.get(posicion, 0) + 1
+            candidatas = [posicion for posicion, n in comunes.items() if n >= minimo]
+        else:
+            candidatas = range(len(self._claves))
+
+        distancias = []
+        for posicion in candidatas:
+            distancia = _distance(clave, self._claves[posicion], max_distance)
+            if distancia <= max_distance:
+                distancias.append((distancia, self._claves[posicion], posicion))
+        distancias.sort()
+        return self._entries_for_keys((posicion for _, _, posicion in distancias), limit)
+
+
+def load_dictionary(contenido=None, path=None, source=None):
+    """
+    Abre el diccionario y lo reconstruye si falta o si el vocabulario cambió.
+    `contenido` son los bytes del JSON (por ejemplo, descargados); si no se pasa se lee `source`,
+    por defecto vocabulario_nt.json del repositorio.
+    """
+    path = path or os.path.join(DIRECTORIO_DATOS, ARCHIVO_DICCIONARIO)
+    if contenido is None:
+        source = source or os.path.join(DIRECTORIO_DATOS, ARCHIVO_VOCABULARIO)
+        try:
+            with open(source, "rb") as f:
+                contenido = f.read()
+        except FileNotFoundError:
+            return Dictionary(path)
+
+    try:
+        dictionary = Dictionary(path)
+        if dictionary.version == dictionary_version(contenido):
+            return dictionary
+        dictionary.close()
+    except ArchivoError:
+        pass
+
+    build_dictionary(contenido, path)
+    return Dictionary(path)
@@ -0,0 +1,42 @@
+"""
+División de cada versículo en su texto en español y su texto en griego.
+
+El griego empieza en la primera palabra que contiene un carácter de los bloques
+Griego y copto (U+0370–U+03FF) o Griego extendido (U+1F00–U+1FFF), con o sin acentos;
+así una palabra como "[και" queda entera del lado griego.
+
+El corpus binario guarda el resultado ya dividido, de modo que la división se hace una sola vez
+por versión de los datos. split_series divide una columna completa de pandas de una vez para los
+datos que no vienen del corpus (por ejemplo, los CSV descargados).
+"""
+
+import re
+
+GREEK_CHARS = "\u0370-\u03FF\u1F00-\u1FFF"
+
+# Una palabra que contiene al menos un carácter griego
+_PALABRA_GRIEGA = re.compile(r"\S*[" + GREEK_CHARS + "]")
+
+# La misma regla para str.extract: todo lo anterior a esa palabra y el resto del versículo
+_DIVISION = r"(?s)^(.*?)(\S*[" + GREEK_CHARS + "].*)?$"
+
+
+def split_text(full_text):
+    """
+    Divide el texto de un versículo en español y griego.
+    Devuelve (texto_espanol, texto_griego); el griego es "" si el versículo no lo tiene.
+    """
+    match = _PALABRA_GRIEGA.search(full_text)
+    if match:
+        return full_text[:match.start()].strip(), full_text[match.start():].strip()
+    return full_text.strip(), ""
+
+
+def split_series(texts):
+    """
+    Divide una columna completa de pandas con los textos de los versículos.
+    Devuelve un DataFrame con las columnas texto_espanol y texto_griego.
+    """
+    partes = texts.fillna("").astype(str).str.extract(_DIVISION)
+    partes.columns = ["texto_espanol", "texto_griego"]
+    return partes.fillna("").apply(lambda columna: columna.str.strip())
@@ -0,0 +1,167 @@
+"""
+Lectura en flujo de nuevotestamentointerlineal.txt, la otra fuente de los datos.
+
+El archivo tiene, para cada capítulo, una línea de encabezado ("Mateo 1") y, para cada versículo,
+una línea en español y otra en griego que empiezan con el número del versículo, separadas por
+líneas en blanco. read_interlinear_txt lo recorre línea por línea y genera los Versiculo en orden
+sin cargar el archivo entero; build_corpus_from_txt los escribe con el mismo write_corpus que los
+CSV, en una sola pasada, y compare_sources los cruza con los CSV versículo por versículo.
+
+Se toleran las irregularidades del archivo: encabezados con el nombre corto del libro
+("1 Corintios 6"), líneas sin número (se numeran a continuación de la anterior) y versículos
+omitidos cuya línea griega es solo el número, un corchete o la marca "β".
+"""
+
+import hashlib
+import itertools
+import os
+import re
+from collections import namedtuple
+
+from .corpus import DIRECTORIO_DATOS, FORMATO, Versiculo, _book_hash, _source_path, read_book_csv, write_corpus
+from .division import GREEK_CHARS
+from .libros import ENCABEZADOS_TXT, LIBROS
+
+ARCHIVO_TXT = "nuevotestamentointerlineal.txt"
+# El corpus construido desde el texto no reemplaza al de los CSV, que es el que abren las aplicaciones
+ARCHIVO_CORPUS_TXT = "corpus_nt_txt.bin"
+
+_ENCABEZADO = re.compile(r"^(.+?)\s+(\d+)$")
+_NUMERADA = re.compile(r"^(\d+)\s*(.*)$")
+_GRIEGO = re.compile(f"[{GREEK_CHARS}]")
+# Lo que queda en la línea griega de un versículo omitido: nada, un corchete o la marca "β"
+_OMITIDO = re.compile(r"[\[\]β\s]*")
+
+Diferencia = namedtuple("Diferencia", "libro capitulo versiculo campo txt csv")
+
+# Campos que se comparan; el texto completo es la unión de los dos
+CAMPOS_COMPARADOS = ("texto_espanol", "texto_griego")
+
+
+class FuenteError(ValueError):
+    """El archivo de texto no tiene el formato esperado."""
+
+
+def _book_name(line):
+    """Nombre del libro (como en LIBROS) y capítulo si la línea es un encabezado; si no, None."""
+    match = _ENCABEZADO.match(line)
+    if not match:
+        return None
+    nombre = ENCABEZADOS_TXT.get(match.group(1), match.group(1))
+    if nombre not in LIBROS:
+        return None
+    return nombre, int(match.group(2))
+
+
+def _greek_text(texto):
+    """El texto griego, o "" si es solo lo que deja un versículo omitido."""
+    return "" if _OMITIDO.fullmatch(texto) or not _GRIEGO.search(texto) else texto
+
+
+def read_interlinear_txt(path):
+    """Lee el archivo de texto línea por línea y genera sus versículos ya divididos y tipados."""
+    libro = capitulo = None
+    espanol = None
+    anterior = 0
+    with open(path, encoding="utf-8") as f:
+        for numero_linea, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            encabezado = _book_name(line) if espanol is None else None
+            if encabezado:
+                (libro, capitulo), anterior = encabezado, 0
+                continue
+            if libro is None:
+                raise FuenteError(f"{path}:{numero_linea}: versículo antes del primer encabezado")
+
+            match = _NUMERADA.match(line)
+            numero, texto = (int(match.group(1)), match.group(2)) if match else (None, line)
+            if espanol is None:
+                espanol = (anterior + 1 if numero is None else numero, texto)
+                continue
+
+            versiculo, texto_espanol = espanol
+            espanol = None
+            if numero is not None and numero != versiculo:
+                raise FuenteError(f"{path}:{numero_linea}: se esperaba el griego del versículo {versiculo}, "
+                                  f"no del {numero}")
+            texto_griego = _greek_text(texto)
+            anterior = versiculo
+            yield Versiculo(
+                libro,
+                capitulo,
+                versiculo,
+                " ".join(parte for parte in (texto_espanol, texto_griego) if parte),
+                texto_espanol,
+                texto_griego,
+            )
+    if espanol is not None:
+        raise FuenteError(f"{path}: falta el griego del último versículo")
+
+
+def _verses_hash(verses):
+    lineas = (f"{v.capitulo}\t{v.versiculo}\t{v.texto_espanol}\t{v.texto_griego}\n" for v in verses)
+    return _book_hash("".join(lineas).encode("utf-8"))
+
+
+def txt_version(books):
+    """Versión de un corpus construido desde el texto, a partir del hash de cada libro."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{FORMATO}:txt".encode())
+    for book_name, book_hash, _ in books:
+        digest.update(f"{book_name}\x00{book_hash}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_corpus_from_txt(txt_path=None, path=None):
+    """
+    Construye el archivo del corpus a partir del archivo de texto, leído una sola vez.
+    Devuelve la ruta del archivo escrito.
+    """
+    txt_path = txt_path or os.path.join(DIRECTORIO_DATOS, ARCHIVO_TXT)
+    path = path or os.path.join(os.path.dirname(os.path.abspath(txt_path)), ARCHIVO_CORPUS_TXT)
+    books = []
+    for book_name, verses in itertools.groupby(read_interlinear_txt(txt_path), key=lambda v: v.libro):
+        verses = list(verses)
+        books.append((book_name, _verses_hash(verses), verses))
+    write_corpus(path, books, txt_version(books))
+    return path
+
+
+def _same_text(campo, a, b):
+    if campo == "texto_griego":
+        # Algunos CSV también guardan la marca de un versículo omitido como texto griego
+        a, b = _greek_text(a), _greek_text(b)
+    return a.split() == b.split()
+
+
+def _compare_book(book_name, txt_verses, csv_verses):
+    csv_por_clave = {(v.capitulo, v.versiculo): v for v in csv_verses}
+    for verse in txt_verses:
+        clave = (verse.capitulo, verse.versiculo)
+        otro = csv_por_clave.pop(clave, None)
+        if otro is None:
+            yield Diferencia(book_name, *clave, "versiculo", verse.texto, None)
+            continue
+        for campo in CAMPOS_COMPARADOS:
+            if not _same_text(campo, getattr(verse, campo), getattr(otro, campo)):
+                yield Diferencia(book_name, *clave, campo, getattr(verse, campo), getattr(otro, campo))
+    for clave, otro in csv_por_clave.items():
+        yield Diferencia(book_name, *clave, "versiculo", None, otro.texto)
+
+
+def compare_sources(txt_path=None, source_dir=DIRECTORIO_DATOS):
+    """
+    Compara el archivo de texto con los CSV versículo por versículo y genera una Diferencia por
+    cada campo distinto (sin contar los espacios) y por cada versículo que falta en una de las
+    dos fuentes (campo "versiculo", con None del lado que no lo tiene). Solo se tiene en memoria
+    un libro a la vez.
+    """
+    txt_path = txt_path or os.path.join(DIRECTORIO_DATOS, ARCHIVO_TXT)
+    pendientes = dict.fromkeys(LIBROS)
+    for book_name, verses in itertools.groupby(read_interlinear_txt(txt_path), key=lambda v: v.libro):
+        pendientes.pop(book_name, None)
+        yield from _compare_book(book_name, verses, read_book_csv(_source_path(source_dir, book_name), book_name))
+    for book_name in pendientes:
+        yield from _compare_book(book_name, (), read_book_csv(_source_path(source_dir, book_name), book_name))
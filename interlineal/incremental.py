@@ -0,0 +1,160 @@
+"""
+Actualización incremental del corpus y de sus índices cuando cambian algunos libros.
+
+El corpus, los índices y el DataFrame de las aplicaciones guardan la tabla de libros con la que
+se construyeron (nombre, rango de versículos y hash del CSV de origen). Al compararla con la del
+corpus nuevo, los libros con el mismo hash se copian de los datos anteriores, desplazando sus
+identificadores de versículo si cambió el tamaño de un libro anterior, y solo los libros cambiados
+se vuelven a leer, dividir e indexar. El resultado es el mismo que el de una construcción completa
+y los archivos se reemplazan de forma atómica, así que quien los tiene abiertos no se entera.
+"""
+
+import array
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# Tramo de versículos consecutivos del corpus nuevo. Si `copia`, [inicio, fin) son identificadores
+# de los datos anteriores que pasan a ser [inicio + desplazamiento, fin + desplazamiento); si no,
+# [inicio, fin) son identificadores del corpus nuevo que hay que volver a procesar.
+Tramo = namedtuple("Tramo", "copia inicio fin desplazamiento")
+
+# Mayor que cualquier identificador de versículo
+_SIN_FIN = 2 ** 32
+
+
+def plan_update(anteriores, actuales):
+    """
+    Tramos del corpus nuevo, en orden, a partir de las tablas de libros anterior y actual
+    (listas de diccionarios con nombre, inicio, fin y hash). Los libros sin cambios que ya eran
+    consecutivos se juntan en un solo tramo.
+    """
+    previos = {libro["nombre"]: libro for libro in anteriores}
+    tramos = []
+    for libro in actuales:
+        previo = previos.get(libro["nombre"])
+        if previo is None or previo["hash"] != libro["hash"] or \
+                previo["fin"] - previo["inicio"] != libro["fin"] - libro["inicio"]:
+            tramos.append(Tramo(False, libro["inicio"], libro["fin"], 0))
+            continue
+        desplazamiento = libro["inicio"] - previo["inicio"]
+        ultimo = tramos[-1] if tramos else None
+        if ultimo is not None and ultimo.copia and ultimo.fin == previo["inicio"] and \
+                ultimo.desplazamiento == desplazamiento:
+            tramos[-1] = ultimo._replace(fin=previo["fin"])
+        else:
+            tramos.append(Tramo(True, previo["inicio"], previo["fin"], desplazamiento))
+    return tramos
+
+
+def changed_ranges(tramos):
+    """Rangos [inicio, fin) del corpus nuevo que hay que volver a procesar."""
+    return [(tramo.inicio, tramo.fin) for tramo in tramos if not tramo.copia]
+
+
+def _shifted(segmento, desplazamiento, tipo, ancho):
+    valores = segmento.tolist()
+    valores[::ancho] = [v + desplazamiento for v in valores[::ancho]]
+    return array.array(tipo, valores)
+
+
+def _touches(versiculos, rangos):
+    """Si alguno de los versículos (ordenados) cae en alguno de los rangos [inicio, fin)."""
+    for inicio, fin in rangos:
+        posicion = bisect_left(versiculos, inicio)
+        if posicion < len(versiculos) and versiculos[posicion] < fin:
+            return True
+    return False
+
+
+def merge_postings(anterior, tramos, nuevos, tipo, ancho=1):
+    """
+    Lista de apariciones de un término en el corpus nuevo.
+    `anterior` es su lista plana en el índice anterior, ordenada por versículo, con `ancho` valores
+    por aparición (el primero, el versículo); `nuevos` da, para el índice de cada tramo que se volvió
+    a procesar, sus apariciones ya con los identificadores nuevos.
+    """
+    resultado = array.array(tipo)
+    versiculos = anterior[::ancho]
+    for i, tramo in enumerate(tramos):
+        if not tramo.copia:
+            resultado.extend(nuevos.get(i, ()))
+            continue
+        desde = bisect_left(versiculos, tramo.inicio)
+        hasta = bisect_left(versiculos, tramo.fin, desde)
+        if desde == hasta:
+            continue
+        segmento = anterior[desde * ancho:hasta * ancho]
+        if tramo.desplazamiento:
+            resultado.extend(_shifted(segmento, tramo.desplazamiento, tipo, ancho))
+        else:
+            resultado.frombytes(segmento.cast("B"))
+    return resultado
+
+
+def merge_index(terminos, offsets, datos, tramos, nuevos, tipo, ancho=1):
+    """
+    Une un índice invertido anterior con las apariciones de los tramos que se volvieron a procesar.
+    Las apariciones del término anterior k son datos[ancho * offsets[k]:ancho * offsets[k + 1]];
+    `nuevos` es {término: {índice del tramo: apariciones}}. Devuelve (términos, offsets, datos) del
+    índice nuevo, con los términos ordenados y sin los que se quedaron sin apariciones.
+    """
+    copias = [tramo for tramo in tramos if tramo.copia]
+    inicios = [tramo.inicio for tramo in copias]
+    sin_desplazar = all(tramo.desplazamiento == 0 for tramo in copias)
+    # Rangos del índice anterior que no se copian (los libros que cambiaron)
+    limites = [0] + [x for tramo in copias for x in (tramo.inicio, tramo.fin)] + [_SIN_FIN]
+    huecos = [(a, b) for a, b in zip(limites[::2], limites[1::2]) if a < b]
+    solo_nuevos = sorted(set(nuevos).difference(terminos))
+
+    nuevos_terminos = []
+    nuevos_offsets = array.array("I", [0])
+    partes = []
+    total = 0
+    vacio = array.array(tipo)
+    posiciones = ((termino, k) for k, termino in enumerate(terminos))
+    for termino, k in heapq.merge(posiciones, ((termino, None) for termino in solo_nuevos)):
+        segmento = vacio if k is None else datos[ancho * offsets[k]:ancho * offsets[k + 1]]
+        propios = nuevos.get(termino)
+        parte = None
+        if propios is None and len(segmento):
+            if sin_desplazar and not _touches(segmento[::ancho], huecos):
+                parte = segmento
+            # Si no, lo más común es que todas las apariciones caigan en un mismo tramo copiado
+            j = bisect_right(inicios, segmento[0]) - 1
+            if parte is None and j >= 0 and segmento[len(segmento) - ancho] < copias[j].fin:
+                desplazamiento = copias[j].desplazamiento
+                parte = _shifted(segmento, desplazamiento, tipo, ancho) if desplazamiento else segmento
+        if parte is None:
+            parte = merge_postings(segmento, tramos, propios or {}, tipo, ancho)
+        if not len(parte):
+            continue
+        partes.append(parte)
+        total += len(parte) // ancho
+        nuevos_terminos.append(termino)
+        nuevos_offsets.append(total)
+
+    nuevos_datos = array.array(tipo)
+    nuevos_datos.frombytes(b"".join(partes))
+    return nuevos_terminos, nuevos_offsets, nuevos_datos
+
+
+def copy_texts(offsets, blob, tramos, nuevos):
+    """
+    Une los textos de una columna (desplazamientos uint32 n + 1 y bytes en UTF-8) para el corpus nuevo:
+    los tramos copiados salen de `offsets`/`blob` y los demás de `nuevos[i]`, una lista de bytes.
+    Devuelve (offsets, blob).
+    """
+    nuevos_offsets = array.array("I", [0])
+    nuevo_blob = bytearray()
+    for i, tramo in enumerate(tramos):
+        if tramo.copia:
+            base = offsets[tramo.inicio]
+            ajuste = len(nuevo_blob) - base
+            nuevo_blob += blob[base:offsets[tramo.fin]]
+            nuevos_offsets.extend(o + ajuste for o in offsets[tramo.inicio + 1:tramo.fin + 1])
+        else:
+            for texto in nuevos[i]:
+                nuevo_blob += texto
+                nuevos_offsets.append(len(nuevo_blob))
+    return nuevos_offsets, nuevo_blob
@@ -0,0 +1,233 @@
+"""
+Índice invertido de palabras del corpus, con posiciones, para el texto en español y en griego.
+
+Para cada campo se guardan los términos normalizados ordenados y, por término, la lista de
+pares (versículo, posición de la palabra en el versículo). Las búsquedas de palabra completa
+y de comienzo de palabra se resuelven con búsquedas binarias sobre los términos, sin recorrer
+el corpus. El índice se guarda junto al corpus; cuando cambia su versión solo se vuelven a indexar
+los libros que cambiaron (ver incremental.py).
+"""
+
+import array
+import os
+from bisect import bisect_left
+
+from .archivo import ArchivoError, SectionFile, write_sections
+from .corpus import CAMPOS_NORMALIZADOS
+from .incremental import merge_index, plan_update
+from .normalizacion import split_words, tokenize
+
+MAGIA = b"NTINDICE"
+FORMATO = 1
+ARCHIVO_INDICE = "indice_nt.bin"
+
+CAMPOS = ("texto_espanol", "texto_griego")
+
+# Mayor que cualquier carácter, para delimitar el rango de términos con un prefijo
+_FIN_PREFIJO = "\U0010ffff"
+
+
+def _field_postings(corpus, campo, start=0, stop=None):
+    """Apariciones de cada término del campo en los versículos [start, stop), como listas planas."""
+    postings = {}
+    # El texto normalizado ya viene calculado en el corpus
+    for verse_id, text in enumerate(corpus.column(CAMPOS_NORMALIZADOS[campo], start, stop), start):
+        for position, word in enumerate(split_words(text)):
+            lista = postings.get(word)
+            if lista is None:
+                lista = postings[word] = array.array("I")
+            lista.append(verse_id)
+            lista.append(position)
+    return postings
+
+
+def _write_index(path, corpus, campos):
+    """`campos` da, para cada campo, sus términos ordenados, sus offsets y sus apariciones."""
+    secciones = []
+    for campo in CAMPOS:
+        terms, offsets, datos = campos[campo]
+        secciones.append((f"{campo}.terminos", "\n".join(terms).encode("utf-8")))
+        secciones.append((f"{campo}.offsets", offsets))
+        secciones.append((f"{campo}.postings", datos))
+
+    meta = {"version": corpus.version, "libros": corpus.tabla_libros}
+    write_sections(path, MAGIA, FORMATO, meta, secciones)
+
+
+def build_index(corpus, path):
+    """Construye el índice de palabras de `corpus` y lo escribe en `path`."""
+    campos = {}
+    for campo in CAMPOS:
+        postings = _field_postings(corpus, campo)
+        terms = sorted(postings)
+        offsets = array.array("I", [0])
+        datos = array.array("I")
+        for term in terms:
+            datos.extend(postings[term])
+            offsets.append(len(datos) // 2)
+        campos[campo] = (terms, offsets, datos)
+    _write_index(path, corpus, campos)
+    return path
+
+
+def update_index(index, corpus, path=None):
+    """
+    Actualiza `index`, construido para una versión anterior del corpus, volviendo a indexar solo
+    los libros que cambiaron; las apariciones de los demás se copian del índice anterior.
+    """
+    path = path or index.path
+    tramos = plan_update(index.tabla_libros, corpus.tabla_libros)
+    campos = {}
+    for campo in CAMPOS:
+        # Término -> {índice del tramo: apariciones en ese tramo}
+        nuevos = {}
+        for i, tramo in enumerate(tramos):
+            if not tramo.copia:
+                for term, lista in _field_postings(corpus, campo, tramo.inicio, tramo.fin).items():
+                    nuevos.setdefault(term, {})[i] = lista
+        secciones = index._archivo.secciones
+        campos[campo] = merge_index(index.terms(campo), secciones[f"{campo}.offsets"],
+                                    secciones[f"{campo}.postings"], tramos, nuevos, "I", ancho=2)
+
+    _write_index(path, corpus, campos)
+    return path
+
+
+class TokenIndex:
+    """Índice de palabras abierto con mmap; las listas de posiciones no se copian."""
+
+    def __init__(self, path):
+        self.path = path
+        self._archivo = SectionFile(path, MAGIA, FORMATO)
+        self.version = self._archivo.meta["version"]
+        # Tabla de libros del corpus indexado, para las actualizaciones incrementales
+        self.tabla_libros = self._archivo.meta.get("libros")
+        self._terms = {}
+        self._term_ids = {}
+        for campo in CAMPOS:
+            blob = self._archivo.secciones[f"{campo}.terminos"]
+            terms = str(blob, "utf-8").split("\n") if len(blob) else []
+            self._terms[campo] = terms
+            self._term_ids[campo] = {term: i for i, term in enumerate(terms)}
+
+    def close(self):
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def terms(self, campo):
+        """Términos normalizados del campo, en orden."""
+        return self._terms[campo]
+
+    def _postings_by_id(self, campo, term_id):
+        offsets = self._archivo.secciones[f"{campo}.offsets"]
+        datos = self._archivo.secciones[f"{campo}.postings"]
+        return datos[2 * offsets[term_id]:2 * offsets[term_id + 1]]
+
+    def postings(self, campo, term):
+        """
+        Pares (versículo, posición) de un término ya normalizado, como lista plana
+        [versículo, posición, versículo, posición, ...] ordenada por versículo.
+        """
+        term_id = self._term_ids[campo].get(term)
+        if term_id is None:
+            return memoryview(b"").cast("I")
+        return self._postings_by_id(campo, term_id)
+
+    def count(self, campo, term, prefix=False):
+        """
+        Apariciones de un término ya normalizado (o, con `prefix`, de todos los que empiezan por él),
+        calculadas con los offsets sin leer las listas: una cota del número de versículos.
+        """
+        offsets = self._archivo.secciones[f"{campo}.offsets"]
+        if prefix:
+            term_ids = self.prefix_terms(campo, term)
+            return offsets[term_ids.stop] - offsets[term_ids.start]
+        term_id = self._term_ids[campo].get(term)
+        return 0 if term_id is None else offsets[term_id + 1] - offsets[term_id]
+
+    def prefix_terms(self, campo, prefix):
+        """Identificadores de los términos del campo que empiezan por `prefix`."""
+        terms = self._terms[campo]
+        return range(bisect_left(terms, prefix), bisect_left(terms, prefix + _FIN_PREFIJO))
+
+    def _positions(self, campo, word, prefix):
+        """Conjunto de (versículo, posición) de una palabra, o de todas las que empiezan por ella."""
+        if not prefix:
+            pares = self.postings(campo, word)
+            return set(zip(pares[::2], pares[1::2]))
+        resultado = set()
+        for term_id in self.prefix_terms(campo, word):
+            pares = self._postings_by_id(campo, term_id)
+            resultado.update(zip(pares[::2], pares[1::2]))
+        return resultado
+
+    def verses(self, campo, query, prefix=False):
+        """
+        Versículos del campo que contienen la palabra (o la frase) `query`.
+        Con `prefix` la última palabra de la consulta puede ser solo el comienzo de una palabra.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        if len(words) == 1:
+            if not prefix:
+                return list(dict.fromkeys(self.postings(campo, words[0])[::2]))
+            verse_ids = set()
+            for term_id in self.prefix_terms(campo, words[0]):
+                verse_ids.update(self._postings_by_id(campo, term_id)[::2])
+            return sorted(verse_ids)
+
+        return sorted({v for v, _ in self.occurrences(campo, query, prefix)})
+
+    def occurrences(self, campo, query, prefix=False):
+        """
+        Pares (versículo, posición) ordenados donde empieza la palabra o la frase `query` en el campo.
+        Con `prefix` la última palabra de la consulta puede ser solo el comienzo de una palabra.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        ultima = len(words) - 1
+        # Frase: las palabras deben aparecer en posiciones consecutivas del mismo versículo
+        inicios = self._positions(campo, words[0], prefix=prefix and ultima == 0)
+        for offset, word in enumerate(words[1:], start=1):
+            if not inicios:
+                break
+            siguientes = self._positions(campo, word, prefix=prefix and offset == ultima)
+            inicios = {(v, p) for v, p in inicios if (v, p + offset) in siguientes}
+        return sorted(inicios)
+
+    def find(self, query, prefix=False, campos=CAMPOS):
+        """Versículos que contienen `query` en cualquiera de los campos, en orden canónico."""
+        verse_ids = set()
+        for campo in campos:
+            verse_ids.update(self.verses(campo, query, prefix))
+        return sorted(verse_ids)
+
+
+def load_index(corpus, path=None):
+    """
+    Abre el índice del corpus y lo reconstruye si falta; si corresponde a otra versión del corpus
+    solo vuelve a indexar los libros que cambiaron.
+    """
+    path = path or os.path.join(os.path.dirname(corpus.path), ARCHIVO_INDICE)
+    try:
+        index = TokenIndex(path)
+    except ArchivoError:
+        build_index(corpus, path)
+        return TokenIndex(path)
+
+    if index.version == corpus.version:
+        return index
+    with index:
+        if index.tabla_libros is None:
+            build_index(corpus, path)
+        else:
+            update_index(index, corpus, path)
+    return TokenIndex(path)
@@ -0,0 +1,56 @@
+"""
+Catálogo de los libros del Nuevo Testamento y de sus archivos CSV.
+
+El orden del diccionario es el orden canónico que usan todas las aplicaciones.
+"""
+
+# Nombre del libro tal como se muestra en las aplicaciones -> archivo CSV incluido en el repositorio
+LIBROS = {
+    "Mateo": "Mateo.csv",
+    "Marcos": "Marcos.csv",
+    "Lucas": "Lucas.csv",
+    "Juan": "Juan.csv",
+    "Hechos": "Hechos.csv",
+    "Romanos": "Romanos.csv",
+    "1º a los Corintios": "PrimeraCorintios.csv",
+    "2º a los Corintios": "SegundaCorintios.csv",
+    "Gálatas": "Gálatas.csv",
+    "Efesios": "Efesios.csv",
+    "Filipenses": "Filipenses.csv",
+    "Colosenses": "Colosenses.csv",
+    "1º a los Tesalonicenses": "PrimeraTesalonicenses.csv",
+    "2º a los Tesalonicenses": "SegundaTesalonicenses.csv",
+    "1º a Timoteo": "PrimeraTimoteo.csv",
+    "2º a Timoteo": "SegundaTimoteo.csv",
+    "Tito": "Tito.csv",
+    "Filemón": "Filemón.csv",
+    "Hebreos": "Hebreos.csv",
+    "Santiago": "Santiago.csv",
+    "1º de Pedro": "PrimeraPedro.csv",
+    "2º de Pedro": "SegundaPedro.csv",
+    "1º de Juan": "PrimeraJuan.csv",
+    "2º de Juan": "SegundaJuan.csv",
+    "3º de Juan": "TerceraJuan.csv",
+    "Judas": "Judas.csv",
+    "Apocalipsis": "Apocalipsis.csv",
+}
+
+# Nombre del libro en los encabezados de nuevotestamentointerlineal.txt -> nombre en LIBROS,
+# para los que no coinciden
+ENCABEZADOS_TXT = {
+    "Primera de Corintios": "1º a los Corintios",
+    "1 Corintios": "1º a los Corintios",
+    "Segunda de Corintios": "2º a los Corintios",
+    "Primera a los Tesalonicenses": "1º a los Tesalonicenses",
+    "Segunda a los Tesalonicenses": "2º a los Tesalonicenses",
+    "Primera a Timoteo": "1º a Timoteo",
+    "Segunda a Timoteo": "2º a Timoteo",
+    "Primera de Pedro": "1º de Pedro",
+    "Segunda de Pedro": "2º de Pedro",
+    "Primera de Juan": "1º de Juan",
+    "Segunda de Juan": "2º de Juan",
+    "Tercera de Juan": "3º de Juan",
+}
+
+# Base de las URL raw del repositorio en GitHub
+URL_BASE = "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/"
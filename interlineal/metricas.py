@@ -0,0 +1,234 @@
+"""
+Métricas de los caminos críticos: tiempo de cada etapa, consultas y fallos de las cachés y
+duración de cada ejecución de una aplicación.
+
+    with span("busqueda"):
+        ...
+
+Cada tramo medido con span() se suma a un histograma de latencias por etapa (carga, división,
+búsqueda, presentación...). Si ocurre dentro de run(), también se suma al resumen de esa ejecución,
+que se escribe en el log "interlineal.metricas" al terminar: así se ve en qué se fue el tiempo de
+cada recarga de una aplicación de Streamlit. Los tramos anidados cuentan también en el de afuera.
+
+Las métricas se guardan en memoria, por proceso, y export_text() las entrega en el formato de texto
+de Prometheus. La API las sirve en /metricas; en las aplicaciones de Streamlit, configure() abre un
+puerto propio si está definida INTERLINEAL_METRICAS_PUERTO y envía los resúmenes a stderr si está
+definida INTERLINEAL_METRICAS_LOG.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites superiores (en segundos) de las cubetas de los histogramas; la última es +Inf
+LIMITES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ETAPAS = "interlineal_etapa_segundos"
+EJECUCIONES = "interlineal_ejecucion_segundos"
+CONSULTAS_CACHE = "interlineal_cache_consultas_total"
+FALLOS_CACHE = "interlineal_cache_fallos_total"
+
+DESCRIPCIONES = {
+    ETAPAS: "Duración de cada etapa (carga, división, búsqueda, presentación...).",
+    EJECUCIONES: "Duración de cada ejecución completa de una aplicación.",
+    CONSULTAS_CACHE: "Consultas a cada caché.",
+    FALLOS_CACHE: "Consultas a cada caché que tuvieron que cargar o calcular el valor.",
+}
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+_LOG = logging.getLogger("interlineal.metricas")
+
+
+class _Histograma:
+    __slots__ = ("cubetas", "suma", "cuenta")
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+
+
+def _labels(etiquetas, **extra):
+    pares = list(etiquetas) + list(extra.items())
+    if not pares:
+        return ""
+    valores = (str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, valor in pares)
+    return "{" + ",".join(f'{nombre}="{valor}"' for (nombre, _), valor in zip(pares, valores)) + "}"
+
+
+class Registry:
+    """Contadores e histogramas de un proceso, por nombre y etiquetas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+
+    def count(self, nombre, valor=1, **etiquetas):
+        """Suma `valor` al contador `nombre` con esas etiquetas."""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observe(self, nombre, segundos, **etiquetas):
+        """Agrega una duración al histograma `nombre` con esas etiquetas."""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        cubeta = bisect_left(LIMITES, segundos)
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = _Histograma()
+            histograma.cubetas[cubeta] += 1
+            histograma.suma += segundos
+            histograma.cuenta += 1
+
+    def value(self, nombre, **etiquetas):
+        """Valor actual de un contador (0 si no existe)."""
+        return self._contadores.get((nombre, tuple(sorted(etiquetas.items()))), 0)
+
+    def export_text(self):
+        """Todas las métricas en el formato de texto de Prometheus."""
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((clave, (list(h.cubetas), h.suma, h.cuenta))
+                                 for clave, h in self._histogramas.items())
+
+        lineas = []
+        anterior = None
+        for (nombre, etiquetas), valor in contadores:
+            if nombre != anterior:
+                lineas += self._header(nombre, "counter")
+                anterior = nombre
+            lineas.append(f"{nombre}{_labels(etiquetas)} {valor}")
+        for (nombre, etiquetas), (cubetas, suma, cuenta) in histogramas:
+            if nombre != anterior:
+                lineas += self._header(nombre, "histogram")
+                anterior = nombre
+            acumulado = 0
+            for limite, n in zip(LIMITES + ("+Inf",), cubetas):
+                acumulado += n
+                lineas.append(f"{nombre}_bucket{_labels(etiquetas, le=limite)} {acumulado}")
+            lineas.append(f"{nombre}_sum{_labels(etiquetas)} {suma:.6f}")
+            lineas.append(f"{nombre}_count{_labels(etiquetas)} {cuenta}")
+        return "\n".join(lineas) + "\n" if lineas else ""
+
+    @staticmethod
+    def _header(nombre, tipo):
+        lineas = [f"# HELP {nombre} {DESCRIPCIONES[nombre]}"] if nombre in DESCRIPCIONES else []
+        return lineas + [f"# TYPE {nombre} {tipo}"]
+
+
+REGISTRO = Registry()
+
+# Etapas de la ejecución en curso en cada hilo (Streamlit ejecuta cada recarga en un hilo)
+_ejecucion = threading.local()
+
+
+def count(nombre, valor=1, **etiquetas):
+    REGISTRO.count(nombre, valor, **etiquetas)
+
+
+def count_lookup(cache):
+    """Registra una consulta a la caché `cache`."""
+    REGISTRO.count(CONSULTAS_CACHE, cache=cache)
+
+
+def count_miss(cache):
+    """Registra que una consulta a la caché `cache` tuvo que cargar o calcular el valor."""
+    REGISTRO.count(FALLOS_CACHE, cache=cache)
+
+
+@contextmanager
+def span(etapa):
+    """Mide el tiempo del bloque como la etapa `etapa`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        REGISTRO.observe(ETAPAS, segundos, etapa=etapa)
+        etapas = getattr(_ejecucion, "etapas", None)
+        if etapas is not None:
+            etapas[etapa] = etapas.get(etapa, 0.0) + segundos
+
+
+@contextmanager
+def run(app):
+    """
+    Mide una ejecución completa de la aplicación `app` y, al terminar (también si se interrumpe,
+    como con st.rerun), escribe en el log el tiempo total y el de cada etapa.
+    """
+    anteriores = getattr(_ejecucion, "etapas", None)
+    etapas = _ejecucion.etapas = {}
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        _ejecucion.etapas = anteriores
+        REGISTRO.observe(EJECUCIONES, segundos, app=app)
+        if _LOG.isEnabledFor(logging.INFO):
+            detalle = ", ".join(f"{etapa} {s * 1000:.1f} ms" for etapa, s in etapas.items())
+            _LOG.info("%s: %.1f ms (%s)", app, segundos * 1000, detalle or "sin etapas medidas")
+
+
+def export_text():
+    """Las métricas del proceso en el formato de texto de Prometheus."""
+    return REGISTRO.export_text()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        cuerpo = export_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_CONTENIDO)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_configuracion = threading.RLock()
+_exportador = None
+_configurado = False
+
+
+def start_exporter(port, host="127.0.0.1"):
+    """Sirve las métricas por HTTP en un hilo aparte (una sola vez por proceso) y devuelve el servidor."""
+    global _exportador
+    with _configuracion:
+        if _exportador is None:
+            _exportador = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _exportador.daemon_threads = True
+            threading.Thread(target=_exportador.serve_forever, name="interlineal-metricas", daemon=True).start()
+        return _exportador
+
+
+def configure():
+    """
+    Configura la exportación según el entorno, una sola vez por proceso; se puede llamar en cada ejecución.
+    INTERLINEAL_METRICAS_PUERTO: puerto donde servir las métricas (en INTERLINEAL_METRICAS_HOST,
+    por defecto 127.0.0.1). INTERLINEAL_METRICAS_LOG: si está definida, los resúmenes de cada
+    ejecución se escriben en stderr.
+    """
+    global _configurado
+    with _configuracion:
+        if _configurado:
+            return
+        _configurado = True
+        if os.environ.get("INTERLINEAL_METRICAS_LOG"):
+            _LOG.addHandler(logging.StreamHandler())
+            _LOG.setLevel(logging.INFO)
+        puerto = os.environ.get("INTERLINEAL_METRICAS_PUERTO")
+        if puerto:
+            try:
+                start_exporter(int(puerto), os.environ.get("INTERLINEAL_METRICAS_HOST", "127.0.0.1"))
+            except (ValueError, OSError) as e:
+                _LOG.warning("No se pudo abrir el puerto de métricas %s: %s", puerto, e)
@@ -0,0 +1,75 @@
+"""
+Normalización de texto para la búsqueda: sin acentos ni diacríticos y en minúsculas.
+
+La forma sin diacríticos de cada carácter (NFD sin las marcas combinantes) se guarda en una tabla
+para str.translate: los alfabetos latino y griego se calculan al importar el módulo y cualquier
+otro carácter la primera vez que aparece. Así normalizar un texto es una sola pasada en C en lugar
+de consultar unicodedata carácter por carácter. Las consultas, que se repiten mucho, se normalizan
+además con una caché LRU.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Una palabra del texto ya normalizado
+_PALABRA = re.compile(r"\w+")
+
+# Latín básico y extendido, marcas combinantes, griego y copto, griego extendido
+_RANGOS_PRECALCULADOS = ((0x0000, 0x0250), (0x0300, 0x0400), (0x1F00, 0x2000))
+
+
+class _TablaSinDiacriticos(dict):
+    """Tabla de str.translate que calcula y guarda la entrada de cada carácter la primera vez."""
+
+    def __missing__(self, codigo):
+        # Descompone el carácter y elimina los diacríticos (categoría Mn)
+        descompuesto = unicodedata.normalize('NFD', chr(codigo))
+        valor = ''.join(c for c in descompuesto if unicodedata.category(c) != 'Mn')
+        # translate es más rápido con códigos que con cadenas de un carácter
+        if not valor:
+            valor = None
+        elif len(valor) == 1:
+            valor = ord(valor)
+        self[codigo] = valor
+        return valor
+
+
+_TABLA = _TablaSinDiacriticos()
+for _inicio, _fin in _RANGOS_PRECALCULADOS:
+    for _codigo in range(_inicio, _fin):
+        _TABLA[_codigo]
+
+
+def strip_accents(text):
+    """Elimina acentos y diacríticos sin cambiar mayúsculas ni minúsculas (por ejemplo, en un patrón)."""
+    return text.translate(_TABLA)
+
+
+def normalize_greek(word):
+    """
+    Normaliza una palabra griega eliminando acentos y convirtiendo a minúsculas.
+    """
+    # Las minúsculas se aplican al final, sobre el texto entero, por la sigma final
+    return word.translate(_TABLA).lower()
+
+
+@lru_cache(maxsize=4096)
+def normalize_term(term):
+    """normalize_greek con caché, para los términos de búsqueda y del diccionario."""
+    return normalize_greek(term)
+
+
+def word_spans(text):
+    """Palabras de un texto, normalizado o no, como pares (inicio, palabra) en orden."""
+    return [(match.start(), match.group()) for match in _PALABRA.finditer(text)]
+
+
+def split_words(normalized_text):
+    """Divide un texto ya normalizado en sus palabras, en orden."""
+    return _PALABRA.findall(normalized_text)
+
+
+def tokenize(text):
+    """Divide un texto en sus palabras normalizadas, en orden."""
+    return split_words(normalize_greek(text))
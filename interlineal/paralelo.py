@@ -0,0 +1,114 @@
+"""
+Búsqueda repartida por libros entre un grupo de procesos.
+
+Las búsquedas que ningún índice resuelve (expresiones regulares, o cualquier modo sin índices)
+recorren el texto normalizado de todo el corpus, y en un solo hilo el GIL deja ociosos los demás
+núcleos. ParallelSearch mantiene un grupo de procesos que abren el corpus una sola vez con mmap,
+así que todos comparten las mismas páginas sin copiar los datos, y reparte cada búsqueda en un
+tramo por libro. Cada proceso devuelve los versículos de su libro ya ordenados, y como los tramos
+se recorren en orden canónico, el resultado se une sin volver a ordenarlo. Con una sola CPU no
+conviene: parallel_search no crea el grupo y la búsqueda se hace en el mismo proceso.
+
+Los tramos salen del corpus que lee el proceso principal al crear el grupo, así que todos los
+procesos se arrancan en ese momento y se comprueba que abrieron esa misma versión: si el archivo se
+reemplaza después, siguen viendo la que abrieron. Cada tramo lleva además la versión esperada, y un
+proceso con otra no lo recorre (CorpusError).
+"""
+
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+from .busqueda import CAMPOS, matcher, scan
+from .corpus import Corpus, CorpusError
+
+# Corpus abierto en cada proceso del grupo
+_corpus = None
+
+
+def _open_corpus(path):
+    global _corpus
+    _corpus = Corpus(path)
+
+
+def _corpus_version(_):
+    return _corpus.version
+
+
+def _scan_range(tarea):
+    term, modo, inicio, fin, campos, version = tarea
+    if _corpus.version != version:
+        raise CorpusError(f"El proceso abrió la versión {_corpus.version} del corpus, no la {version}")
+    return scan(_corpus, term, modo, inicio, fin, campos)
+
+
+def _context():
+    # Con forkserver los procesos no heredan los hilos del servidor (Streamlit, la API)
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+
+class ParallelSearch:
+    """
+    Grupo de `procesos` procesos (por defecto, uno por CPU) que buscan en el corpus de `corpus_path`.
+    Sigue abierto hasta close() o hasta que se libera el objeto; si el archivo del corpus se reemplaza,
+    los procesos siguen viendo la versión que abrieron (la de `version`). Si se pasa `version` y el
+    archivo ya es de otra, o cambia mientras arrancan los procesos, lanza CorpusError.
+    """
+
+    def __init__(self, corpus_path, procesos=None, version=None):
+        self.path = corpus_path
+        with Corpus(corpus_path) as corpus:
+            self.version = corpus.version
+            self.libros = corpus.libros
+            self._rangos = [corpus.book_range(book_name) for book_name in corpus.libros]
+        if version is not None and version != self.version:
+            raise CorpusError(f"{corpus_path} es de la versión {self.version}, no de la {version}")
+        self.procesos = procesos or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_context(),
+                                             initializer=_open_corpus, initargs=(corpus_path,))
+        self._finalizador = weakref.finalize(self, self._executor.shutdown, cancel_futures=True)
+
+        # El grupo crea un proceso por cada tarea mientras no tenga uno libre: con una tarea por proceso,
+        # enviadas juntas, arrancan todos ahora y abren la versión que se acaba de leer
+        versiones = set(self._executor.map(_corpus_version, range(self.procesos)))
+        if versiones != {self.version}:
+            self.close()
+            raise CorpusError(f"{corpus_path} cambió mientras arrancaban los procesos")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._finalizador()
+
+    def find(self, term, modo, books=None, campos=CAMPOS):
+        """Versículos que contienen `term` en `campos` (en los libros `books`, o en todos), en orden canónico."""
+        # Los errores del término (por ejemplo, una expresión regular no válida) se detectan aquí
+        matcher(term, modo)
+        libros = set(books) if books else None
+        tareas = [(term, modo, inicio, fin, tuple(campos), self.version)
+                  for book_name, (inicio, fin) in zip(self.libros, self._rangos)
+                  if (libros is None or book_name in libros) and fin > inicio]
+        verse_ids = []
+        for parte in self._executor.map(_scan_range, tareas):
+            verse_ids.extend(parte)
+        return verse_ids
+
+
+def parallel_search(corpus_path, procesos=None, version=None):
+    """
+    ParallelSearch con `procesos` procesos (por defecto, uno por CPU), o None si sería uno solo o si el
+    corpus ya no es de la versión `version` (entonces se busca en el mismo proceso).
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if procesos <= 1:
+        return None
+    try:
+        return ParallelSearch(corpus_path, procesos, version)
+    except CorpusError:
+        return None
@@ -0,0 +1,195 @@
+"""
+Carga perezosa de los libros para el modo lector.
+
+Cada libro se carga la primera vez que se pide; mientras tanto no ocupa memoria. Opcionalmente se
+precargan en segundo plano los libros vecinos (en orden canónico), que son los que el lector suele
+abrir después. Si dos sesiones piden a la vez un libro que aún no está cargado, se carga una sola vez.
+Los pedidos y las cargas se registran en las métricas como la caché "libros" (metricas.py).
+
+books_store arma los libros de las aplicaciones de lectura (desde el corpus local o, sin él, desde
+sus URL) en un SharedStore: todas las sesiones comparten los mismos libros, y cuando cambian los CSV
+(o, si se descargaron, cada hora) se reemplazan enteros por otros que se vuelven a leer al abrirlos.
+"""
+
+import io
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from . import metricas
+from .almacen import SharedStore, data_version
+from .capitulos import ChapterIndex
+from .corpus import DIRECTORIO_DATOS, CorpusError, load_corpus
+from .descarga import book_fallbacks, fetch_all
+from .division import split_series
+
+# Sin cambios en los CSV incluidos, los libros descargados se vuelven a pedir como mucho cada hora
+RECARGA_DESCARGAS = 3600
+
+
+class LibroError(Exception):
+    """Un libro no se pudo cargar; el mensaje explica por qué, para mostrarlo."""
+
+
+class LazyCorpus:
+    """
+    Libros que se cargan bajo demanda con `loader(nombre)`.
+    `prefetch` es cuántos libros vecinos a cada lado se precargan en segundo plano (0 para ninguno).
+    Si `loader` devuelve None el resultado no se guarda y se vuelve a intentar en el siguiente pedido;
+    si lanza una excepción tampoco se guarda, y get la lanza en el hilo que pidió el libro (una
+    precarga fallida no avisa a nadie: el libro se vuelve a cargar cuando se pide).
+    """
+
+    def __init__(self, book_names, loader, prefetch=1, max_workers=2):
+        self.libros = tuple(book_names)
+        self._loader = loader
+        self._prefetch = prefetch
+        self._books = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers) if prefetch else None
+
+    def __getitem__(self, book_name):
+        return self.get(book_name)
+
+    def __contains__(self, book_name):
+        return book_name in self.libros
+
+    def get(self, book_name):
+        """Devuelve los datos del libro, cargándolo si hace falta."""
+        if book_name not in self.libros:
+            raise KeyError(book_name)
+
+        metricas.count_lookup("libros")
+        with self._lock:
+            if book_name in self._books:
+                data = self._books[book_name]
+                future = None
+            else:
+                future = self._pending.get(book_name)
+                propio = future is None
+                if propio:
+                    future = self._pending[book_name] = Future()
+
+        if future is not None:
+            if propio:
+                self._load_into(book_name, future)
+            data = future.result()
+
+        if self._prefetch:
+            self._prefetch_neighbours(book_name)
+        return data
+
+    def loaded(self):
+        """Nombres de los libros ya cargados, en orden canónico."""
+        with self._lock:
+            return tuple(book_name for book_name in self.libros if book_name in self._books)
+
+    def _load_into(self, book_name, future):
+        metricas.count_miss("libros")
+        try:
+            with metricas.span("carga.libro"):
+                data = self._loader(book_name)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[book_name]
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            del self._pending[book_name]
+            if data is not None:
+                self._books[book_name] = data
+        future.set_result(data)
+
+    def _prefetch_neighbours(self, book_name):
+        posicion = self.libros.index(book_name)
+        for distancia in range(1, self._prefetch + 1):
+            for vecino in (posicion + distancia, posicion - distancia):
+                if 0 <= vecino < len(self.libros):
+                    self.prefetch(self.libros[vecino])
+
+    def prefetch(self, book_name):
+        """Programa la carga del libro en segundo plano si todavía no está cargado ni pedido."""
+        if self._executor is None:
+            return
+        with self._lock:
+            if book_name in self._books or book_name in self._pending:
+                return
+            future = self._pending[book_name] = Future()
+        self._executor.submit(self._load_into, book_name, future)
+
+
+def read_book_csv(contenido):
+    """
+    DataFrame de un libro a partir del contenido (bytes) de su CSV, con el texto ya separado en
+    español y griego. Si el CSV no se puede leer o está vacío lanza LibroError.
+    """
+    import pandas as pd
+
+    try:
+        df = pd.read_csv(io.BytesIO(contenido), sep=',', encoding='utf-8')
+        # Convierte las columnas a tipos de datos correctos
+        df['Capítulo'] = pd.to_numeric(df['Capítulo'], errors='coerce').fillna(0).astype(int)
+        df['Versículo'] = pd.to_numeric(df['Versículo'], errors='coerce').fillna(0).astype(int)
+        # Separa el texto en español y griego una sola vez, para toda la columna
+        with metricas.span("division"):
+            df[['texto_espanol', 'texto_griego']] = split_series(df['Texto'])
+    except Exception as e:
+        raise LibroError(f"Ocurrió un error inesperado al procesar el archivo: {e}. Por favor, verifica el formato.") from e
+    if df.empty:
+        raise LibroError("Error: El archivo de texto está vacío o tiene un formato incorrecto.")
+    return df
+
+
+def lazy_books(urls, source_dir=DIRECTORIO_DATOS, prefetch=1):
+    """
+    LazyCorpus con los libros de `urls` (nombre -> URL), cada uno como (DataFrame, índice de capítulos).
+    Cada libro se lee la primera vez que se abre, desde el corpus local o, si no está disponible, desde
+    su URL (con la copia incluida como respaldo). Un libro que no se puede cargar lanza LibroError al pedirlo.
+    El atributo `descargados` del LazyCorpus indica si los libros vienen de sus URL.
+    """
+    try:
+        corpus = load_corpus(source_dir=source_dir)
+    except (CorpusError, OSError):
+        corpus = None
+
+    def load_book(book_name):
+        if corpus is not None:
+            df = corpus.to_dataframe(*corpus.book_range(book_name)).reset_index(drop=True)
+        else:
+            descarga = fetch_all({book_name: urls[book_name]}, fallbacks=book_fallbacks(source_dir))[book_name]
+            if descarga.contenido is None:
+                raise LibroError(f"Error al cargar datos desde la URL: {descarga.error}")
+            df = read_book_csv(descarga.contenido)
+        return df, ChapterIndex.from_frame(df, book_name)
+
+    books = LazyCorpus(urls, load_book, prefetch=prefetch)
+    books.descargados = corpus is None
+    return books
+
+
+def books_store(urls, source_dir=DIRECTORIO_DATOS, prefetch=1, reload_every=RECARGA_DESCARGAS):
+    """
+    SharedStore con los lazy_books de `urls` para todas las sesiones. Se reemplaza cuando cambian los
+    CSV incluidos y, si los libros se descargaron, también `reload_every` segundos después de cargarlos,
+    para que se vean las correcciones de los descargados; los libros del nuevo LazyCorpus se leen al
+    abrirlos. Los libros del corpus local no se reemplazan mientras no cambien los CSV.
+    """
+    # La versión se calcula antes de cada carga, así que el plazo de los descargados se cuenta aquí:
+    # cada renovación cambia la versión una vez, y la carga que sigue vuelve a empezar el plazo
+    descargas = {"desde": None, "renovaciones": 0}
+
+    def load():
+        books = lazy_books(urls, source_dir, prefetch)
+        descargas["desde"] = time.monotonic() if books.descargados else None
+        return books
+
+    def version():
+        desde = descargas["desde"]
+        if desde is not None and time.monotonic() - desde >= reload_every:
+            descargas["desde"] = None
+            descargas["renovaciones"] += 1
+        return data_version(source_dir), descargas["renovaciones"]
+
+    return SharedStore(load, version=version, name="lector")
@@ -0,0 +1,67 @@
+"""
+Presentación de un capítulo completo como un solo bloque HTML, y de los resultados de búsqueda
+con sus coincidencias resaltadas.
+
+En lugar de enviar dos o tres elementos de Streamlit por versículo, el capítulo entero se arma
+en una sola pasada y se muestra con un único st.markdown. Los textos se escapan, y el bloque no
+contiene líneas en blanco para que el intérprete de Markdown lo trate como HTML sin tocar los
+corchetes, asteriscos o guiones bajos del texto.
+"""
+
+from html import escape
+
+# Estilo del lector: encabezado "Versículo N" y un párrafo para cada idioma
+_LECTOR = (
+    "<p style='font-weight:bold;margin-bottom:0.25rem;'>Versículo {versiculo}</p>"
+    "<p style='{estilo}'>{espanol}</p>"
+    "{griego}"
+)
+_LECTOR_GRIEGO = "<p style='{estilo}'><i>{griego}</i></p>"
+
+# Estilo compacto: número en negrita delante del español y el griego en cursiva debajo
+_COMPACTO = "<p><span style='{estilo}'><b>{versiculo}</b> {espanol}</span>{griego}</p>"
+_COMPACTO_GRIEGO = "<br><span style='font-family:serif;font-style:italic;{estilo}'>{griego}</span>"
+
+_PLANTILLAS = {
+    "lector": (_LECTOR, _LECTOR_GRIEGO),
+    "compacto": (_COMPACTO, _COMPACTO_GRIEGO),
+}
+
+
+def chapter_html(verses, font_size, layout="lector", color=None):
+    """
+    Arma el HTML de un capítulo a partir de `verses`, tuplas (versículo, español, griego).
+    `font_size` es un tamaño CSS (por ejemplo "18px") y `layout` es "lector" o "compacto".
+    Devuelve (html, sin_griego), donde sin_griego son los números de los versículos sin texto griego.
+    """
+    plantilla, plantilla_griego = _PLANTILLAS[layout]
+    estilo = f"font-size:{font_size};"
+    if color:
+        estilo = f"color:{color};{estilo}"
+
+    partes = []
+    sin_griego = []
+    for versiculo, espanol, griego in verses:
+        if griego:
+            griego = plantilla_griego.format(estilo=estilo, griego=escape(griego))
+        else:
+            sin_griego.append(versiculo)
+        partes.append(plantilla.format(
+            versiculo=versiculo,
+            estilo=estilo,
+            espanol=escape(espanol),
+            griego=griego,
+        ))
+    return "<div>" + "".join(partes) + "</div>", sin_griego
+
+
+def highlight_html(texto, fragmentos):
+    """Texto escapado con los `fragmentos` ((inicio, fin) en caracteres, ordenados) dentro de <mark>."""
+    partes = []
+    anterior = 0
+    for inicio, fin in fragmentos:
+        partes.append(escape(texto[anterior:inicio]))
+        partes.append(f"<mark>{escape(texto[inicio:fin])}</mark>")
+        anterior = fin
+    partes.append(escape(texto[anterior:]))
+    return "".join(partes)
@@ -0,0 +1,413 @@
+"""
+Mediciones de los caminos críticos, sin red y con los CSV incluidos en el repositorio.
+
+    python -m interlineal medir --salida medidas.json
+    python -m interlineal medir --comparar medidas_anteriores.json
+
+Los datos se copian a un directorio temporal, así que los archivos del repositorio no se tocan.
+Cada medición se repite varias veces después de una pasada de calentamiento y se guarda en JSON
+con el tiempo de cada repetición, el mínimo y la mediana, junto con el commit, la versión de
+Python y la plataforma. Con --comparar se muestra la razón entre las medianas de dos archivos y
+se termina con error si alguna medición empeora más que el umbral.
+"""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .busqueda import search
+from .corpus import DIRECTORIO_DATOS, Corpus, build_corpus, read_book_csv, _source_path
+from .diccionario import ARCHIVO_VOCABULARIO, load_dictionary
+from .division import split_text
+from .indice import build_index, load_index
+from .libros import LIBROS
+from .normalizacion import normalize_greek, normalize_term
+from .paralelo import parallel_search
+from .presentacion import chapter_html
+from .subcadena import build_substring_index, load_substring_index
+from .tokens import build_tokens
+
+FORMATO_MEDIDAS = 1
+
+# Una razón de medianas mayor que esta se considera una regresión
+UMBRAL = 1.25
+# Diferencias menores que esta (en segundos) se consideran ruido
+RUIDO = 0.001
+
+TERMINO_RARO = "πορνεια"
+TERMINO_COMUN = "de"
+# Sin índice que la resuelva: recorre todo el corpus
+TERMINO_REGEX = r"\bθε\w*\b.*\bχριστ"
+# Un término muy frecuente con una frase rara, y una expresión regular acotada por una palabra
+CONSULTA_FRASE = 'de AND "hijo de david"'
+CONSULTA_REGEX = r"gr:πνευμα AND /αγι\w+/ NOT es:santo"
+# Proximidad entre dos palabras de frecuencia parecida (cruza sus posiciones) y entre una muy
+# frecuente y una rara (verifica los versículos de la rara)
+CONSULTA_CERCA = "de NEAR/2 la"
+CONSULTA_CERCA_RARA = "de NEAR/3 david"
+
+
+def _split_text_loop(full_text):
+    """El bucle por caracteres original de app73.py, como referencia para split_text."""
+    spanish_text = ""
+    greek_text = ""
+    found_greek_start = False
+    for char in full_text:
+        if 'Ͱ' <= char <= 'Ͽ' or 'ἀ' <= char <= '῿':
+            found_greek_start = True
+        if not found_greek_start:
+            spanish_text += char
+        else:
+            greek_text += char
+    return spanish_text.strip(), greek_text.strip()
+
+
+class _Entorno:
+    """Copia de los datos en un directorio temporal, con el corpus y los índices ya construidos."""
+
+    def __init__(self, source_dir):
+        self.dir = tempfile.mkdtemp(prefix="interlineal-medir-")
+        for book_name in LIBROS:
+            shutil.copy(_source_path(source_dir, book_name), self.dir)
+        vocabulario = os.path.join(source_dir, ARCHIVO_VOCABULARIO)
+        if os.path.exists(vocabulario):
+            shutil.copy(vocabulario, self.dir)
+
+        self.corpus = Corpus(build_corpus(self.dir))
+        self.index = load_index(self.corpus)
+        self.substring_index = load_substring_index(self.corpus)
+        try:
+            self.dictionary = load_dictionary(path=os.path.join(self.dir, "diccionario.bin"),
+                                              source=os.path.join(self.dir, ARCHIVO_VOCABULARIO))
+        except OSError:
+            self.dictionary = None
+        self.textos = self.corpus.column("texto")
+        # Grupo de procesos de las búsquedas repartidas, creado por la primera medición que lo usa
+        self.paralelo = None
+
+    def path(self, nombre):
+        return os.path.join(self.dir, nombre)
+
+    def close(self):
+        for datos in (self.paralelo, self.corpus, self.index, self.substring_index, self.dictionary):
+            if datos is not None:
+                datos.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+# Cada medición recibe el entorno y devuelve (función a medir, operaciones por llamada),
+# o None si no se puede medir en este entorno (por ejemplo, sin pandas).
+
+def _load_csv(entorno):
+    def run():
+        for book_name in LIBROS:
+            list(read_book_csv(_source_path(entorno.dir, book_name), book_name))
+    return run, len(LIBROS)
+
+
+def _load_csv_pandas(entorno):
+    try:
+        import pandas as pd
+    except ImportError:
+        return None
+    from .division import split_series
+
+    def run():
+        # Lo mismo que load_data_from_content de app73.py, libro por libro
+        for book_name in LIBROS:
+            df = pd.read_csv(_source_path(entorno.dir, book_name), sep=",")
+            df["Capítulo"] = pd.to_numeric(df["Capítulo"], errors="coerce").fillna(0).astype(int)
+            df["Versículo"] = pd.to_numeric(df["Versículo"], errors="coerce").fillna(0).astype(int)
+            df[["texto_espanol", "texto_griego"]] = split_series(df["Texto"])
+    return run, len(LIBROS)
+
+
+def _build_corpus(entorno):
+    return lambda: build_corpus(entorno.dir, entorno.path("medicion_corpus.bin")), 1
+
+
+def _corpus_dataframe(entorno):
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return None
+
+    def run():
+        # El camino de load_all_data: abrir el corpus y armar el DataFrame
+        with Corpus(entorno.corpus.path) as corpus:
+            corpus.to_dataframe()
+    return run, 1
+
+
+def _arrow_dataframe(entorno):
+    from .columnas import build_columnar, read_dataframe
+
+    try:
+        path = build_columnar(entorno.corpus, entorno.path("medicion_corpus.arrow"))
+    except ImportError:
+        return None
+    # El mismo DataFrame que corpus_dataframe, abierto con mmap desde las columnas de Arrow
+    return lambda: read_dataframe(path), 1
+
+
+def _build_index(entorno):
+    return lambda: build_index(entorno.corpus, entorno.path("medicion_indice.bin")), 1
+
+
+def _build_substring_index(entorno):
+    return lambda: build_substring_index(entorno.corpus, entorno.path("medicion_subcadenas.bin")), 1
+
+
+def _build_tokens(entorno):
+    return lambda: build_tokens(entorno.corpus, entorno.path("medicion_tokens.bin")), 1
+
+
+def _split(entorno):
+    return lambda: [split_text(texto) for texto in entorno.textos], len(entorno.textos)
+
+
+def _split_loop(entorno):
+    return lambda: [_split_text_loop(texto) for texto in entorno.textos], len(entorno.textos)
+
+
+def _split_series(entorno):
+    try:
+        import pandas as pd
+    except ImportError:
+        return None
+    from .division import split_series
+
+    columna = pd.Series(entorno.textos)
+    return lambda: split_series(columna), len(entorno.textos)
+
+
+def _normalize(entorno):
+    return lambda: [normalize_greek(texto) for texto in entorno.textos], len(entorno.textos)
+
+
+def _normalize_terms(entorno):
+    terminos = entorno.index.terms("texto_griego")[:2000]
+
+    def run():
+        # Con la caché llena, como las consultas repetidas de las aplicaciones
+        for termino in terminos:
+            normalize_term(termino)
+    return run, len(terminos)
+
+
+def _search(termino, modo, indices=True, paralela=False):
+    def medicion(entorno):
+        index = entorno.index if indices else None
+        substring_index = entorno.substring_index if indices else None
+        if paralela and entorno.paralelo is None:
+            entorno.paralelo = parallel_search(entorno.corpus.path, version=entorno.corpus.version)
+            if entorno.paralelo is None:
+                # Con una sola CPU no se crea el grupo de procesos
+                return None
+        executor = entorno.paralelo if paralela else None
+
+        def run():
+            # El total y la primera página, como las aplicaciones
+            occurrences = search(entorno.corpus, termino, modo, index, substring_index, executor=executor)
+            occurrences.page(1, 50)
+            return len(occurrences)
+        return run, 1
+    return medicion
+
+
+def _dictionary_lookup(entorno):
+    if entorno.dictionary is None:
+        return None
+    palabras = [clave for clave, _ in entorno.dictionary.keys()] + ["noexiste", "λογοσ", "αγαπη"]
+
+    def run():
+        for palabra in palabras:
+            entorno.dictionary.get(palabra)
+    return run, len(palabras)
+
+
+def _dictionary_suggest(entorno):
+    if entorno.dictionary is None:
+        return None
+
+    def run():
+        entorno.dictionary.prefix("λο")
+        entorno.dictionary.fuzzy("λογοζ")
+    return run, 1
+
+
+def _render(layout):
+    def medicion(entorno):
+        corpus = entorno.corpus
+        # El capítulo más largo del corpus
+        capitulos = {}
+        for i in range(len(corpus)):
+            capitulos.setdefault((corpus.libro_ids[i], corpus.capitulos[i]), []).append(i)
+        filas = max(capitulos.values(), key=len)
+        versiculos = [(corpus.versiculos[i], corpus.texto_espanol(i), corpus.texto_griego(i)) for i in filas]
+        return lambda: chapter_html(versiculos, "18px", layout=layout), len(versiculos)
+    return medicion
+
+
+# Nombre -> (medición, repeticiones máximas); las construcciones completas se repiten menos
+MEDICIONES = {
+    "carga.csv": (_load_csv, None),
+    "carga.csv_pandas": (_load_csv_pandas, None),
+    "carga.construir_corpus": (_build_corpus, 3),
+    "carga.corpus_dataframe": (_corpus_dataframe, None),
+    "carga.arrow_dataframe": (_arrow_dataframe, None),
+    "indices.palabras": (_build_index, 3),
+    "indices.subcadenas": (_build_substring_index, 1),
+    "indices.tokens": (_build_tokens, 3),
+    "division.split_text": (_split, None),
+    "division.bucle_caracteres": (_split_loop, None),
+    "division.split_series": (_split_series, None),
+    "normalizacion.normalize_greek": (_normalize, None),
+    "normalizacion.normalize_term": (_normalize_terms, None),
+    "busqueda.raro_palabra": (_search(TERMINO_RARO, "palabra"), None),
+    "busqueda.raro_secuencia": (_search(TERMINO_RARO, "secuencia"), None),
+    "busqueda.comun_palabra": (_search(TERMINO_COMUN, "palabra"), None),
+    "busqueda.comun_secuencia": (_search(TERMINO_COMUN, "secuencia"), None),
+    "busqueda.comun_prefijo": (_search(TERMINO_COMUN, "prefijo"), None),
+    "busqueda.raro_palabra_sin_indice": (_search(TERMINO_RARO, "palabra", indices=False), None),
+    "busqueda.comun_secuencia_sin_indice": (_search(TERMINO_COMUN, "secuencia", indices=False), None),
+    "busqueda.regex": (_search(TERMINO_REGEX, "regex"), None),
+    "busqueda.regex_paralela": (_search(TERMINO_REGEX, "regex", paralela=True), None),
+    "busqueda.consulta_frase": (_search(CONSULTA_FRASE, "consulta"), None),
+    "busqueda.consulta_regex": (_search(CONSULTA_REGEX, "consulta"), None),
+    "busqueda.consulta_frase_sin_indice": (_search(CONSULTA_FRASE, "consulta", indices=False), None),
+    "busqueda.consulta_cerca": (_search(CONSULTA_CERCA, "consulta"), None),
+    "busqueda.consulta_cerca_rara": (_search(CONSULTA_CERCA_RARA, "consulta"), None),
+    "diccionario.consulta": (_dictionary_lookup, None),
+    "diccionario.sugerencias": (_dictionary_suggest, None),
+    "presentacion.capitulo_lector": (_render("lector"), None),
+    "presentacion.capitulo_compacto": (_render("compacto"), None),
+}
+
+
+def _time(funcion, repeticiones):
+    funcion()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _commit(source_dir):
+    try:
+        resultado = subprocess.run(["git", "rev-parse", "HEAD"], cwd=source_dir, capture_output=True,
+                                   text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return resultado.stdout.strip() or None
+
+
+def run_benchmarks(source_dir=DIRECTORIO_DATOS, repeticiones=5, filtro=None, progreso=None):
+    """
+    Ejecuta las mediciones (las que contienen `filtro` en el nombre, si se pasa) y devuelve el
+    diccionario que se guarda en JSON. `progreso(nombre, resultado)` se llama tras cada medición.
+    """
+    entorno = _Entorno(source_dir)
+    resultados = {}
+    try:
+        for nombre, (medicion, maximo) in MEDICIONES.items():
+            if filtro and filtro not in nombre:
+                continue
+            preparada = medicion(entorno)
+            if preparada is None:
+                continue
+            funcion, operaciones = preparada
+            tiempos = _time(funcion, min(repeticiones, maximo or repeticiones))
+            resultados[nombre] = {
+                "segundos": tiempos,
+                "minimo": min(tiempos),
+                "mediana": statistics.median(tiempos),
+                "operaciones": operaciones,
+            }
+            if progreso is not None:
+                progreso(nombre, resultados[nombre])
+    finally:
+        entorno.close()
+
+    return {
+        "formato": FORMATO_MEDIDAS,
+        "commit": _commit(source_dir),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.machine(),
+        "cpus": os.cpu_count(),
+        "repeticiones": repeticiones,
+        "resultados": resultados,
+    }
+
+
+def compare(anteriores, actuales, umbral=UMBRAL):
+    """
+    Compara dos resultados de run_benchmarks por la mediana de cada medición común.
+    Devuelve una lista de (nombre, mediana anterior, mediana actual, razón, es_regresión).
+    """
+    filas = []
+    for nombre, actual in actuales["resultados"].items():
+        anterior = anteriores["resultados"].get(nombre)
+        if anterior is None:
+            continue
+        razon = actual["mediana"] / anterior["mediana"] if anterior["mediana"] else float("inf")
+        regresion = razon > umbral and actual["mediana"] - anterior["mediana"] > RUIDO
+        filas.append((nombre, anterior["mediana"], actual["mediana"], razon, regresion))
+    return filas
+
+
+def _format_time(segundos):
+    return f"{segundos * 1000:10.3f} ms"
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m interlineal medir",
+                                     description="Mide los caminos críticos con los CSV incluidos, sin red.")
+    parser.add_argument("--salida", default=None, help="Archivo JSON donde guardar las mediciones.")
+    parser.add_argument("--comparar", default=None, metavar="JSON",
+                        help="Mediciones anteriores con las que comparar; termina con error si hay regresiones.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL,
+                        help=f"Razón de medianas a partir de la cual hay regresión (por defecto, {UMBRAL}).")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Repeticiones de cada medición (por defecto, 5).")
+    parser.add_argument("--filtro", default=None, help="Mide solo las mediciones cuyo nombre contiene este texto.")
+    parser.add_argument("--datos", default=DIRECTORIO_DATOS, help="Directorio con los CSV de los libros.")
+    args = parser.parse_args(argv)
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = json.load(f)
+
+    def progreso(nombre, resultado):
+        print(f"{nombre:40} {_format_time(resultado['mediana'])}  (mín. {_format_time(resultado['minimo']).strip()})",
+              file=sys.stderr, flush=True)
+
+    medidas = run_benchmarks(args.datos, args.repeticiones, args.filtro, progreso)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(medidas, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    if anteriores is None:
+        return 0
+    filas = compare(anteriores, medidas, args.umbral)
+    print(f"Comparación con {anteriores.get('commit') or args.comparar}:")
+    for nombre, antes, ahora, razon, regresion in filas:
+        marca = "  REGRESIÓN" if regresion else ""
+        print(f"{nombre:40} {_format_time(antes)} -> {_format_time(ahora)}  x{razon:.2f}{marca}")
+    return 1 if any(fila[4] for fila in filas) else 0
@@ -0,0 +1,110 @@
+"""
+Resultados de búsqueda perezosos y exportación en flujo.
+
+Una búsqueda devuelve primero solo los identificadores de los versículos encontrados, así que el
+total se conoce sin armar ninguna ocurrencia. Las ocurrencias se construyen por lotes al pedir una
+página o al recorrer los resultados, y las exportaciones (CSV, JSON) se generan fila por fila.
+"""
+
+import csv
+import io
+import json
+
+TAMANO_LOTE = 256
+
+
+class Occurrences:
+    """
+    Ocurrencias de una búsqueda, construidas bajo demanda.
+    `ids` son los identificadores de los versículos encontrados, en orden, y `build(lote)` arma la
+    lista de ocurrencias (diccionarios) de una lista de identificadores.
+    """
+
+    def __init__(self, ids, build):
+        self.ids = ids
+        self._build = build
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __bool__(self):
+        return bool(self.ids)
+
+    def __iter__(self):
+        for inicio in range(0, len(self.ids), TAMANO_LOTE):
+            yield from self._build(self.ids[inicio:inicio + TAMANO_LOTE])
+
+    def page_count(self, page_size):
+        """Número de páginas de `page_size` ocurrencias (al menos 1)."""
+        return max(1, -(-len(self.ids) // page_size))
+
+    def page(self, number, page_size):
+        """Ocurrencias de la página `number` (desde 1); solo se construyen las de esa página."""
+        inicio = (number - 1) * page_size
+        return self._build(self.ids[inicio:inicio + page_size])
+
+
+def iter_csv(rows, fields):
+    """Genera un CSV línea por línea con las columnas `fields` de cada diccionario de `rows`."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, lineterminator="\n", extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_json(rows, indent=2):
+    """Genera una lista JSON elemento por elemento (mismo resultado que json.dumps(list(rows), indent=indent))."""
+    margen = " " * indent
+    primero = True
+    for row in rows:
+        elemento = json.dumps(row, indent=indent).replace("\n", "\n" + margen)
+        yield ("[\n" if primero else ",\n") + margen + elemento
+        primero = False
+    yield "[]" if primero else "\n]"
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    Archivo de solo lectura que consume los fragmentos de texto de un generador a medida que se leen.
+    Solo admite seek(0) antes de la primera lectura, que es lo que hacen quienes lo leen entero.
+    """
+
+    def __init__(self, chunks, encoding):
+        self._chunks = iter(chunks)
+        self._encoding = encoding
+        self._pendiente = b""
+        self._leido = 0
+
+    def readable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if offset != 0 or whence != io.SEEK_SET or self._leido:
+            raise io.UnsupportedOperation("seek")
+        return 0
+
+    def tell(self):
+        return self._leido
+
+    def readinto(self, buffer):
+        while not self._pendiente:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pendiente = chunk.encode(self._encoding)
+        n = min(len(buffer), len(self._pendiente))
+        buffer[:n] = self._pendiente[:n]
+        self._pendiente = self._pendiente[n:]
+        self._leido += n
+        return n
+
+
+def stream_file(chunks, encoding="utf-8"):
+    """Envuelve un generador de texto en un archivo binario de lectura (por ejemplo, para una descarga)."""
+    return _ChunkReader(chunks, encoding)
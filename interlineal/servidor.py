@@ -0,0 +1,347 @@
+"""
+Servicio HTTP local con una API JSON para el lector y la búsqueda, sin Streamlit.
+
+    GET /libros                                           libros y sus capítulos
+    GET /capitulo?libro=Juan&capitulo=3                   versículos del capítulo, con el anterior y el siguiente
+    GET /versiculo?libro=Juan&capitulo=3&versiculo=16     un versículo, con sus palabras (ver tokens.py)
+    GET /buscar?q=amor&modo=palabra&libro=Juan&pagina=1   una página de ocurrencias (ver busqueda.py)
+    GET /buscar?q=λογ(ος|ον)&modo=regex                   ídem con una expresión regular (ver paralelo.py)
+    GET /buscar?q=gr:λογος NOT es:verbo&modo=consulta     ídem con una consulta (ver consulta.py)
+    GET /diccionario?palabra=λογος                        entrada, otras formas y apariciones en el griego
+    GET /metricas                                         métricas del proceso, en formato Prometheus
+
+Usa el mismo corpus binario y los mismos índices que las aplicaciones, compartidos por todos los
+hilos en un SharedStore que se actualiza cuando cambian los CSV o el vocabulario. Las respuestas
+dependen solo de esa versión de los datos, así que llevan un ETag derivado de ella y de la URL: si
+el cliente ya tiene la respuesta se contesta 304 sin armarla. Se comprimen con gzip si el cliente
+lo acepta, las conexiones se mantienen abiertas (HTTP/1.1) y los capítulos ya codificados se
+guardan en una caché LRU de cada versión de los datos, que se libera junto con ella.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from collections import namedtuple
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import metricas
+from .almacen import QueryCache, SharedStore, data_version, file_version
+from .archivo import ArchivoError
+from .busqueda import MODOS, search
+from .capitulos import ChapterIndex
+from .concordancia import load_concordance
+from .corpus import DIRECTORIO_DATOS, load_corpus
+from .diccionario import ARCHIVO_VOCABULARIO, load_dictionary
+from .indice import load_index
+from .paralelo import parallel_search
+from .subcadena import load_substring_index
+from .tokens import CAMPOS as CAMPOS_TOKENS, load_tokens
+
+# Por debajo de este tamaño comprimir no compensa
+MINIMO_GZIP = 512
+
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 500
+
+# Capítulos ya codificados que se guardan de cada versión de los datos
+CAPITULOS_EN_CACHE = 1024
+
+DatosApi = namedtuple("DatosApi",
+                      "version corpus index substring_index chapter_index tokens dictionary concordance paralelo "
+                      "capitulos")
+
+
+class ApiError(Exception):
+    """Error de la consulta, con el código HTTP de la respuesta."""
+
+    def __init__(self, status, mensaje, **extra):
+        super().__init__(mensaje)
+        self.status = status
+        self.extra = extra
+
+
+def load_api_data(source_dir=DIRECTORIO_DATOS, procesos=None):
+    """
+    Abre (o construye) el corpus, sus índices y tokens, el diccionario y la concordancia, y crea el
+    grupo de `procesos` procesos para las búsquedas sin índice (se cierra al liberar estos datos) y la
+    caché de los capítulos de esta versión.
+    """
+    corpus = load_corpus(source_dir=source_dir)
+    index = load_index(corpus)
+    substring_index = load_substring_index(corpus)
+    tokens = load_tokens(corpus)
+    try:
+        dictionary = load_dictionary(source=os.path.join(source_dir, ARCHIVO_VOCABULARIO))
+        concordance = load_concordance(corpus, index, dictionary)
+        version = f"{corpus.version}:{dictionary.version}"
+    except ArchivoError:
+        # Sin vocabulario la API funciona igual, salvo /diccionario
+        dictionary = concordance = None
+        version = corpus.version
+    return DatosApi(version, corpus, index, substring_index, ChapterIndex.from_corpus(corpus), tokens, dictionary,
+                    concordance, parallel_search(corpus.path, procesos, corpus.version),
+                    QueryCache(max_entries=CAPITULOS_EN_CACHE, name="capitulo_api"))
+
+
+def api_store(source_dir=DIRECTORIO_DATOS, check_interval=60.0, procesos=None):
+    """Datos de la API compartidos por todos los hilos, recargados cuando cambian los archivos."""
+    vocabulario = os.path.join(source_dir, ARCHIVO_VOCABULARIO)
+    return SharedStore(
+        lambda: load_api_data(source_dir, procesos),
+        version=lambda: (data_version(source_dir), file_version(vocabulario)),
+        check_interval=check_interval,
+        name="api",
+    )
+
+
+def _encode(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _verse(corpus, i):
+    return {
+        "libro": corpus.libro(i),
+        "capitulo": corpus.capitulos[i],
+        "versiculo": corpus.versiculos[i],
+        "texto_espanol": corpus.texto_espanol(i),
+        "texto_griego": corpus.texto_griego(i),
+    }
+
+
+def _chapter_ids(datos, libro, capitulo):
+    filas = datos.chapter_index.rows(libro, capitulo)
+    ids = range(len(datos.corpus))[filas] if isinstance(filas, slice) else filas
+    if not ids:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No existe el capítulo {libro} {capitulo}")
+    return ids
+
+
+def _chapter_payload(datos, libro, capitulo):
+    """
+    JSON del capítulo, sin comprimir y comprimido, guardado en la caché de esa versión de los datos
+    (los datos de una versión no cambian, y al liberarlos se libera también la caché).
+    """
+    def compute():
+        anterior, siguiente = datos.chapter_index.neighbours(libro, capitulo)
+        cuerpo = _encode({
+            "libro": libro,
+            "capitulo": capitulo,
+            "anterior": anterior,
+            "siguiente": siguiente,
+            "versiculos": [_verse(datos.corpus, i) for i in _chapter_ids(datos, libro, capitulo)],
+        })
+        return cuerpo, gzip.compress(cuerpo, 6)
+    return datos.capitulos.get((libro, capitulo), compute)
+
+
+def _param(params, nombre, tipo=str, default=None):
+    valores = params.get(nombre)
+    if not valores:
+        if default is None:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Falta el parámetro {nombre}")
+        return default
+    try:
+        return tipo(valores[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Valor no válido para {nombre}: {valores[0]}") from None
+
+
+def _book(datos, params):
+    libro = _param(params, "libro")
+    if libro not in datos.corpus.libros:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No existe el libro {libro}")
+    return libro
+
+
+def get_books(datos, params):
+    return {"libros": [
+        {"libro": libro, "capitulos": list(datos.chapter_index.chapters(libro))} for libro in datos.corpus.libros
+    ]}
+
+
+def _verse_words(datos, i):
+    """
+    Palabras del versículo en cada campo, con su forma normalizada y su posición en el texto; las
+    griegas, con la palabra del diccionario a la que remiten. Todo sale de arrays precalculados.
+    """
+    enlaces = {}
+    if datos.concordance is not None:
+        enlaces = {posicion: datos.dictionary.entry(entry_id)["palabra"]
+                   for posicion, entry_id in datos.concordance.verse_links(i)}
+
+    tokens = datos.tokens
+    palabras = {}
+    for campo in CAMPOS_TOKENS:
+        lista = []
+        for posicion, (form_id, (inicio, fin)) in enumerate(zip(tokens.tokens(campo, i), tokens.spans(campo, i))):
+            palabra = {"palabra": tokens.form(form_id), "normalizada": tokens.normalized(tokens.normalized_of(form_id)),
+                       "inicio": inicio, "fin": fin}
+            if campo == "texto_griego" and posicion in enlaces:
+                palabra["diccionario"] = enlaces[posicion]
+            lista.append(palabra)
+        palabras[campo] = lista
+    return palabras
+
+
+def get_verse(datos, params):
+    libro = _book(datos, params)
+    capitulo = _param(params, "capitulo", int)
+    versiculo = _param(params, "versiculo", int)
+    for i in _chapter_ids(datos, libro, capitulo):
+        if datos.corpus.versiculos[i] == versiculo:
+            return dict(_verse(datos.corpus, i), palabras=_verse_words(datos, i))
+    raise ApiError(HTTPStatus.NOT_FOUND, f"No existe el versículo {libro} {capitulo}:{versiculo}")
+
+
+def get_search(datos, params):
+    consulta = _param(params, "q")
+    modo = _param(params, "modo", default="secuencia")
+    if modo not in MODOS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Modo de búsqueda desconocido: {modo}")
+    libros = params.get("libro", [])
+    desconocidos = [libro for libro in libros if libro not in datos.corpus.libros]
+    if desconocidos:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No existe el libro {desconocidos[0]}")
+    tamano = min(max(_param(params, "tamano", int, TAMANO_PAGINA), 1), TAMANO_PAGINA_MAXIMO)
+
+    try:
+        ocurrencias = search(datos.corpus, consulta, modo, datos.index, datos.substring_index, libros,
+                             datos.paralelo)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from None
+    paginas = ocurrencias.page_count(tamano)
+    pagina = min(max(_param(params, "pagina", int, 1), 1), paginas)
+    return {
+        "consulta": consulta,
+        "modo": modo,
+        "total": len(ocurrencias),
+        "pagina": pagina,
+        "paginas": paginas,
+        "ocurrencias": ocurrencias.page(pagina, tamano),
+    }
+
+
+def get_dictionary(datos, params):
+    if datos.dictionary is None:
+        raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "El diccionario no está disponible")
+    palabra = _param(params, "palabra")
+    dictionary = datos.dictionary
+    entry_id = dictionary.entry_id(palabra)
+    if entry_id is None:
+        sugerencias = {}
+        for _, entry in dictionary.prefix(palabra, 8) + dictionary.fuzzy(palabra, 8):
+            sugerencias.setdefault(entry["palabra"], None)
+        raise ApiError(HTTPStatus.NOT_FOUND, f"La palabra {palabra} no está en el diccionario",
+                       sugerencias=list(sugerencias)[:8])
+
+    entry = dictionary.entry(entry_id)
+    verse_ids = datos.concordance.verses(entry_id)
+    por_libro = datos.concordance.book_counts(entry_id)
+    corpus = datos.corpus
+    return {
+        "entrada": entry,
+        "formas": dictionary.forms(palabra),
+        "apariciones": {
+            "total": sum(n for _, n in por_libro),
+            "versiculos": len(verse_ids),
+            "por_libro": dict(por_libro),
+            "referencias": [[corpus.libro(i), corpus.capitulos[i], corpus.versiculos[i]] for i in verse_ids],
+        },
+    }
+
+
+RUTAS = {
+    "/libros": get_books,
+    "/versiculo": get_verse,
+    "/buscar": get_search,
+    "/diccionario": get_dictionary,
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Atiende las consultas GET; `self.server.store` entrega los DatosApi actuales."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "interlineal"
+    # Las cabeceras y el cuerpo se escriben por separado: con Nagle, cada respuesta en una conexión
+    # que se mantiene abierta esperaría el ACK retrasado del cliente (unos 40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/metricas":
+            self._send(HTTPStatus.OK, metricas.export_text().encode("utf-8"), tipo=metricas.TIPO_CONTENIDO)
+            return
+        with metricas.span(f"api{url.path}" if url.path == "/capitulo" or url.path in RUTAS else "api"):
+            self._get(url)
+
+    def _get(self, url):
+        params = parse_qs(url.query)
+        try:
+            datos = self.server.store.get()
+            if datos is None:
+                raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Los datos no están disponibles")
+
+            etag = '"' + hashlib.blake2b(f"{datos.version}\x00{self.path}".encode("utf-8"),
+                                         digest_size=12).hexdigest() + '"'
+            if etag in self.headers.get("If-None-Match", ""):
+                self._send(HTTPStatus.NOT_MODIFIED, b"", etag=etag)
+                return
+
+            comprimido = None
+            if url.path == "/capitulo":
+                cuerpo, comprimido = _chapter_payload(datos, _book(datos, params), _param(params, "capitulo", int))
+            elif url.path in RUTAS:
+                cuerpo = _encode(RUTAS[url.path](datos, params))
+            else:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"Ruta desconocida: {url.path}")
+        except ApiError as e:
+            self._send(e.status, _encode({"error": str(e), **e.extra}))
+            return
+        self._send(HTTPStatus.OK, cuerpo, etag=etag, comprimido=comprimido)
+
+    def _send(self, status, cuerpo, etag=None, comprimido=None, tipo="application/json; charset=utf-8"):
+        acepta_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        if acepta_gzip and len(cuerpo) >= MINIMO_GZIP:
+            cuerpo = comprimido or gzip.compress(cuerpo, 6)
+        else:
+            acepta_gzip = False
+
+        self.send_response(status)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.send_header("Vary", "Accept-Encoding")
+        if etag is not None:
+            self.send_header("ETag", etag)
+            # Las respuestas se revalidan siempre: con el ETag, la revalidación cuesta un 304
+            self.send_header("Cache-Control", "no-cache")
+        if acepta_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """Servidor con un hilo por conexión que comparte un mismo almacén de datos."""
+
+    daemon_threads = True
+
+    def __init__(self, address, store, handler=ApiHandler):
+        super().__init__(address, handler)
+        self.store = store
+
+
+def serve(host="127.0.0.1", port=8000, source_dir=DIRECTORIO_DATOS, procesos=None):
+    """Carga los datos y atiende consultas hasta que se interrumpa el proceso."""
+    store = api_store(source_dir, procesos=procesos)
+    store.get()
+    with ApiServer((host, port), store) as server:
+        print(f"API en http://{host}:{server.server_address[1]}/", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,240 @@
+"""
+Índice de n-gramas para la búsqueda por secuencia de letras (subcadenas).
+
+Para cada campo se guardan todos los n-gramas de 1 a 3 caracteres del texto ya transformado
+(en minúsculas o normalizado) con la lista de versículos donde aparecen, y el propio texto
+transformado para verificar candidatos. Una consulta de hasta 3 caracteres se responde con una
+sola lista; una más larga intersecta las listas de sus trigramas y solo verifica esos versículos.
+El resultado es exactamente el mismo que `consulta in texto` sobre todo el corpus.
+Cuando cambia la versión del corpus solo se vuelven a indexar los libros que cambiaron.
+"""
+
+import array
+import os
+
+from .archivo import ArchivoError, SectionFile, write_sections
+from .corpus import CAMPOS_NORMALIZADOS
+from .incremental import copy_texts, merge_index, plan_update
+from .normalizacion import normalize_greek
+
+MAGIA = b"NTSUBCAD"
+FORMATO = 1
+ARCHIVO_SUBCADENAS = "subcadenas_nt.bin"
+
+N = 3
+
+# Campo del corpus -> transformación aplicada al texto y a la consulta.
+# "texto" es el versículo completo en minúsculas, como la búsqueda de lecturaybuscador73.py.
+CAMPOS = {
+    "texto": str.lower,
+    "texto_espanol": normalize_greek,
+    "texto_griego": normalize_greek,
+}
+
+
+def _ngrams(text):
+    """Conjunto de n-gramas de 1 a N caracteres de un texto."""
+    grams = set(text)
+    for n in range(2, N + 1):
+        grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+def _documents(corpus, campo, start=0, stop=None):
+    # Los campos normalizados ya vienen calculados en el corpus
+    if campo in CAMPOS_NORMALIZADOS:
+        return corpus.column(CAMPOS_NORMALIZADOS[campo], start, stop)
+    return [CAMPOS[campo](text) for text in corpus.column(campo, start, stop)]
+
+
+def _field_postings(documentos, tipo, start=0):
+    """Versículos de cada n-grama de los documentos, numerados desde `start`."""
+    postings = {}
+    for verse_id, documento in enumerate(documentos, start):
+        for gram in _ngrams(documento):
+            lista = postings.get(gram)
+            if lista is None:
+                lista = postings[gram] = array.array(tipo)
+            lista.append(verse_id)
+    return postings
+
+
+def _write_index(path, corpus, campos):
+    """`campos` da, para cada campo, sus n-gramas ordenados, offsets, apariciones y documentos."""
+    secciones = []
+    for campo in CAMPOS:
+        grams, offsets, datos, (doc_offsets, doc_blob) = campos[campo]
+        gram_offsets = array.array("I", [0])
+        gram_blob = bytearray()
+        for gram in grams:
+            gram_blob += gram.encode("utf-8")
+            gram_offsets.append(len(gram_blob))
+
+        secciones += [
+            (f"{campo}.ngramas", gram_blob),
+            (f"{campo}.ngramas.offsets", gram_offsets),
+            (f"{campo}.offsets", offsets),
+            (f"{campo}.postings", datos),
+            (f"{campo}.documentos", doc_blob),
+            (f"{campo}.documentos.offsets", doc_offsets),
+        ]
+
+    meta = {"version": corpus.version, "documentos": len(corpus), "libros": corpus.tabla_libros}
+    write_sections(path, MAGIA, FORMATO, meta, secciones)
+
+
+def _id_type(corpus):
+    # Mientras quepan, los identificadores de versículo se guardan en 16 bits
+    return "H" if len(corpus) <= 0xFFFF else "I"
+
+
+def build_substring_index(corpus, path):
+    """Construye el índice de n-gramas de `corpus` y lo escribe en `path`."""
+    tipo = _id_type(corpus)
+    campos = {}
+    for campo in CAMPOS:
+        documentos = _documents(corpus, campo)
+        postings = _field_postings(documentos, tipo)
+        grams = sorted(postings)
+        offsets = array.array("I", [0])
+        datos = array.array(tipo)
+        for gram in grams:
+            datos.extend(postings[gram])
+            offsets.append(len(datos))
+
+        doc_offsets = array.array("I", [0])
+        doc_blob = bytearray()
+        for documento in documentos:
+            doc_blob += documento.encode("utf-8")
+            doc_offsets.append(len(doc_blob))
+        campos[campo] = (grams, offsets, datos, (doc_offsets, doc_blob))
+
+    _write_index(path, corpus, campos)
+    return path
+
+
+def update_substring_index(index, corpus, path=None):
+    """
+    Actualiza `index`, construido para una versión anterior del corpus, volviendo a indexar solo
+    los libros que cambiaron; los n-gramas y documentos de los demás se copian del índice anterior.
+    """
+    path = path or index.path
+    tipo = _id_type(corpus)
+    tramos = plan_update(index.tabla_libros, corpus.tabla_libros)
+    secciones = index._archivo.secciones
+    campos = {}
+    for campo in CAMPOS:
+        nuevos = {}
+        documentos = {}
+        for i, tramo in enumerate(tramos):
+            if not tramo.copia:
+                documentos[i] = _documents(corpus, campo, tramo.inicio, tramo.fin)
+                for gram, lista in _field_postings(documentos[i], tipo, tramo.inicio).items():
+                    nuevos.setdefault(gram, {})[i] = lista
+        grams, offsets, datos = merge_index(index.grams(campo), secciones[f"{campo}.offsets"],
+                                            secciones[f"{campo}.postings"], tramos, nuevos, tipo)
+        textos = {i: [documento.encode("utf-8") for documento in lista] for i, lista in documentos.items()}
+        docs = copy_texts(secciones[f"{campo}.documentos.offsets"], secciones[f"{campo}.documentos"],
+                          tramos, textos)
+        campos[campo] = (grams, offsets, datos, docs)
+
+    _write_index(path, corpus, campos)
+    return path
+
+
+class SubstringIndex:
+    """Índice de n-gramas abierto con mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        self._archivo = SectionFile(path, MAGIA, FORMATO)
+        self.version = self._archivo.meta["version"]
+        self._n = self._archivo.meta["documentos"]
+        # Tabla de libros del corpus indexado, para las actualizaciones incrementales
+        self.tabla_libros = self._archivo.meta.get("libros")
+        self._gram_ids = {}
+        self._documentos = {}
+        secciones = self._archivo.secciones
+        for campo in CAMPOS:
+            blob = secciones[f"{campo}.ngramas"]
+            offsets = secciones[f"{campo}.ngramas.offsets"]
+            self._gram_ids[campo] = {
+                str(blob[offsets[i]:offsets[i + 1]], "utf-8"): i for i in range(len(offsets) - 1)
+            }
+
+    def __len__(self):
+        return self._n
+
+    def close(self):
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def grams(self, campo):
+        """N-gramas del campo, en orden."""
+        return list(self._gram_ids[campo])
+
+    def _postings(self, campo, gram):
+        gram_id = self._gram_ids[campo].get(gram)
+        if gram_id is None:
+            return ()
+        offsets = self._archivo.secciones[f"{campo}.offsets"]
+        return self._archivo.secciones[f"{campo}.postings"][offsets[gram_id]:offsets[gram_id + 1]]
+
+    def documents(self, campo):
+        """Textos transformados del campo, tal como se indexaron (se decodifican una sola vez)."""
+        documentos = self._documentos.get(campo)
+        if documentos is None:
+            blob = self._archivo.secciones[f"{campo}.documentos"]
+            offsets = self._archivo.secciones[f"{campo}.documentos.offsets"]
+            documentos = [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(self._n)]
+            self._documentos[campo] = documentos
+        return documentos
+
+    def estimate(self, campo, query):
+        """Cota del número de versículos que devolvería search(campo, query), sin verificar candidatos."""
+        q = CAMPOS[campo](query)
+        if not q:
+            return self._n
+        if len(q) <= N:
+            return len(self._postings(campo, q))
+        return min(len(self._postings(campo, q[i:i + N])) for i in range(len(q) - N + 1))
+
+    def search(self, campo, query):
+        """Versículos cuyo campo transformado contiene la consulta transformada, en orden."""
+        q = CAMPOS[campo](query)
+        if not q:
+            return list(range(self._n))
+        if len(q) <= N:
+            return list(self._postings(campo, q))
+
+        # Los candidatos salen del trigrama más selectivo; verificarlos cuesta menos que intersectar
+        candidatos = min((self._postings(campo, q[i:i + N]) for i in range(len(q) - N + 1)), key=len)
+        documentos = self.documents(campo)
+        return [i for i in candidatos if q in documentos[i]]
+
+
+def load_substring_index(corpus, path=None):
+    """
+    Abre el índice de n-gramas del corpus y lo reconstruye si falta; si es de otra versión del
+    corpus solo vuelve a indexar los libros que cambiaron.
+    """
+    path = path or os.path.join(os.path.dirname(corpus.path), ARCHIVO_SUBCADENAS)
+    try:
+        index = SubstringIndex(path)
+    except ArchivoError:
+        build_substring_index(corpus, path)
+        return SubstringIndex(path)
+
+    if index.version == corpus.version:
+        return index
+    with index:
+        if index.tabla_libros is None or index._archivo.secciones["texto.postings"].format != _id_type(corpus):
+            build_substring_index(corpus, path)
+        else:
+            update_substring_index(index, corpus, path)
+    return SubstringIndex(path)
@@ -0,0 +1,177 @@
+"""
+El corpus palabra por palabra: cada versículo como arrays de identificadores de palabras.
+
+Al construir el archivo se divide una sola vez cada texto en palabras y se guardan:
+
+    formas        las palabras tal como aparecen (con acentos y mayúsculas), sin repetir y ordenadas,
+                  compartidas por el español y el griego; cada una con el identificador de su forma
+                  normalizada (formas.normalizada)
+    normalizadas  las formas normalizadas, sin repetir y ordenadas (los mismos términos que el índice)
+    por campo     los identificadores de las formas de cada versículo (tokens, con offsets n + 1) y
+                  la posición de cada palabra en el texto del versículo (inicios)
+
+La posición de una palabra en su array es la misma que en el índice de palabras y en la
+concordancia, así que un versículo se recorre palabra por palabra (para mostrarlo, enlazar sus
+palabras con el diccionario o resaltar una búsqueda) sin volver a dividir ni normalizar su texto.
+El archivo ocupa una fracción de las columnas de texto del DataFrame y se abre con mmap.
+"""
+
+import array
+import os
+from bisect import bisect_left
+
+from .archivo import ArchivoError, SectionFile, write_sections
+from .normalizacion import normalize_greek, word_spans
+
+MAGIA = b"NTTOKENS"
+FORMATO = 1
+ARCHIVO_TOKENS = "tokens_nt.bin"
+
+CAMPOS = ("texto_espanol", "texto_griego")
+
+
+def _version(corpus):
+    return f"{FORMATO}:{corpus.version}"
+
+
+def _join(terms):
+    return "\n".join(terms).encode("utf-8")
+
+
+def _split(blob):
+    return str(blob, "utf-8").split("\n") if len(blob) else []
+
+
+def build_tokens(corpus, path):
+    """Divide en palabras los textos de `corpus` y escribe el archivo de tokens en `path`."""
+    formas = {}
+    campos = {}
+    for campo in CAMPOS:
+        offsets = array.array("I", [0])
+        tokens = array.array("I")
+        # Los versículos tienen menos de 65536 caracteres
+        inicios = array.array("H")
+        for texto in corpus.column(campo):
+            for inicio, forma in word_spans(texto):
+                form_id = formas.get(forma)
+                if form_id is None:
+                    form_id = formas[forma] = len(formas)
+                tokens.append(form_id)
+                inicios.append(inicio)
+            offsets.append(len(tokens))
+        campos[campo] = (offsets, tokens, inicios)
+
+    # Los identificadores provisionales (por orden de aparición) se cambian por los de la tabla ordenada
+    ordenadas = sorted(formas)
+    definitivo = array.array("I", bytes(4 * len(ordenadas)))
+    for form_id, forma in enumerate(ordenadas):
+        definitivo[formas[forma]] = form_id
+    normalizadas = sorted({normalize_greek(forma) for forma in ordenadas})
+    normalized_ids = {termino: i for i, termino in enumerate(normalizadas)}
+
+    secciones = [
+        ("formas", _join(ordenadas)),
+        ("formas.normalizada", array.array("I", (normalized_ids[normalize_greek(forma)] for forma in ordenadas))),
+        ("normalizadas", _join(normalizadas)),
+    ]
+    for campo in CAMPOS:
+        offsets, tokens, inicios = campos[campo]
+        secciones.append((f"{campo}.offsets", offsets))
+        secciones.append((f"{campo}.tokens", array.array("I", (definitivo[form_id] for form_id in tokens))))
+        secciones.append((f"{campo}.inicios", inicios))
+
+    meta = {"version": _version(corpus), "versiculos": len(corpus)}
+    write_sections(path, MAGIA, FORMATO, meta, secciones)
+    return path
+
+
+class Tokens:
+    """Archivo de tokens abierto con mmap; los arrays de cada versículo no se copian."""
+
+    def __init__(self, path):
+        self.path = path
+        self._archivo = SectionFile(path, MAGIA, FORMATO)
+        self.version = self._archivo.meta["version"]
+        self._n = self._archivo.meta["versiculos"]
+        secciones = self._archivo.secciones
+        self._formas = _split(secciones["formas"])
+        self._normalizadas = _split(secciones["normalizadas"])
+        self._forma_normalizada = secciones["formas.normalizada"]
+
+    def __len__(self):
+        return self._n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._archivo.close()
+
+    @property
+    def nbytes(self):
+        """Tamaño de los arrays y tablas del archivo, en bytes."""
+        return sum(seccion.nbytes for seccion in self._archivo.secciones.values())
+
+    def form(self, form_id):
+        """Palabra tal como aparece en el texto."""
+        return self._formas[form_id]
+
+    def normalized(self, normalized_id):
+        """Forma normalizada (sin acentos y en minúsculas)."""
+        return self._normalizadas[normalized_id]
+
+    def normalized_of(self, form_id):
+        """Identificador de la forma normalizada de una palabra."""
+        return self._forma_normalizada[form_id]
+
+    def normalized_id(self, term):
+        """Identificador de un término ya normalizado, o None si no aparece en el corpus."""
+        i = bisect_left(self._normalizadas, term)
+        return i if i < len(self._normalizadas) and self._normalizadas[i] == term else None
+
+    def _range(self, campo, verse_id):
+        offsets = self._archivo.secciones[f"{campo}.offsets"]
+        return offsets[verse_id], offsets[verse_id + 1]
+
+    def tokens(self, campo, verse_id):
+        """Identificadores de las palabras del versículo, en orden."""
+        inicio, fin = self._range(campo, verse_id)
+        return self._archivo.secciones[f"{campo}.tokens"][inicio:fin]
+
+    def words(self, campo, verse_id):
+        """Palabras del versículo tal como aparecen en el texto."""
+        return [self._formas[form_id] for form_id in self.tokens(campo, verse_id)]
+
+    def normalized_words(self, campo, verse_id):
+        """Palabras normalizadas del versículo (las mismas, en el mismo orden, que indexa el índice de palabras)."""
+        return [self._normalizadas[self._forma_normalizada[form_id]] for form_id in self.tokens(campo, verse_id)]
+
+    def spans(self, campo, verse_id):
+        """Posiciones (inicio, fin) de cada palabra en el texto del versículo, en caracteres."""
+        inicio, fin = self._range(campo, verse_id)
+        inicios = self._archivo.secciones[f"{campo}.inicios"][inicio:fin]
+        return [(i, i + len(self._formas[form_id])) for i, form_id in zip(inicios, self.tokens(campo, verse_id))]
+
+    def positions(self, campo, verse_id, normalized_ids):
+        """Posiciones de las palabras del versículo cuya forma normalizada está en `normalized_ids`."""
+        forma_normalizada = self._forma_normalizada
+        return [posicion for posicion, form_id in enumerate(self.tokens(campo, verse_id))
+                if forma_normalizada[form_id] in normalized_ids]
+
+
+def load_tokens(corpus, path=None):
+    """Abre el archivo de tokens del corpus y lo reconstruye si falta o si cambió el corpus."""
+    path = path or os.path.join(os.path.dirname(corpus.path), ARCHIVO_TOKENS)
+    try:
+        tokens = Tokens(path)
+        if tokens.version == _version(corpus):
+            return tokens
+        tokens.close()
+    except ArchivoError:
+        pass
+
+    build_tokens(corpus, path)
+    return Tokens(path)
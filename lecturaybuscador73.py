@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
-import requests
 import io
 import re
 
+from interlineal import ArchivoError, CorpusError, load_corpus, load_substring_index, metricas, split_series
+from interlineal.almacen import SharedStore, data_version
+from interlineal.capitulos import ChapterIndex
+from interlineal.columnas import load_dataframe
+from interlineal.descarga import book_fallbacks, fetch_all
+from interlineal.presentacion import chapter_html
+from interlineal.resultados import Occurrences, iter_csv, stream_file
+
 # Diccionario de libros y sus URL públicas
 # REEMPLAZA las URLs con las URL raw de tus archivos CSV en GitHub
 # NOTA: Se ha corregido la URL de Mateo para que sea consistente
@@ -37,80 +44,165 @@ BOOKS = {
     "Apocalipsis": "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/Apocalipsis.csv",
 }
 
-@st.cache_data(ttl=3600)
 def load_all_data():
-    """Carga y combina los datos de todos los libros en un solo DataFrame."""
+    """
+    Carga y combina los datos de todos los libros en un solo DataFrame. Devuelve (DataFrame, versión del
+    corpus del que sale), con versión None si se armó con los CSV descargados, o None si no hay datos.
+    """
+    # Primero se usa el corpus binario construido con los CSV incluidos (sin red ni análisis de CSV),
+    # con sus columnas de Arrow abiertas con mmap: los textos no se copian y los procesos comparten sus páginas
+    try:
+        with load_corpus() as corpus:
+            try:
+                return load_dataframe(corpus), corpus.version
+            except ImportError:
+                return corpus.to_dataframe(), corpus.version
+    except (CorpusError, OSError):
+        pass
+
+    # Sin corpus, se descargan todos los libros en paralelo (con caché local y la copia incluida como respaldo)
     all_dfs = []
-    for book_name, url in BOOKS.items():
+    for book_name, descarga in fetch_all(BOOKS, fallbacks=book_fallbacks()).items():
+        if descarga.contenido is None:
+            st.error(f"Error al cargar datos de {book_name}: {descarga.error}")
+            continue
+        if descarga.error is not None:
+            st.warning(f"No se pudo actualizar {book_name}; se usa una copia guardada.")
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            text_content = response.content.decode('utf-8')
-            df = pd.read_csv(io.StringIO(text_content), sep=',')
+            df = pd.read_csv(io.BytesIO(descarga.contenido), sep=',', encoding='utf-8')
             df['Libro'] = book_name  # Agrega la columna del libro para identificarlo
             all_dfs.append(df)
-        except requests.exceptions.RequestException as e:
-            st.error(f"Error al cargar datos de {book_name}: {e}")
-            return None
         except Exception as e:
             st.error(f"Ocurrió un error inesperado al procesar {book_name}: {e}")
-            return None
 
     if all_dfs:
         combined_df = pd.concat(all_dfs, ignore_index=True)
         # Convierte las columnas a tipos de datos correctos
         combined_df['Capítulo'] = pd.to_numeric(combined_df['Capítulo'], errors='coerce').fillna(0).astype(int)
         combined_df['Versículo'] = pd.to_numeric(combined_df['Versículo'], errors='coerce').fillna(0).astype(int)
-        return combined_df
+
+        # Separa el texto en español y griego una sola vez, para toda la columna
+        with metricas.span("division"):
+            combined_df[['texto_espanol', 'texto_griego']] = split_series(combined_df['Texto'])
+        return combined_df, None
     return None
 
-def parse_and_find_occurrences(df, search_term):
+def load_passages():
+    """Carga la base de datos combinada junto con su índice de capítulos y su versión (ver load_all_data)."""
+    datos = load_all_data()
+    if datos is None:
+        return None
+    combined_df, version = datos
+    return combined_df, ChapterIndex.from_frame(combined_df), version
+
+def update_passages(passages):
     """
-    Busca un término en los DataFrames.
+    Actualiza el corpus combinado: el archivo de columnas se reescribe a partir del corpus ya actualizado
+    (sin decodificar los textos); sin pyarrow se construyen de nuevo solo las filas de los libros que cambiaron.
     """
-    occurrences = []
-    
-    # Crea una máscara booleana para encontrar las coincidencias en español y griego
-    spanish_matches = df['Texto'].str.lower().str.contains(search_term.lower(), na=False, regex=False)
-    greek_matches = df['Texto'].str.contains(search_term.lower(), na=False, regex=False)
-    
-    # Combina las coincidencias de ambos idiomas
-    all_matches = df[spanish_matches | greek_matches]
-
-    for _, row in all_matches.iterrows():
-        full_text = str(row['Texto'])
-        verse_number = row['Versículo']
-
-        # Separa el texto en español y griego
-        spanish_text = ""
-        greek_text = ""
-        found_greek_start = False
-        for char in full_text:
-            if '\u0370' <= char <= '\u03FF' or '\u1F00' <= char <= '\u1FFF':
-                found_greek_start = True
-            
-            if not found_greek_start:
-                spanish_text += char
-            else:
-                greek_text += char
+    df = passages[0]
+    try:
+        with load_corpus() as corpus:
+            try:
+                df = load_dataframe(corpus)
+            except ImportError:
+                df = corpus.update_dataframe(df)
+            version = corpus.version
+    except (CorpusError, OSError):
+        return load_passages()
+    return df, ChapterIndex.from_frame(df), version
+
+@st.cache_resource
+def passages_store():
+    """Un solo corpus de solo lectura para todas las sesiones, recargado cuando cambian los CSV."""
+    return SharedStore(load_passages, version=data_version, update=update_passages, name="pasajes")
+
+@st.cache_data(show_spinner=False)
+def render_chapter(book_name, chapter, font_size, version, _chapter_verses):
+    """
+    Arma el HTML del capítulo una sola vez por (libro, capítulo, tamaño de fuente, versión de los datos).
+    Las filas (_chapter_verses) no forman parte de la clave; la versión sí, para que se vean las correcciones.
+    """
+    metricas.count_miss("capitulo")
+    return chapter_html(
+        zip(_chapter_verses['Versículo'], _chapter_verses['texto_espanol'], _chapter_verses['texto_griego']),
+        font_size,
+    )
+
+def load_substring_search():
+    """Abre (o construye) el índice de subcadenas del corpus."""
+    try:
+        with load_corpus() as corpus:
+            return load_substring_index(corpus)
+    except (ArchivoError, OSError):
+        return None
+
+@st.cache_resource
+def substring_index_store():
+    """El índice de subcadenas, compartido por todas las sesiones y recargado con el corpus."""
+    return SharedStore(load_substring_search, version=data_version, name="subcadenas")
+
+RESULTS_PER_PAGE = 50
+
+# Columnas del CSV de resultados, con sus nombres en español
+RESULTS_CSV_COLUMNS = {
+    'libro': 'libro',
+    'capitulo': 'capitulo',
+    'versiculo': 'versiculo',
+    'spanish_text': 'Texto en Español',
+    'greek_text': 'Texto en Griego',
+    'found_word': 'Palabra Encontrada',
+    'language': 'Idioma'
+}
 
+def build_occurrences(df, ids, search_term):
+    """Arma las ocurrencias de las filas `ids` del DataFrame."""
+    rows = df.loc[ids]
+    occurrences = []
+    for libro, capitulo, verse_number, spanish_text, greek_text in zip(
+            rows['Libro'], rows['Capítulo'].tolist(), rows['Versículo'].tolist(),
+            rows['texto_espanol'], rows['texto_griego']):
         # Determina si la coincidencia fue en español o griego
         language = "Español"
         if search_term.lower() in greek_text.lower():
             language = "Griego"
-        
+
         occurrences.append({
-            "libro": row['Libro'],
-            "capitulo": row['Capítulo'],
+            "libro": libro,
+            "capitulo": capitulo,
             "versiculo": verse_number,
-            "spanish_text": spanish_text.strip(),
-            "greek_text": greek_text.strip(),
+            "spanish_text": spanish_text,
+            "greek_text": greek_text,
             "found_word": search_term,
             "language": language
         })
-    
     return occurrences
 
+def iter_results_csv(occurrences):
+    """Genera el CSV de resultados fila por fila, con las columnas renombradas al español."""
+    renamed = ({RESULTS_CSV_COLUMNS[key]: value for key, value in occ.items()} for occ in occurrences)
+    return iter_csv(renamed, list(RESULTS_CSV_COLUMNS.values()))
+
+def parse_and_find_occurrences(df, search_term, index=None):
+    """
+    Busca un término en los DataFrames.
+    Si se pasa el índice de subcadenas se usa en lugar de recorrer todas las filas;
+    el resultado es el mismo que la búsqueda con str.contains.
+    Devuelve un Occurrences: el total se conoce enseguida y las ocurrencias se arman por páginas.
+    """
+    if index is not None:
+        verse_ids = index.search("texto", search_term)
+        matched_ids = df.index.intersection(verse_ids)
+    else:
+        # Crea una máscara booleana para encontrar las coincidencias en español y griego
+        spanish_matches = df['Texto'].str.lower().str.contains(search_term.lower(), na=False, regex=False)
+        greek_matches = df['Texto'].str.contains(search_term.lower(), na=False, regex=False)
+
+        # Combina las coincidencias de ambos idiomas
+        matched_ids = df.index[spanish_matches | greek_matches]
+
+    return Occurrences(matched_ids.tolist(), lambda ids: build_occurrences(df, ids, search_term))
+
 def main():
     """
     Función principal de la aplicación.
@@ -118,11 +210,13 @@ def main():
     st.title("Lector y Buscador Interlineal del NT. Reina-Valera Antigua y Westcott-Hort.")
     st.markdown("---")
 
-    combined_df = load_all_data()
+    # El corpus es el mismo para todas las sesiones; la sesión solo guarda sus selecciones
+    passages = passages_store().get()
 
-    if combined_df is None:
+    if passages is None:
         st.error("No se pudo cargar la base de datos completa. Por favor, verifica las URL y tu conexión a internet.")
         return
+    combined_df, chapter_index, corpus_version = passages
 
     # Modo de selección
     mode = st.radio(
@@ -163,31 +257,33 @@ def main():
             st.session_state.selected_book = selected_book
             # No es necesario un st.rerun() aquí, Streamlit lo hará por sí solo.
 
-        # Obtener la lista de capítulos para el libro seleccionado
-        book_chapters = sorted(combined_df[combined_df['Libro'] == st.session_state.selected_book]['Capítulo'].unique())
+        # Obtener la lista de capítulos para el libro seleccionado desde el índice
+        book_chapters = chapter_index.chapters(st.session_state.selected_book)
         
         # Asegurar que el capítulo seleccionado sea válido para el nuevo libro
-        if 'selected_chapter' not in st.session_state or st.session_state.selected_chapter not in book_chapters:
+        if ('selected_chapter' not in st.session_state or
+                chapter_index.position(st.session_state.selected_book, st.session_state.selected_chapter) is None):
             st.session_state.selected_chapter = book_chapters[0]
         
         # Botones de navegación de capítulos
-        current_chapter_index = book_chapters.index(st.session_state.selected_chapter)
+        current_chapter_index = chapter_index.position(st.session_state.selected_book, st.session_state.selected_chapter)
+        previous_chapter, next_chapter = chapter_index.neighbours(st.session_state.selected_book, st.session_state.selected_chapter)
         
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("Capítulo Anterior", disabled=(current_chapter_index == 0)):
-                st.session_state.selected_chapter = book_chapters[current_chapter_index - 1]
+            if st.button("Capítulo Anterior", disabled=(previous_chapter is None)):
+                st.session_state.selected_chapter = previous_chapter
                 st.rerun()
         with col2:
-            if st.button("Capítulo Siguiente", disabled=(current_chapter_index == len(book_chapters) - 1)):
-                st.session_state.selected_chapter = book_chapters[current_chapter_index + 1]
+            if st.button("Capítulo Siguiente", disabled=(next_chapter is None)):
+                st.session_state.selected_chapter = next_chapter
                 st.rerun()
 
         # Selectbox para el capítulo
         selected_chapter = st.selectbox(
             "Selecciona un capítulo:",
             book_chapters,
-            index=book_chapters.index(st.session_state.selected_chapter)
+            index=current_chapter_index
         )
         if selected_chapter != st.session_state.selected_chapter:
             st.session_state.selected_chapter = selected_chapter
@@ -196,32 +292,22 @@ def main():
         # Muestra los versículos
         st.markdown("---")
         st.subheader(f"{st.session_state.selected_book} {st.session_state.selected_chapter}")
-        chapter_verses = combined_df[(combined_df['Libro'] == st.session_state.selected_book) & (combined_df['Capítulo'] == st.session_state.selected_chapter)]
+        chapter_verses = combined_df.iloc[chapter_index.rows(st.session_state.selected_book, st.session_state.selected_chapter)]
 
         if not chapter_verses.empty:
-            for _, row in chapter_verses.iterrows():
-                full_text = str(row['Texto'])
-                verse_number = row['Versículo']
-                
-                spanish_text = ""
-                greek_text = ""
-                found_greek_start = False
-                for char in full_text:
-                    if '\u0370' <= char <= '\u03FF' or '\u1F00' <= char <= '\u1FFF':
-                        found_greek_start = True
-                    if not found_greek_start:
-                        spanish_text += char
-                    else:
-                        greek_text += char
-                
-                st.markdown(f"**Versículo {verse_number}**")
-                # Se muestra el texto en español siempre
-                st.markdown(f"<p style='font-size:{st.session_state.font_size}px;'>{spanish_text.strip()}</p>", unsafe_allow_html=True)
-
-                if found_greek_start:
-                    st.markdown(f"<p style='font-size:{st.session_state.font_size}px;'><i>{greek_text.strip()}</i></p>", unsafe_allow_html=True)
-                else:
-                    st.warning("Al parecer no hay texto griego en este versículo.")
+            # Todo el capítulo se envía como un solo bloque; el texto en español se muestra siempre
+            with metricas.span("presentacion"):
+                metricas.count_lookup("capitulo")
+                chapter_block, missing_greek = render_chapter(
+                    st.session_state.selected_book,
+                    st.session_state.selected_chapter,
+                    f"{st.session_state.font_size}px",
+                    passages_store().version,
+                    chapter_verses,
+                )
+                st.markdown(chapter_block, unsafe_allow_html=True)
+            if missing_greek:
+                st.warning(f"Al parecer no hay texto griego en los versículos {', '.join(map(str, missing_greek))}.")
         else:
             st.warning("No se encontraron versículos en este capítulo. Por favor, revisa tu selección.")
 
@@ -253,6 +339,7 @@ def main():
         if st.button("Buscar y analizar"):
             if not search_term:
                 st.warning("Por favor, ingresa una secuencia de letras a buscar.")
+                st.session_state.pop('search_request', None)
             else:
                 # Determinar qué libros buscar
                 selected_books_list = [book for book, is_selected in st.session_state.book_selection.items() if is_selected]
@@ -263,49 +350,61 @@ def main():
                 else:
                     books_to_search = selected_books_list
 
-                try:
+                # La búsqueda se guarda para que siga visible al cambiar de página
+                st.session_state.search_request = (search_term, books_to_search)
+
+        if 'search_request' in st.session_state:
+            search_term, books_to_search = st.session_state.search_request
+            try:
+                with metricas.span("busqueda"):
                     # Filtra el DataFrame completo según los libros seleccionados
                     filtered_df = combined_df[combined_df['Libro'].isin(books_to_search)]
-                    all_occurrences = parse_and_find_occurrences(filtered_df, search_term)
+                    # El índice se recarga por separado: solo se usa si es de la versión del DataFrame
+                    index = substring_index_store().get()
+                    if index is not None and index.version != corpus_version:
+                        index = None
+                    all_occurrences = parse_and_find_occurrences(filtered_df, search_term, index)
                     
-                    if not all_occurrences:
-                        st.warning(f"No se encontraron coincidencias que contengan '{search_term}' en los libros seleccionados.")
-                    else:
-                        st.subheader(f" {len(all_occurrences)} resultados encontrados que contienen '{search_term}':")
-                        
-                        # Crear un DataFrame para la descarga
-                        results_df = pd.DataFrame(all_occurrences)
-                        
-                        # Renombrar las columnas para que estén en español
-                        results_df = results_df.rename(columns={
-                            'spanish_text': 'Texto en Español',
-                            'greek_text': 'Texto en Griego',
-                            'found_word': 'Palabra Encontrada',
-                            'language': 'Idioma'
-                        })
-
-                        # Convertir el DataFrame a CSV para el botón de descarga
-                        csv_data = results_df.to_csv(index=False).encode('utf-8')
-                        
-                        # Mostrar el botón de descarga
-                        st.download_button(
-                            label="Descargar resultados en CSV",
-                            data=csv_data,
-                            file_name=f"resultados_{search_term}.csv",
-                            mime="text/csv",
+                if not all_occurrences:
+                    st.warning(f"No se encontraron coincidencias que contengan '{search_term}' en los libros seleccionados.")
+                else:
+                    st.subheader(f" {len(all_occurrences)} resultados encontrados que contienen '{search_term}':")
+
+                    # Mostrar el botón de descarga; el CSV se genera fila por fila al pulsarlo
+                    st.download_button(
+                        label="Descargar resultados en CSV",
+                        data=lambda: stream_file(iter_results_csv(all_occurrences)),
+                        file_name=f"resultados_{search_term}.csv",
+                        mime="text/csv",
+                    )
+
+                    # Solo se arman y muestran los resultados de la página elegida
+                    page_count = all_occurrences.page_count(RESULTS_PER_PAGE)
+                    page = 1
+                    if page_count > 1:
+                        page = st.number_input(
+                            f"Página (de {page_count})",
+                            min_value=1,
+                            max_value=page_count,
+                            value=1,
+                            key=f"pagina_{search_term}_{'|'.join(books_to_search)}"
                         )
 
-                        for occurrence in all_occurrences:
+                    with metricas.span("resultados"):
+                        for occurrence in all_occurrences.page(page, RESULTS_PER_PAGE):
                             st.markdown(f"**{occurrence['libro']} {occurrence['capitulo']}:{occurrence['versiculo']}**")
                             st.markdown(f"{occurrence['spanish_text']}")
                             st.markdown(f"_{occurrence['greek_text']}_")
                             st.markdown(f"**Coincidencia encontrada en {occurrence['language']}:** `{occurrence['found_word']}`")
                             st.markdown("---")
 
-                except Exception as e:
-                    st.error(f"Ocurrió un error al procesar el archivo: {e}")
+            except Exception as e:
+                st.error(f"Ocurrió un error al procesar el archivo: {e}")
 
 if __name__ == "__main__":
-    main()
+    # Tiempos por etapa y aciertos de las cachés; ver interlineal/metricas.py
+    metricas.configure()
+    with metricas.run("lecturaybuscador73"):
+        main()
 
 
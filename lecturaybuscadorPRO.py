@@ -1,10 +1,32 @@
 import streamlit as st
 import pandas as pd
-import requests
+import array
 import io
-import re
-import unicodedata
-import json
+import os
+from collections import namedtuple
+
+from interlineal import (
+    ArchivoError,
+    CorpusError,
+    load_corpus,
+    load_index,
+    load_substring_index,
+    metricas,
+    normalize_greek,
+    normalize_term,
+    split_series,
+)
+from interlineal.almacen import QueryCache, SharedStore, data_version, file_version
+from interlineal.busqueda import CAMPOS_CONCORDANCIA, find_verses, iter_concordance_txt, matcher
+from interlineal.capitulos import ChapterIndex
+from interlineal.columnas import load_dataframe
+from interlineal.concordancia import load_concordance
+from interlineal.consulta import compile_query, term_query
+from interlineal.descarga import book_fallbacks, fetch_all
+from interlineal.diccionario import load_dictionary
+from interlineal.paralelo import parallel_search
+from interlineal.presentacion import chapter_html, highlight_html
+from interlineal.resultados import Occurrences, iter_csv, iter_json, stream_file
 
 # URL de los archivos CSV individuales en GitHub para el texto de la Biblia
 BOOKS_URLS = {
@@ -37,8 +59,9 @@ BOOKS_URLS = {
     "Apocalipsis": "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/Apocalipsis.csv",
 }
 
-# URL del archivo JSON del diccionario
+# URL del archivo JSON del diccionario y su copia incluida en el repositorio
 DICTIONARY_URL = "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/vocabulario_nt.json"
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabulario_nt.json")
 
 
 # CSS personalizado para estilizar los botones de descarga
@@ -65,40 +88,36 @@ st.markdown("""
 
 
 # --- Funciones de Carga de Datos ---
-def _split_text(full_text):
+def load_all_data():
     """
-    Función auxiliar para dividir el texto en español y griego.
-    Utiliza una expresión regular para encontrar el punto de división.
+    Carga y combina los datos de todos los libros en un solo DataFrame. Devuelve (DataFrame, versión del
+    corpus del que sale), con versión None si se armó con los CSV descargados, o None si no hay datos.
     """
-    # Expresión regular para encontrar un espacio seguido de un carácter griego
-    match = re.search(r'\s(?=[α-ωΑ-Ω])', full_text)
-    if match:
-        split_index = match.start()
-        spanish_text = full_text[:split_index].strip()
-        greek_text = full_text[split_index:].strip()
-        return spanish_text, greek_text
-    return full_text, ""
-
-@st.cache_data(ttl=3600)
-def load_all_data():
-    """Carga y combina los datos de todos los libros en un solo DataFrame."""
+    # Primero se usa el corpus binario construido con los CSV incluidos (sin red ni análisis de CSV),
+    # con sus columnas de Arrow abiertas con mmap: los textos no se copian y los procesos comparten sus páginas
+    try:
+        with load_corpus() as corpus:
+            try:
+                return load_dataframe(corpus), corpus.version
+            except ImportError:
+                return corpus.to_dataframe(), corpus.version
+    except (CorpusError, OSError):
+        pass
+
+    # Sin corpus, se descargan todos los libros en paralelo (con caché local y la copia incluida como respaldo)
     all_dfs = []
-    for book_name, url in BOOKS_URLS.items():
+    for book_name, descarga in fetch_all(BOOKS_URLS, fallbacks=book_fallbacks()).items():
+        if descarga.contenido is None:
+            st.error(f"Error al cargar datos de {book_name}: {descarga.error}")
+            continue
+        if descarga.error is not None:
+            st.warning(f"No se pudo actualizar {book_name}; se usa una copia guardada.")
         try:
-            # Clave de la solución: Obtener el contenido binario y decodificar explícitamente con 'utf-8'.
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            text_content = response.content.decode('utf-8')
-            
-            df = pd.read_csv(io.StringIO(text_content), sep=',')
+            df = pd.read_csv(io.BytesIO(descarga.contenido), sep=',', encoding='utf-8')
             df['Libro'] = book_name
             all_dfs.append(df)
-        except requests.exceptions.RequestException as e:
-            st.error(f"Error al cargar datos de {book_name}: {e}")
-            return None
         except Exception as e:
             st.error(f"Ocurrió un error inesperado al procesar {book_name}: {e}")
-            return None
 
     if all_dfs:
         combined_df = pd.concat(all_dfs, ignore_index=True)
@@ -106,231 +125,474 @@ def load_all_data():
         combined_df['Versículo'] = pd.to_numeric(combined_df['Versículo'], errors='coerce').fillna(0).astype(int)
         combined_df = combined_df.fillna('')
         
-        # Aplicar la lógica de separación de texto
-        combined_df[['texto_espanol', 'texto_griego']] = combined_df['Texto'].apply(
-            lambda x: pd.Series(_split_text(x))
-        )
-        return combined_df
+        # Aplicar la lógica de separación de texto a toda la columna
+        with metricas.span("division"):
+            combined_df[['texto_espanol', 'texto_griego']] = split_series(combined_df['Texto'])
+
+        # Las formas normalizadas para la búsqueda se calculan una sola vez, al cargar los datos
+        combined_df['espanol_normalizado'] = combined_df['texto_espanol'].map(normalize_greek)
+        combined_df['griego_normalizado'] = combined_df['texto_griego'].map(normalize_greek)
+        return combined_df, None
     return None
 
-@st.cache_data(ttl=3600)
 def load_dictionary_data():
-    """Carga los datos del diccionario y los prepara para una búsqueda rápida."""
+    """
+    Carga los datos del diccionario y los prepara para una búsqueda rápida.
+    El JSON se convierte en el diccionario compacto (con formas flexionadas, lemas y búsqueda
+    aproximada), que solo se reconstruye cuando cambia su contenido.
+    """
     try:
-        response = requests.get(DICTIONARY_URL, timeout=10)
-        response.raise_for_status()
-        dictionary_list = response.json()
-        
-        # Crear un mapa para una búsqueda instantánea
-        dictionary_map = {}
-        for entry in dictionary_list:
-            word = entry.get("palabra", "")
-            if word:
-                normalized_word = normalize_greek(word)
-                dictionary_map[normalized_word] = entry
-        
-        return dictionary_map
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error al cargar datos del diccionario: {e}")
-        return None
+        descarga = fetch_all(
+            {"diccionario": DICTIONARY_URL},
+            fallbacks={"diccionario": DICTIONARY_PATH}
+        )["diccionario"]
+        if descarga.contenido is None:
+            st.error(f"Error al cargar datos del diccionario: {descarga.error}")
+            return None
+        return load_dictionary(descarga.contenido)
     except Exception as e:
         st.error(f"Ocurrió un error inesperado al procesar el diccionario: {e}")
         return None
 
+def load_passages():
+    """Carga el corpus combinado junto con su índice de capítulos y su versión (ver load_all_data)."""
+    datos = load_all_data()
+    if datos is None:
+        return None
+    df, version = datos
+    return df, ChapterIndex.from_frame(df), version
+
+def update_passages(passages):
+    """
+    Actualiza el corpus combinado: el archivo de columnas se reescribe a partir del corpus ya actualizado
+    (sin decodificar los textos); sin pyarrow se construyen de nuevo solo las filas de los libros que cambiaron.
+    """
+    df = passages[0]
+    try:
+        with load_corpus() as corpus:
+            try:
+                df = load_dataframe(corpus)
+            except ImportError:
+                df = corpus.update_dataframe(df)
+            version = corpus.version
+    except (CorpusError, OSError):
+        return load_passages()
+    return df, ChapterIndex.from_frame(df), version
+
+# Índices y grupo de procesos de una misma versión del corpus (None si no se pudo crear el grupo)
+DatosBusqueda = namedtuple("DatosBusqueda", "version index substring_index paralelo")
+
+def load_search_data():
+    """
+    Abre (o construye) el índice de palabras y el de subcadenas del corpus y crea el grupo de procesos
+    que reparte por libros las búsquedas con expresiones regulares, todos de la misma versión del corpus.
+    """
+    try:
+        with load_corpus() as corpus:
+            index = load_index(corpus)
+            substring_index = load_substring_index(corpus)
+            paralelo = parallel_search(corpus.path, PARALLEL_PROCESSES, corpus.version)
+            return DatosBusqueda(corpus.version, index, substring_index, paralelo)
+    except (ArchivoError, OSError):
+        return None
+
+def load_word_concordance():
+    """Abre (o construye) la concordancia entre las palabras griegas del corpus y el diccionario."""
+    dictionary = dictionary_store().get()
+    if dictionary is None:
+        return None
+    try:
+        with load_corpus() as corpus:
+            index = load_index(corpus)
+            try:
+                return load_concordance(corpus, index, dictionary)
+            finally:
+                index.close()
+    except (ArchivoError, OSError):
+        return None
+
+# Un solo almacén de cada tipo para todo el proceso: las sesiones comparten los mismos datos,
+# de solo lectura, y se recargan para todas cuando cambia la versión de los archivos.
+@st.cache_resource
+def passages_store():
+    return SharedStore(load_passages, version=data_version, update=update_passages, name="pasajes")
+
+@st.cache_resource
+def dictionary_store():
+    return SharedStore(load_dictionary_data, version=lambda: file_version(DICTIONARY_PATH), name="diccionario")
+
+@st.cache_resource
+def search_data_store():
+    return SharedStore(load_search_data, version=data_version, name="indices")
+
+@st.cache_resource
+def concordance_store():
+    return SharedStore(load_word_concordance, version=lambda: (data_version(), file_version(DICTIONARY_PATH)),
+                       name="concordancia")
+
+# Con una sola CPU las expresiones regulares se buscan en el mismo proceso, sin grupo de procesos
+PARALLEL_PROCESSES = os.cpu_count() or 1
+
+# Resultados de las búsquedas más repetidas, para todas las sesiones: como mucho 32 MB
+SEARCH_CACHE_BYTES = 32 * 2**20
+
+@st.cache_resource
+def search_cache():
+    return QueryCache(max_bytes=SEARCH_CACHE_BYTES, name="busquedas")
+
+@st.cache_data(show_spinner=False)
+def render_chapter(book_name, chapter, font_size, version, _chapter_verses):
+    """
+    Arma el HTML del capítulo una sola vez por (libro, capítulo, tamaño de fuente, versión de los datos).
+    Las filas (_chapter_verses) no forman parte de la clave; la versión sí, para que se vean las correcciones.
+    """
+    metricas.count_miss("capitulo")
+    chapter_block, _ = chapter_html(
+        zip(_chapter_verses['Versículo'], _chapter_verses['texto_espanol'], _chapter_verses['texto_griego']),
+        font_size,
+        layout="compacto",
+    )
+    return chapter_block
+
 # --- Funciones de Procesamiento y Búsqueda ---
-def normalize_greek(word):
+RESULTS_PER_PAGE = 50
+def build_occurrences(df, ids, query=None):
     """
-    Normaliza una palabra griega eliminando acentos y convirtiendo a minúsculas.
+    Arma las ocurrencias de las filas `ids` del DataFrame. Con `query` llevan además las
+    "Coincidencias" de cada texto, para resaltarlas (ver interlineal.busqueda.build_occurrences).
     """
-    # Descompone el string en su forma normalizada
-    normalized = unicodedata.normalize('NFD', word)
-    
-    # Filtra los caracteres que no son letras, números o espacios (incluyendo diacríticos)
-    stripped = ''.join(c for c in normalized if unicodedata.category(c) != 'Mn')
-    
-    # Convierte a minúsculas
-    return stripped.lower()
-
-def parse_and_find_occurrences(df, search_term):
+    rows = df.loc[ids]
+    ocurrencias = []
+    for libro, capitulo, versiculo, texto_espanol, texto_griego, espanol_normalizado, griego_normalizado in zip(
+            rows['Libro'], rows['Capítulo'].tolist(), rows['Versículo'].tolist(),
+            rows['texto_espanol'], rows['texto_griego'],
+            rows['espanol_normalizado'], rows['griego_normalizado']):
+        occ = {
+            'Libro': libro,
+            'Capítulo': capitulo,
+            'Versículo': versiculo,
+            'Texto_Español': texto_espanol.strip(),
+            'Texto_Griego': texto_griego.strip()
+        }
+        if query is not None:
+            normalizados = {'texto_espanol': espanol_normalizado, 'texto_griego': griego_normalizado}
+            textos = {'texto_espanol': occ['Texto_Español'], 'texto_griego': occ['Texto_Griego']}
+            fragmentos = query.highlights(normalizados.get, textos.get)
+            occ['Coincidencias'] = {'Texto_Español': fragmentos['texto_espanol'],
+                                    'Texto_Griego': fragmentos['texto_griego']}
+        ocurrencias.append(occ)
+    return ocurrencias
+
+def parse_and_find_occurrences(df, search_term, modo="secuencia", index=None, substring_index=None, executor=None,
+                               books=None):
     """
     Busca un término en los DataFrames, normalizando el texto de búsqueda y el
     texto de la Biblia para ignorar mayúsculas y acentos.
+    `modo` es "secuencia" (cualquier secuencia de letras), "palabra" (palabra completa)
+    o "prefijo" (comienzo de palabra), o "regex" (expresión regular, que se reparte por libros `books`
+    entre los procesos de `executor` si se pasa), o "consulta" (términos combinados con AND, OR, NOT,
+    frases y ámbitos; ver interlineal.consulta). Las búsquedas por palabra usan el índice de palabras
+    y las de secuencia el de subcadenas, si están disponibles (interlineal.busqueda).
+    Una expresión regular o una consulta no válida lanza ValueError.
+    Devuelve un Occurrences: el total se conoce enseguida y las ocurrencias se arman por páginas.
     """
-    occurrences = []
-    normalized_search_term = normalize_greek(search_term)
-
-    # Crea una máscara booleana para encontrar las coincidencias en español y griego
-    df['normalized_espanol'] = df['texto_espanol'].apply(normalize_greek)
-    df['normalized_griego'] = df['texto_griego'].apply(normalize_greek)
-    
-    all_matches = df[df['normalized_espanol'].str.contains(normalized_search_term, na=False, regex=False) |
-                     df['normalized_griego'].str.contains(normalized_search_term, na=False, regex=False)]
-    
-    for _, row in all_matches.iterrows():
-        occurrences.append({
-            'Libro': row['Libro'],
-            'Capítulo': row['Capítulo'],
-            'Versículo': row['Versículo'],
-            'Texto_Español': row['texto_espanol'].strip(),
-            'Texto_Griego': row['texto_griego'].strip()
-        })
-    return occurrences
-
-def search_word_in_dict(word, dictionary_data):
+    normalized_search_term = normalize_term(search_term)
+
+    if modo == "consulta":
+        # El plan verifica los candidatos con los textos del índice de subcadenas; sin él, fila por fila
+        if substring_index is not None:
+            matched_ids = df.index.intersection(
+                find_verses(search_term, modo, index, substring_index, executor=executor, books=books))
+        else:
+            query = compile_query(search_term)
+            matched_ids = df.index[[
+                query.matches({'texto_espanol': espanol, 'texto_griego': griego}.get)
+                for espanol, griego in zip(df['espanol_normalizado'], df['griego_normalizado'])
+            ]]
+    elif modo == "regex" and executor is not None:
+        matched_ids = df.index.intersection(find_verses(search_term, modo, executor=executor, books=books))
+    elif modo != "regex" and (index if modo != "secuencia" else substring_index) is not None:
+        matched_ids = df.index.intersection(find_verses(search_term, modo, index, substring_index))
+    else:
+        # Crea una máscara booleana sobre las columnas ya normalizadas al cargar los datos
+        normalized_espanol = df['espanol_normalizado']
+        normalized_griego = df['griego_normalizado']
+
+        if modo == "secuencia":
+            matched_ids = df.index[normalized_espanol.str.contains(normalized_search_term, na=False, regex=False) |
+                                   normalized_griego.str.contains(normalized_search_term, na=False, regex=False)]
+        else:
+            # Con el re de Python: en las columnas de texto de pandas, \b solo reconoce letras ASCII.
+            # Las palabras de un término se buscan seguidas aunque haya signos entre ellas, como en el índice
+            matches = matcher(search_term, modo)
+            matched_ids = df.index[normalized_espanol.map(matches) | normalized_griego.map(matches)]
+
+    return Occurrences(matched_ids.tolist(), lambda ids: build_occurrences(df, ids))
+
+def find_occurrences(df, search_term, modo, books, version):
     """
-    Busca una palabra en el diccionario y devuelve su información.
-    Utiliza el mapa de búsqueda instantánea.
+    parse_and_find_occurrences sobre los libros `books` (todos si está vacío), con los identificadores
+    encontrados guardados en la caché compartida por (término normalizado, modo, libros, versión):
+    repetir una búsqueda, también desde otra sesión, no vuelve a filtrar ni a buscar.
+    `version` es la del corpus del que sale `df` (ver load_all_data). Los índices y el grupo de procesos
+    se recargan por separado, así que solo se usan, y el resultado solo se guarda en la caché, si son de
+    esa misma versión; si no (por ejemplo, justo después de actualizar los CSV), se recorre el DataFrame.
+    Una expresión regular o una consulta no válida lanza ValueError (y no se guarda en la caché).
     """
-    normalized_search_term = normalize_greek(word)
-    return dictionary_data.get(normalized_search_term)
+    datos = search_data_store().get()
+    if datos is not None and datos.version != version:
+        datos = None
+
+    def compute():
+        df_for_search = df[df['Libro'].isin(books)] if books else df
+        occurrences = parse_and_find_occurrences(
+            df_for_search,
+            search_term,
+            modo=modo,
+            index=datos.index if datos is not None else None,
+            substring_index=datos.substring_index if datos is not None else None,
+            executor=datos.paralelo if datos is not None and modo in ("regex", "consulta") else None,
+            books=books
+        )
+        return array.array('I', occurrences.ids)
+
+    if datos is None:
+        matched_ids = compute()
+    else:
+        # En una expresión regular o una consulta las mayúsculas pueden cambiar el significado (\w y \W, AND y and)
+        key = (search_term if modo in ("regex", "consulta") else normalize_term(search_term), modo,
+               tuple(sorted(books)), version)
+        matched_ids = search_cache().get(key, compute)
+    # Las coincidencias se ubican solo en las páginas que se muestran
+    query = term_query(search_term, modo)
+    return Occurrences(matched_ids, lambda ids: build_occurrences(df, ids, query))
+
+def suggest_dict_words(word, dictionary_data, limit=8):
+    """Palabras del diccionario que empiezan como `word` o se le parecen, para cuando no está."""
+    suggestions = {}
+    for _, entry in dictionary_data.prefix(word, limit) + dictionary_data.fuzzy(word, limit):
+        suggestions.setdefault(entry['palabra'], None)
+    return list(suggestions)[:limit]
 
 
 # --- Contenido de la Aplicación ---
-st.title('Lector Interlineal español-griego del Nuevo Testamento.')
-st.markdown('***')
-st.markdown('Reina-Valera Antigua y Westcott-Hort.')
-
-# Cargar datos
-if 'df' not in st.session_state:
-    st.session_state.df = load_all_data()
-    st.session_state.dict_data = load_dictionary_data()
-
-# Lógica principal de la UI
-if st.session_state.df is not None and st.session_state.dict_data is not None:
-    # 1. Selección y lectura del pasaje
-    st.sidebar.header('Seleccionar pasaje')
-
-    # Selector para el tamaño de la fuente
-    font_size_option = st.sidebar.selectbox(
-        'Tamaño de la fuente',
-        ['Normal', 'Grande', 'Pequeña']
-    )
-
-    font_size_map = {
-        'Pequeña': '16px',
-        'Normal': '18px',
-        'Grande': '23px'
-    }
-
-    final_font_size = font_size_map[font_size_option]
+def main():
+    """
+    Función principal de la aplicación.
+    """
+    st.title('Lector Interlineal español-griego del Nuevo Testamento.')
+    st.markdown('***')
+    st.markdown('Reina-Valera Antigua y Westcott-Hort.')
 
-    selected_book = st.sidebar.selectbox(
-        'Libro',
-        st.session_state.df['Libro'].unique()
-    )
+    # Cargar datos: el corpus y el diccionario son los mismos para todas las sesiones
+    passages = passages_store().get()
+    dict_data = dictionary_store().get()
 
-    df_filtered_by_book = st.session_state.df[st.session_state.df['Libro'] == selected_book]
-    capitulos = sorted(df_filtered_by_book['Capítulo'].unique())
-    selected_chapter = st.sidebar.selectbox(
-        'Capítulo',
-        capitulos
-    )
+    # Lógica principal de la UI
+    if passages is not None and dict_data is not None:
+        df, chapter_index, corpus_version = passages
 
-    # Contenedor expandible para el texto del capítulo
-    with st.expander(f'{selected_book} {selected_chapter}', expanded=True):
-        df_filtered_by_chapter = df_filtered_by_book[df_filtered_by_book['Capítulo'] == selected_chapter]
+        # 1. Selección y lectura del pasaje
+        st.sidebar.header('Seleccionar pasaje')
 
-        for _, row in df_filtered_by_chapter.iterrows():
-            st.markdown(f'<span style="font-size:{final_font_size};">**{row["Versículo"]}** {row["texto_espanol"]}</span>', unsafe_allow_html=True)
-            st.markdown(f'<span style="font-family:serif;font-size:{final_font_size};font-style:italic;">{row["texto_griego"]}</span>', unsafe_allow_html=True)
+        # Selector para el tamaño de la fuente
+        font_size_option = st.sidebar.selectbox(
+            'Tamaño de la fuente',
+            ['Normal', 'Grande', 'Pequeña']
+        )
 
-    # La búsqueda por defecto es en todos los Libros.
-    st.markdown('---')
-    st.markdown('#### Búsqueda y concordancia (por defecto se hará en todos los Libros).')
+        font_size_map = {
+            'Pequeña': '16px',
+            'Normal': '18px',
+            'Grande': '23px'
+        }
 
-    # Se ingresa la palabra a buscar
-    search_term = st.text_input('Ingrese una palabra o secuencia de letras en español o griego')
-    st.write("") # Línea para espacio en blanco
+        final_font_size = font_size_map[font_size_option]
 
-    # Se muestra la etiqueta de color para el filtro
-    st.markdown(f'<span style="color:#0CA7CF;font-weight: bold;">Prefiero filtrar la búsqueda por libros:</span>', unsafe_allow_html=True)
+        selected_book = st.sidebar.selectbox(
+            'Libro',
+            chapter_index.libros
+        )
 
-    # Selector de libros para la búsqueda, con etiqueta vacía
-    all_books = st.session_state.df['Libro'].unique()
-    selected_search_books = st.multiselect(
-        "",  # Etiqueta vacía para no duplicar el texto
-        options=all_books,
-        default=[],
-        placeholder="Seleccionar libros..."
-    )
+        selected_chapter = st.sidebar.selectbox(
+            'Capítulo',
+            chapter_index.chapters(selected_book)
+        )
 
-    if search_term:
-        # Crea pestañas para la concordancia y el diccionario
-        tab1, tab2 = st.tabs(["Concordancia", "Diccionario"])
-
-        with tab1:
-            st.markdown('##### Ocurrencias en el texto')
-            # Si no se selecciona ningún libro, se busca en todos por defecto
-            if not selected_search_books:
-                df_for_search = st.session_state.df
-            else:
-                # Si se seleccionan libros, se filtra el DataFrame
-                df_for_search = st.session_state.df[st.session_state.df['Libro'].isin(selected_search_books)]
-
-            occurrences_list = parse_and_find_occurrences(df_for_search, search_term)
-
-            if occurrences_list:
-                st.info(f"Se encontraron {len(occurrences_list)} ocurrencias en total.")
-                for occ in occurrences_list:
-                    st.markdown(f"- **{occ['Libro']} {occ['Capítulo']}:{occ['Versículo']}**")
-                    st.markdown(f' > <span style="font-size:{final_font_size};">{occ["Texto_Español"]}</span>', unsafe_allow_html=True)
-                    st.markdown(f' > <span style="font-family:serif;font-size:{final_font_size};font-style:italic;">{occ["Texto_Griego"]}</span>', unsafe_allow_html=True)
-
-                txt_content = ""
-                for occ in occurrences_list:
-                    txt_content += f"{occ['Libro']} {occ['Capítulo']}:{occ['Versículo']}\n"
-                    txt_content += f"  {occ['Texto_Español']}\n"
-                    txt_content += f"  {occ['Texto_Griego']}\n\n"
-
-                st.download_button(
-                    label="Descargar resultados en TXT",
-                    data=txt_content.encode('utf-8'),
-                    file_name=f'concordancia_{search_term}.txt',
-                    mime='text/plain'
+        # Contenedor expandible para el texto del capítulo
+        with st.expander(f'{selected_book} {selected_chapter}', expanded=True):
+            df_filtered_by_chapter = df.iloc[chapter_index.rows(selected_book, selected_chapter)]
+            # Todo el capítulo se envía como un solo bloque HTML
+            with metricas.span("presentacion"):
+                metricas.count_lookup("capitulo")
+                st.markdown(
+                    render_chapter(selected_book, selected_chapter, final_font_size, passages_store().version,
+                                   df_filtered_by_chapter),
+                    unsafe_allow_html=True
                 )
 
-                json_data = json.dumps(occurrences_list, indent=2).encode('utf-8')
-                st.download_button(
-                    label="Descargar resultados en JSON",
-                    data=json_data,
-                    file_name=f'concordancia_{search_term}.json',
-                    mime='application/json'
-                )
+        # La búsqueda por defecto es en todos los Libros.
+        st.markdown('---')
+        st.markdown('#### Búsqueda y concordancia (por defecto se hará en todos los Libros).')
 
-                df_to_download = pd.DataFrame(occurrences_list)
-                csv_data = df_to_download.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Descargar resultados en CSV",
-                    data=csv_data,
-                    file_name=f'concordancia_{search_term}.csv',
-                    mime='text/csv'
-                )
-            else:
-                st.info("No se encontraron ocurrencias en el texto de los libros seleccionados.")
-
-        with tab2:
-            st.markdown('##### Información del diccionario')
-            dict_entry = search_word_in_dict(search_term, st.session_state.dict_data)
-            if dict_entry:
-                st.markdown(f'**Palabra:** {dict_entry.get("palabra", "No disponible")}')
-                st.markdown(f'**Transliteración:** {dict_entry.get("transliteracion", "No disponible")}')
-                st.markdown(f'**Traducción literal:** {dict_entry.get("traduccion_literal", "No disponible")}')
-                
-                analisis = dict_entry.get("analisis_gramatical", {})
-                st.markdown('**Análisis Morfológico:**')
-                
-                if isinstance(analisis, dict):
-                    formatted_analisis = ""
-                    for key, value in analisis.items():
-                        formatted_analisis += f"- **{key.capitalize()}:** {value}\n"
-                    st.markdown(formatted_analisis)
-                elif isinstance(analisis, str):
-                    st.markdown(analisis)
-                else:
-                    st.markdown('No disponible')
+        # Se ingresa la palabra a buscar
+        search_term = st.text_input('Ingrese una palabra o secuencia de letras en español o griego')
+        search_mode_option = st.radio(
+            'Tipo de búsqueda',
+            ['Secuencia de letras', 'Palabra completa', 'Comienzo de palabra', 'Expresión regular', 'Consulta'],
+            horizontal=True
+        )
+        search_mode_map = {
+            'Secuencia de letras': 'secuencia',
+            'Palabra completa': 'palabra',
+            'Comienzo de palabra': 'prefijo',
+            'Expresión regular': 'regex',
+            'Consulta': 'consulta'
+        }
+        if search_mode_option == 'Consulta':
+            st.caption('Combine términos con `AND`, `OR` y `NOT` (en mayúsculas) y paréntesis; `"hijo de david"` busca '
+                       'la frase, `λογ*` el comienzo de palabra, `*mor*` una secuencia y `/θε\\w+/` una expresión '
+                       'regular. Con `griego:` o `español:` delante, el término se busca solo en ese texto, y '
+                       '`λογος NEAR/3 θεου` busca las dos palabras a tres palabras o menos una de otra.')
+        st.write("") # Línea para espacio en blanco
+
+        # Se muestra la etiqueta de color para el filtro
+        st.markdown(f'<span style="color:#0CA7CF;font-weight: bold;">Prefiero filtrar la búsqueda por libros:</span>', unsafe_allow_html=True)
+
+        # Selector de libros para la búsqueda, con etiqueta vacía
+        all_books = chapter_index.libros
+        selected_search_books = st.multiselect(
+            "",  # Etiqueta vacía para no duplicar el texto
+            options=all_books,
+            default=[],
+            placeholder="Seleccionar libros..."
+        )
 
-            else:
-                st.warning("No hay información gramatical para esa palabra en este momento.")
+        if search_term:
+            # La entrada del diccionario (por su palabra o cualquiera de sus formas) se busca una sola vez;
+            # sus apariciones en el texto griego salen de la concordancia precalculada, sin recorrer el corpus
+            with metricas.span("diccionario"):
+                dict_entry_id = dict_data.entry_id(search_term)
+                dict_entry = dict_data.entry(dict_entry_id) if dict_entry_id is not None else None
+                word_concordance = concordance_store().get() if dict_entry_id is not None else None
+
+            # Crea pestañas para la concordancia y el diccionario
+            tab1, tab2 = st.tabs(["Concordancia", "Diccionario"])
+
+            with tab1:
+                st.markdown('##### Ocurrencias en el texto')
+                with metricas.span("busqueda"):
+                    # Si no se selecciona ningún libro, se busca en todos por defecto
+                    try:
+                        occurrences_list = find_occurrences(
+                            df,
+                            search_term,
+                            search_mode_map[search_mode_option],
+                            selected_search_books,
+                            corpus_version
+                        )
+                    except ValueError as e:
+                        st.error(str(e))
+                        occurrences_list = None
+
+                if occurrences_list:
+                    st.info(f"Se encontraron {len(occurrences_list)} ocurrencias en total.")
+
+                    # Solo se arman y muestran las ocurrencias de la página elegida
+                    page_count = occurrences_list.page_count(RESULTS_PER_PAGE)
+                    page = 1
+                    if page_count > 1:
+                        page = st.number_input(
+                            f'Página (de {page_count})',
+                            min_value=1,
+                            max_value=page_count,
+                            value=1,
+                            key=f"pagina_{search_term}_{search_mode_option}_{'|'.join(selected_search_books)}"
+                        )
+                    with metricas.span("resultados"):
+                        for occ in occurrences_list.page(page, RESULTS_PER_PAGE):
+                            st.markdown(f"- **{occ['Libro']} {occ['Capítulo']}:{occ['Versículo']}**")
+                            coincidencias = occ.get("Coincidencias", {})
+                            texto_espanol = highlight_html(occ["Texto_Español"], coincidencias.get("Texto_Español", ()))
+                            texto_griego = highlight_html(occ["Texto_Griego"], coincidencias.get("Texto_Griego", ()))
+                            st.markdown(f' > <span style="font-size:{final_font_size};">{texto_espanol}</span>', unsafe_allow_html=True)
+                            st.markdown(f' > <span style="font-family:serif;font-size:{final_font_size};font-style:italic;">{texto_griego}</span>', unsafe_allow_html=True)
+
+                    # Las descargas se generan fila por fila recién cuando se pulsa el botón
+                    st.download_button(
+                        label="Descargar resultados en TXT",
+                        data=lambda: stream_file(iter_concordance_txt(occurrences_list)),
+                        file_name=f'concordancia_{search_term}.txt',
+                        mime='text/plain'
+                    )
+
+                    st.download_button(
+                        label="Descargar resultados en JSON",
+                        data=lambda: stream_file(iter_json(occurrences_list)),
+                        file_name=f'concordancia_{search_term}.json',
+                        mime='application/json'
+                    )
+
+                    st.download_button(
+                        label="Descargar resultados en CSV",
+                        data=lambda: stream_file(iter_csv(occurrences_list, CAMPOS_CONCORDANCIA)),
+                        file_name=f'concordancia_{search_term}.csv',
+                        mime='text/csv'
+                    )
+                elif occurrences_list is not None:
+                    st.info("No se encontraron ocurrencias en el texto de los libros seleccionados.")
+
+            with tab2:
+                st.markdown('##### Información del diccionario')
+                if dict_entry:
+                    st.markdown(f'**Palabra:** {dict_entry.get("palabra", "No disponible")}')
+                    st.markdown(f'**Transliteración:** {dict_entry.get("transliteracion", "No disponible")}')
+                    st.markdown(f'**Traducción literal:** {dict_entry.get("traduccion_literal", "No disponible")}')
+
+                    # Las demás formas registradas del mismo lema
+                    other_forms = [form for form in dict_data.forms(search_term)
+                                   if normalize_term(form) != normalize_term(dict_entry['palabra'])]
+                    if other_forms:
+                        st.markdown(f'**Otras formas:** {", ".join(other_forms)}')
+                    
+                    analisis = dict_entry.get("analisis_gramatical", {})
+                    st.markdown('**Análisis Morfológico:**')
+                    
+                    if isinstance(analisis, dict):
+                        formatted_analisis = ""
+                        for key, value in analisis.items():
+                            formatted_analisis += f"- **{key.capitalize()}:** {value}\n"
+                        st.markdown(formatted_analisis)
+                    elif isinstance(analisis, str):
+                        st.markdown(analisis)
+                    else:
+                        st.markdown('No disponible')
+
+                    if word_concordance is not None:
+                        occurrences_by_book = word_concordance.book_counts(dict_entry_id)
+                        verse_ids = word_concordance.verses(dict_entry_id)
+                        total = sum(count for _, count in occurrences_by_book)
+                        st.markdown(f'**Apariciones en el texto griego:** {total} en {len(verse_ids)} versículos')
+                        if occurrences_by_book:
+                            st.markdown("\n".join(f"- {book}: {count}" for book, count in occurrences_by_book))
+                            references = df.loc[df.index.intersection(verse_ids)]
+                            st.markdown('**Referencias:** ' + ', '.join(
+                                f"{book} {chapter}:{verse}" for book, chapter, verse in zip(
+                                    references['Libro'], references['Capítulo'], references['Versículo']
+                                )
+                            ))
 
-else:
-    st.error("No se pudo cargar el DataFrame. Por favor, revisa la conexión a internet y el origen de datos.")
+                else:
+                    st.warning("No hay información gramatical para esa palabra en este momento.")
+                    suggestions = suggest_dict_words(search_term, dict_data)
+                    if suggestions:
+                        st.markdown(f'**Palabras parecidas en el diccionario:** {", ".join(suggestions)}')
+
+    else:
+        st.error("No se pudo cargar el DataFrame. Por favor, revisa la conexión a internet y el origen de datos.")
+
+if __name__ == "__main__":
+    # Tiempos por etapa y aciertos de las cachés; ver interlineal/metricas.py
+    metricas.configure()
+    with metricas.run("lecturaybuscadorPRO"):
+        main()
@@ -0,0 +1,49 @@
+"""
+Corpus pequeño para las pruebas: los primeros versículos de cada libro, copiados de los CSV incluidos
+a un directorio temporal, donde se construyen el corpus y sus índices sin tocar los del repositorio.
+"""
+
+import csv
+import itertools
+import os
+import tempfile
+
+from interlineal.corpus import DIRECTORIO_DATOS, load_corpus
+from interlineal.libros import LIBROS
+
+VERSICULOS_POR_LIBRO = 15
+
+
+def read_rows(source_dir, book_name):
+    """Filas del CSV de un libro, con la cabecera."""
+    with open(os.path.join(source_dir, LIBROS[book_name]), encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def write_rows(source_dir, book_name, filas):
+    with open(os.path.join(source_dir, LIBROS[book_name]), "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(filas)
+
+
+def copy_sources(destino, versiculos=VERSICULOS_POR_LIBRO):
+    """Copia a `destino` los primeros `versiculos` versículos del CSV de cada libro."""
+    for book_name in LIBROS:
+        filas = read_rows(DIRECTORIO_DATOS, book_name)
+        write_rows(destino, book_name, itertools.islice(filas, versiculos + 1))
+
+
+class CorpusTestCase:
+    """
+    Mezcla para unittest.TestCase: en setUpClass copia los CSV a un directorio temporal
+    (`cls.source_dir`) y abre su corpus en `cls.corpus`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directorio = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directorio.cleanup)
+        cls.source_dir = directorio.name
+        copy_sources(cls.source_dir)
+        cls.corpus = load_corpus(source_dir=cls.source_dir)
+        cls.addClassCleanup(cls.corpus.close)
@@ -0,0 +1,40 @@
+"""
+Pruebas de interlineal.almacen.SharedStore: recarga y liberación de los datos reemplazados.
+"""
+
+import gc
+import unittest
+import weakref
+
+from interlineal.almacen import SharedStore
+from interlineal.corpus import load_corpus
+
+
+class SharedStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        # Los datos reemplazados deben liberarse por conteo de referencias, sin el recolector de ciclos
+        gc.disable()
+        self.addCleanup(gc.enable)
+        self.version = 1
+        self.store = SharedStore(load_corpus, version=lambda: self.version, check_interval=0)
+
+    def test_same_version_keeps_data(self):
+        self.assertIs(self.store.get(), self.store.get())
+
+    def test_replaced_data_stays_usable_until_released(self):
+        anterior = self.store.get()
+        liberado = weakref.ref(anterior)
+        self.version = 2
+        nuevo = self.store.get()
+        self.assertIsNot(nuevo, anterior)
+        self.assertEqual(self.store.version, 2)
+
+        # Quien obtuvo los datos antes de la recarga los sigue leyendo
+        self.assertEqual(anterior.verse(0), nuevo.verse(0))
+        del anterior
+        self.assertIsNone(liberado())
+
+
+if __name__ == "__main__":
+    unittest.main()
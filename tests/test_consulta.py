@@ -0,0 +1,146 @@
+"""
+Pruebas de interlineal.consulta: el plan, con o sin índices, da los mismos versículos que evaluar
+la consulta en cada versículo del corpus.
+"""
+
+import unittest
+from unittest import mock
+
+from corpus_prueba import CorpusTestCase
+
+from interlineal import consulta
+from interlineal.busqueda import find_verses
+from interlineal.consulta import compile_query
+from interlineal.indice import load_index
+from interlineal.subcadena import load_substring_index
+
+CONSULTAS = (
+    "dios",
+    "dios AND hijo",
+    "dios hijo",
+    "jesucristo OR λογος",
+    "hijo NOT david",
+    "NOT de",
+    "engend*",
+    "*mor*",
+    r"/θε\w+ς/",
+    "gr:λογος",
+    "es:θεου",
+    "es:(dios OR luz) NOT vida",
+    "(luz OR vida) AND θεου",
+    "de AND NOT (el OR la)",
+    "and",
+)
+
+# Consultas válidas que no coinciden con ningún versículo del corpus de prueba
+VACIAS = ("es:θεου", "and")
+
+# Frases y NEAR/N; cada distancia límite se prueba también con una menos, que ya no coincide
+CONSULTAS_CERCA = (
+    '"hijo de david"',
+    '"en el principio"',
+    '"εν αρχη ην"',
+    '"no existe"',
+    "λογος NEAR/4 θεον",
+    "λογος NEAR/3 θεον",
+    "λογος NEAR θεον",
+    "luz NEAR/3 hombres",
+    "luz NEAR/2 hombres",
+    "dios NEAR/2 verbo",
+    "dios NEAR/1 verbo",
+    '"el verbo" NEAR/2 dios',
+    'es:("era dios" NEAR/5 verbo)',
+    "gr:(λογος NEAR/1 ην)",
+    "engend* NEAR/1 isaac",
+    "jesus NEAR/4 cristo NOT david",
+    '"hijo de david" OR λογος NEAR/4 θεον',
+)
+VACIAS_CERCA = ('"no existe"', "λογος NEAR/3 θεον", "luz NEAR/2 hombres", "dios NEAR/1 verbo")
+
+
+class QueryTest(CorpusTestCase, unittest.TestCase):
+
+    consultas = CONSULTAS
+    vacias = VACIAS
+    invalidas = ("(dios", "dios AND", "OR", "/(/")
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = load_index(cls.corpus)
+        cls.addClassCleanup(cls.index.close)
+        cls.substring_index = load_substring_index(cls.corpus)
+        cls.addClassCleanup(cls.substring_index.close)
+
+    def brute_force(self, texto):
+        query = compile_query(texto)
+        return [i for i in range(len(self.corpus))
+                if query.matches(lambda campo: self.corpus.normalized(campo, i))]
+
+    def assert_same_as_brute_force(self, **indices):
+        for texto in self.consultas:
+            with self.subTest(consulta=texto):
+                self.assertEqual(compile_query(texto).find(**indices), self.brute_force(texto))
+
+    def test_with_indexes(self):
+        self.assert_same_as_brute_force(index=self.index, substring_index=self.substring_index, corpus=self.corpus)
+
+    def test_without_indexes(self):
+        self.assert_same_as_brute_force(corpus=self.corpus)
+
+    def test_substring_index_only(self):
+        self.assert_same_as_brute_force(substring_index=self.substring_index)
+
+    def test_always_intersect_or_always_verify(self):
+        # VERIFICACION decide entre intersectar con el índice y verificar en el texto de los candidatos
+        for verificacion in (0, 10 ** 9):
+            with mock.patch.object(consulta, "VERIFICACION", verificacion):
+                self.assert_same_as_brute_force(index=self.index, substring_index=self.substring_index,
+                                                corpus=self.corpus)
+
+    def test_find_verses(self):
+        for texto in self.consultas:
+            with self.subTest(consulta=texto):
+                self.assertEqual(find_verses(texto, "consulta", self.index, self.substring_index, self.corpus),
+                                 self.brute_force(texto))
+
+    def test_finds_something(self):
+        # Que las comparaciones no pasen por estar todas vacías
+        for texto in self.consultas:
+            with self.subTest(consulta=texto):
+                self.assertEqual(bool(self.brute_force(texto)), texto not in self.vacias)
+
+    def test_invalid_query(self):
+        for texto in self.invalidas:
+            with self.subTest(consulta=texto):
+                with self.assertRaises(ValueError):
+                    compile_query(texto)
+
+
+class NearQueryTest(QueryTest):
+
+    consultas = CONSULTAS_CERCA
+    vacias = VACIAS_CERCA
+    invalidas = ("dios NEAR", "NEAR dios", '"hijo de', "dios NEAR/0 luz")
+
+    def highlights(self, query, i):
+        return query.highlights(lambda campo: self.corpus.normalized(campo, i),
+                                lambda campo: getattr(self.corpus, campo)(i))
+
+    def test_matches_are_highlighted(self):
+        for texto in self.consultas:
+            query = compile_query(texto)
+            for i in self.brute_force(texto):
+                with self.subTest(consulta=texto, versiculo=i):
+                    self.assertTrue(any(self.highlights(query, i).values()))
+
+    def test_phrase_is_one_fragment(self):
+        query = compile_query('"hijo de david"')
+        (i,) = self.brute_force(query.texto)
+        texto = self.corpus.texto_espanol(i)
+        fragmentos = self.highlights(query, i)["texto_espanol"]
+        self.assertEqual([texto[inicio:fin] for inicio, fin in fragmentos], ["hijo de David"])
+
+
+if __name__ == "__main__":
+    unittest.main()
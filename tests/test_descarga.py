@@ -0,0 +1,159 @@
+"""
+Pruebas de interlineal.descarga contra un servidor HTTP local (http.server), sin salir a la red.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import requests
+
+from interlineal import descarga
+from interlineal.descarga import fetch_all
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Responde según `server.respuestas` (ruta -> (estado, cuerpo, ETag)) y anota cada petición."""
+
+    def do_GET(self):
+        estado, cuerpo, etag = self.server.respuestas[self.path]
+        condicion = self.headers.get("If-None-Match")
+        self.server.peticiones.append((self.path, condicion))
+        if estado == 200 and etag is not None and condicion == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(estado)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _closed_port():
+    """Un puerto local en el que no escucha nadie."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FetchAllTest(unittest.TestCase):
+
+    def setUp(self):
+        entorno = mock.patch.dict(os.environ, {"NO_PROXY": "127.0.0.1", "no_proxy": "127.0.0.1"})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.cache_dir = os.path.join(directorio.name, "cache")
+        self.local = os.path.join(directorio.name, "Juan.csv")
+        with open(self.local, "wb") as f:
+            f.write(b"copia local")
+
+        self.server = HTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.respuestas = {"/Juan.csv": (200, b"version 1", '"v1"')}
+        self.server.peticiones = []
+        hilo = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        hilo.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/Juan.csv"
+
+    def fetch(self, url=None, cache_dir=None, fallback=None):
+        fallbacks = {"Juan": fallback} if fallback else None
+        return fetch_all({"Juan": url or self.url}, cache_dir=cache_dir or self.cache_dir,
+                         fallbacks=fallbacks, timeout=5)["Juan"]
+
+    def test_download_is_cached(self):
+        resultado = self.fetch()
+        self.assertEqual(resultado.contenido, b"version 1")
+        self.assertEqual(resultado.origen, "red")
+        self.assertIsNone(resultado.error)
+        self.assertTrue(os.listdir(self.cache_dir))
+
+    def test_not_modified_uses_cache(self):
+        self.fetch()
+        resultado = self.fetch()
+        self.assertEqual(resultado.contenido, b"version 1")
+        self.assertEqual(resultado.origen, "cache")
+        self.assertIsNone(resultado.error)
+        # La segunda petición se revalida con el ETag de la primera
+        self.assertEqual(self.server.peticiones, [("/Juan.csv", None), ("/Juan.csv", '"v1"')])
+
+    def test_changed_file_replaces_cache(self):
+        self.fetch()
+        self.server.respuestas["/Juan.csv"] = (200, b"version 2", '"v2"')
+        self.assertEqual(self.fetch().contenido, b"version 2")
+        self.assertEqual(self.fetch().origen, "cache")
+
+    def test_server_error_falls_back_to_cache(self):
+        self.fetch()
+        self.server.respuestas["/Juan.csv"] = (503, b"", None)
+        resultado = self.fetch(fallback=self.local)
+        self.assertEqual(resultado.contenido, b"version 1")
+        self.assertEqual(resultado.origen, "cache")
+        self.assertIsInstance(resultado.error, requests.exceptions.HTTPError)
+
+    def test_server_error_without_cache_uses_local_copy(self):
+        self.server.respuestas["/Juan.csv"] = (500, b"", None)
+        resultado = self.fetch(fallback=self.local)
+        self.assertEqual(resultado.contenido, b"copia local")
+        self.assertEqual(resultado.origen, "local")
+
+    def test_no_network_falls_back_to_cache(self):
+        self.fetch()
+        self.server.shutdown()
+        self.server.server_close()
+        resultado = self.fetch(fallback=self.local)
+        self.assertEqual(resultado.contenido, b"version 1")
+        self.assertEqual(resultado.origen, "cache")
+        self.assertIsInstance(resultado.error, requests.exceptions.ConnectionError)
+
+    def test_no_network_without_cache_uses_local_copy(self):
+        resultado = self.fetch(url=f"http://127.0.0.1:{_closed_port()}/Juan.csv", fallback=self.local)
+        self.assertEqual(resultado.contenido, b"copia local")
+        self.assertEqual(resultado.origen, "local")
+        self.assertIsInstance(resultado.error, requests.exceptions.ConnectionError)
+
+    def test_no_network_nor_copy(self):
+        resultado = self.fetch(url=f"http://127.0.0.1:{_closed_port()}/Juan.csv")
+        self.assertIsNone(resultado.contenido)
+        self.assertIsNotNone(resultado.error)
+
+    def test_unwritable_cache_still_returns_download(self):
+        # Un archivo en lugar del directorio de la caché: no se puede crear ni escribir
+        cache_dir = os.path.join(self.local, "cache")
+        resultado = self.fetch(cache_dir=cache_dir)
+        self.assertEqual(resultado.contenido, b"version 1")
+        self.assertEqual(resultado.origen, "red")
+
+    def test_cache_removed_after_revalidation_downloads_again(self):
+        self.fetch()
+        with mock.patch.object(descarga, "_read_file", side_effect=FileNotFoundError):
+            resultado = self.fetch()
+        self.assertEqual(resultado.contenido, b"version 1")
+        self.assertEqual(resultado.origen, "red")
+        self.assertEqual(self.server.peticiones[-2:], [("/Juan.csv", '"v1"'), ("/Juan.csv", None)])
+
+    def test_failed_book_does_not_stop_the_others(self):
+        self.server.respuestas["/Mateo.csv"] = (500, b"", None)
+        mateo = self.url.replace("Juan", "Mateo")
+        resultados = fetch_all({"Juan": self.url, "Mateo": mateo}, cache_dir=self.cache_dir, timeout=5)
+        self.assertEqual(list(resultados), ["Juan", "Mateo"])
+        self.assertEqual(resultados["Juan"].contenido, b"version 1")
+        self.assertIsNone(resultados["Mateo"].contenido)
+
+
+if __name__ == "__main__":
+    unittest.main()
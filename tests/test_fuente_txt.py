@@ -0,0 +1,60 @@
+"""
+Pruebas de interlineal.fuente_txt: lectura de nuevotestamentointerlineal.txt y comparación con los CSV.
+"""
+
+import os
+import tempfile
+import unittest
+
+from interlineal.corpus import DIRECTORIO_DATOS
+from interlineal.fuente_txt import ARCHIVO_TXT, compare_sources, read_interlinear_txt
+
+TEXTO = """Mateo 12
+
+46 Y estando él aún hablando a las gentes
+46 ετι αυτου λαλουντος τοις οχλοις
+
+
+47 Y le dijo uno: He aquí tu madre
+47 β
+
+
+48 Y respondiendo él al que le decía esto
+48 [
+
+
+49 Y extendiendo su mano hacia sus discípulos
+49
+"""
+
+
+class ReadInterlinearTxtTest(unittest.TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.path = os.path.join(directorio.name, ARCHIVO_TXT)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(TEXTO)
+
+    def test_omitted_verses_have_no_greek(self):
+        versiculos = {v.versiculo: v for v in read_interlinear_txt(self.path)}
+        self.assertEqual(sorted(versiculos), [46, 47, 48, 49])
+        self.assertEqual(versiculos[46].texto_griego, "ετι αυτου λαλουντος τοις οχλοις")
+        for numero in (47, 48, 49):
+            self.assertEqual(versiculos[numero].texto_griego, "")
+            self.assertEqual(versiculos[numero].texto, versiculos[numero].texto_espanol)
+
+
+class CompareSourcesTest(unittest.TestCase):
+
+    def test_omitted_verses_are_not_flagged(self):
+        diferencias = {(d.libro, d.capitulo, d.versiculo, d.campo)
+                       for d in compare_sources(os.path.join(DIRECTORIO_DATOS, ARCHIVO_TXT))}
+        # "β" en la línea griega del texto (Mateo) o en el CSV (Romanos)
+        for libro, capitulo, versiculo in (("Mateo", 12, 47), ("Mateo", 17, 21), ("Romanos", 16, 24)):
+            self.assertNotIn((libro, capitulo, versiculo, "texto_griego"), diferencias)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Pruebas de la reconstrucción incremental (incremental.py): después de corregir un libro, el corpus y
+sus índices actualizados son iguales a los que se construyen desde cero con los mismos CSV.
+"""
+
+import tempfile
+import unittest
+
+from corpus_prueba import copy_sources, read_rows, write_rows
+
+from interlineal.busqueda import CAMPOS
+from interlineal.corpus import CAMPOS_NORMALIZADOS, load_corpus
+from interlineal.indice import load_index
+from interlineal.libros import LIBROS
+from interlineal.subcadena import load_substring_index
+
+
+def _edit_book(source_dir, book_name):
+    """Cambia el texto de un versículo, quita otro y agrega uno al final del libro."""
+    filas = read_rows(source_dir, book_name)
+    filas[2][3] = filas[2][3].replace(" ", " corregido ", 1) + " λογος"
+    del filas[5]
+    filas.append([book_name, "1", "99", "Versículo agregado para la prueba. λογος καινος"])
+    write_rows(source_dir, book_name, filas)
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def open_all(self, source_dir):
+        corpus = load_corpus(source_dir=source_dir)
+        self.addCleanup(corpus.close)
+        index = load_index(corpus)
+        self.addCleanup(index.close)
+        substring_index = load_substring_index(corpus)
+        self.addCleanup(substring_index.close)
+        return corpus, index, substring_index
+
+    def rebuild(self, book_name):
+        """(incremental, completo): lo que dan las dos reconstrucciones después de corregir `book_name`."""
+        directorios = [tempfile.TemporaryDirectory() for _ in range(2)]
+        for directorio in directorios:
+            self.addCleanup(directorio.cleanup)
+        incremental_dir, completo_dir = (directorio.name for directorio in directorios)
+
+        copy_sources(incremental_dir)
+        anterior, _, _ = self.open_all(incremental_dir)
+        _edit_book(incremental_dir, book_name)
+        copy_sources(completo_dir)
+        _edit_book(completo_dir, book_name)
+
+        incremental = self.open_all(incremental_dir)
+        self.assertNotEqual(incremental[0].version, anterior.version)
+        return incremental, self.open_all(completo_dir)
+
+    def assert_same(self, incremental, completo):
+        corpus, index, substring_index = incremental
+        corpus_completo, index_completo, substring_completo = completo
+
+        self.assertEqual(corpus.version, corpus_completo.version)
+        self.assertEqual(corpus.tabla_libros, corpus_completo.tabla_libros)
+        self.assertEqual(list(corpus), list(corpus_completo))
+        for campo in CAMPOS_NORMALIZADOS.values():
+            self.assertEqual(corpus.column(campo), corpus_completo.column(campo))
+
+        self.assertEqual(index.version, corpus.version)
+        self.assertEqual(substring_index.version, corpus.version)
+        for campo in CAMPOS:
+            self.assertEqual(index.terms(campo), index_completo.terms(campo))
+            for term in index.terms(campo):
+                self.assertEqual(list(index.postings(campo, term)), list(index_completo.postings(campo, term)), term)
+
+            self.assertEqual(substring_index.grams(campo), substring_completo.grams(campo))
+            self.assertEqual(substring_index.documents(campo), substring_completo.documents(campo))
+            for gram in substring_index.grams(campo):
+                self.assertEqual(substring_index.search(campo, gram), substring_completo.search(campo, gram), gram)
+
+    def test_edit_middle_book(self):
+        self.assert_same(*self.rebuild("Romanos"))
+
+    def test_edit_first_book(self):
+        self.assert_same(*self.rebuild(next(iter(LIBROS))))
+
+    def test_edit_last_book(self):
+        self.assert_same(*self.rebuild(list(LIBROS)[-1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
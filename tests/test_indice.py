@@ -0,0 +1,47 @@
+"""
+Pruebas de interlineal.indice: el índice de palabras da los mismos versículos que recorrer el corpus.
+"""
+
+import unittest
+
+from corpus_prueba import CorpusTestCase
+
+from interlineal.busqueda import find_verses, scan
+from interlineal.indice import load_index
+
+PALABRAS = ("dios", "Dios", "de", "θεου", "λογος", "λόγος", "jesucristo", "hijo de david", "en el principio",
+            "εν αρχη ην", "hijo, de david", "no existe", "", "...")
+PREFIJOS = ("engend", "θε", "jesu", "hijo de dav", "εν αρ", "z", "")
+
+
+class TokenIndexTest(CorpusTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = load_index(cls.corpus)
+        cls.addClassCleanup(cls.index.close)
+
+    def test_version(self):
+        self.assertEqual(self.index.version, self.corpus.version)
+
+    def assert_same_as_scan(self, modo, terms):
+        for term in terms:
+            with self.subTest(term=term):
+                esperados = scan(self.corpus, term, modo)
+                self.assertEqual(find_verses(term, modo, index=self.index), esperados)
+
+    def test_word_matches_scan(self):
+        self.assert_same_as_scan("palabra", PALABRAS)
+
+    def test_prefix_matches_scan(self):
+        self.assert_same_as_scan("prefijo", PREFIJOS)
+
+    def test_finds_something(self):
+        # Que las comparaciones no pasen por estar todas vacías
+        for term in ("dios", "θεου", "hijo de david"):
+            self.assertTrue(self.index.find(term), term)
+
+
+if __name__ == "__main__":
+    unittest.main()
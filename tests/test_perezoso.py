@@ -0,0 +1,52 @@
+"""
+Pruebas de interlineal.perezoso.books_store: cuándo se reemplazan los libros compartidos.
+"""
+
+import tempfile
+import unittest
+from unittest import mock
+
+from interlineal.corpus import DIRECTORIO_DATOS
+from interlineal.libros import LIBROS
+from interlineal.perezoso import books_store
+
+URLS = {book_name: f"http://127.0.0.1:9/{book_name}.csv" for book_name in LIBROS}
+HORA = 3600
+
+
+class BooksStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ahora = 1000.0
+        reloj = mock.patch("time.monotonic", side_effect=lambda: self.ahora)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+
+    def store(self, source_dir):
+        return books_store(URLS, source_dir, prefetch=0, reload_every=HORA)
+
+    def test_local_corpus_is_kept(self):
+        store = self.store(DIRECTORIO_DATOS)
+        books = store.get()
+        self.assertFalse(books.descargados)
+        for _ in range(3):
+            self.ahora += HORA
+            self.assertIs(store.get(), books)
+
+    def test_downloaded_books_are_renewed_every_period(self):
+        with tempfile.TemporaryDirectory() as source_dir:
+            store = self.store(source_dir)
+            books = store.get()
+            self.assertTrue(books.descargados)
+            self.ahora += 60
+            self.assertIs(store.get(), books)
+
+            self.ahora += HORA
+            renovados = store.get()
+            self.assertIsNot(renovados, books)
+            self.ahora += 60
+            self.assertIs(store.get(), renovados)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Pruebas de interlineal.subcadena: el índice de n-gramas da los mismos versículos que recorrer el corpus.
+"""
+
+import unittest
+
+from corpus_prueba import CorpusTestCase
+
+from interlineal.busqueda import CAMPOS, find_verses, scan
+from interlineal.subcadena import load_substring_index
+
+# Más cortas, iguales y más largas que un n-grama, con acentos, mayúsculas y espacios
+SECUENCIAS = ("a", "ος", "mor", "ΘΕΟΥ", "dió", "de d", "hijo de david", "ην ο λογος", "engendró a",
+              "no existe", " ", "")
+
+
+class SubstringIndexTest(CorpusTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = load_substring_index(cls.corpus)
+        cls.addClassCleanup(cls.index.close)
+
+    def test_version(self):
+        self.assertEqual(self.index.version, self.corpus.version)
+
+    def test_sequence_matches_scan(self):
+        for term in SECUENCIAS:
+            with self.subTest(term=term):
+                esperados = scan(self.corpus, term, "secuencia")
+                self.assertEqual(find_verses(term, "secuencia", substring_index=self.index), esperados)
+
+    def test_each_field_matches_scan(self):
+        for campo in CAMPOS:
+            for term in SECUENCIAS:
+                with self.subTest(campo=campo, term=term):
+                    esperados = scan(self.corpus, term, "secuencia", campos=(campo,))
+                    self.assertEqual(self.index.search(campo, term), esperados)
+
+    def test_estimate_bounds_results(self):
+        for campo in CAMPOS:
+            for term in SECUENCIAS:
+                with self.subTest(campo=campo, term=term):
+                    self.assertGreaterEqual(self.index.estimate(campo, term), len(self.index.search(campo, term)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,35 +1,22 @@
 import streamlit as st
-import pandas as pd
-import requests
-import io
 
-@st.cache_data(ttl=3600)
-def load_data_from_url(url):
+from interlineal.perezoso import LibroError, books_store
+
+@st.cache_resource
+def reader_store(books):
     """
-    Función para cargar los datos de un archivo CSV desde una URL pública de GitHub.
+    Los libros para todas las sesiones (ver interlineal.perezoso.books_store): cada libro se lee la primera
+    vez que se abre, desde el corpus local o desde su URL, y los libros vecinos se precargan en segundo plano.
+    Cuando cambian los CSV se reemplazan por otros que se vuelven a leer.
     """
+    return books_store(books)
+
+def get_book(books, book_name):
+    """(DataFrame, índice de capítulos) del libro, o None si no se pudo cargar (el motivo se muestra en la página)."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Lanza una excepción para errores HTTP
-
-        # Usa pandas para leer el archivo CSV directamente desde el contenido
-        text_content = response.content.decode('utf-8')
-        df = pd.read_csv(io.StringIO(text_content), sep=',')
-        
-        # Convierte las columnas a tipos de datos correctos
-        df['Capítulo'] = pd.to_numeric(df['Capítulo'], errors='coerce').fillna(0).astype(int)
-        df['Versículo'] = pd.to_numeric(df['Versículo'], errors='coerce').fillna(0).astype(int)
-
-        if df.empty:
-            st.error("Error: El archivo de texto está vacío o tiene un formato incorrecto.")
-            return None
-        return df
-
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error al cargar datos desde la URL: {e}")
-        return None
-    except Exception as e:
-        st.error(f"Ocurrió un error inesperado al procesar el archivo: {e}. Por favor, verifica el formato.")
+        return books[book_name]
+    except LibroError as e:
+        st.error(str(e))
         return None
 
 def main():
@@ -72,24 +59,26 @@ def main():
         "Apocalipsis": "https://raw.githubusercontent.com/consupalabrahoy-cloud/unoaunointerlineal/main/Apocalipsis - Apocalipsis.csv",
     }
 
-    # Carga todos los datos de los libros
-    all_books_data = {}
-    for book_name, url in BOOKS.items():
-        all_books_data[book_name] = load_data_from_url(url)
-    
-    # Maneja el caso en que la carga falle
-    if not all_books_data or any(data is None for data in all_books_data.values()):
-        return
+    # Los libros se cargan bajo demanda: solo se lee el libro que se abre (y sus vecinos, en segundo plano)
+    books = reader_store(BOOKS).get()
 
     # Widgets para la selección de Libro, Capítulo y Versículo
     selected_book = st.selectbox("Selecciona un libro:", list(BOOKS.keys()))
     
     # Filtra los capítulos y versículos disponibles para el libro seleccionado
-    df = all_books_data[selected_book]
-    chapters = sorted(df['Capítulo'].unique())
+    book_data = get_book(books, selected_book)
+
+    # Maneja el caso en que la carga falle
+    if book_data is None:
+        st.error("No se pudo cargar el libro seleccionado. Por favor, inténtalo de nuevo.")
+        return
+    df, chapter_index = book_data
+    chapters = chapter_index.chapters(selected_book)
     selected_chapter = st.selectbox("Selecciona un capítulo:", chapters)
 
-    verses = sorted(df[df['Capítulo'] == selected_chapter]['Versículo'].unique())
+    # Las filas del capítulo se obtienen del índice, sin filtrar todo el libro
+    chapter_df = df.iloc[chapter_index.rows(selected_book, selected_chapter)]
+    verses = sorted(chapter_df['Versículo'].unique())
     selected_verse = st.selectbox("Selecciona un versículo:", verses)
 
     # Muestra el texto cuando el usuario ha seleccionado todo
@@ -98,26 +87,15 @@ def main():
         st.subheader(f"{selected_book} {selected_chapter}:{selected_verse}")
 
         # Filtra la fila correcta
-        result = df[(df['Capítulo'] == selected_chapter) & (df['Versículo'] == selected_verse)]
+        result = chapter_df[chapter_df['Versículo'] == selected_verse]
 
         if not result.empty:
-            full_text = str(result.iloc[0]['Texto'])
-
-            spanish_text = ""
-            greek_text = ""
-            found_greek_start = False
-            for char in full_text:
-                if '\u0370' <= char <= '\u03FF' or '\u1F00' <= char <= '\u1FFF':
-                    found_greek_start = True
-                
-                if not found_greek_start:
-                    spanish_text += char
-                else:
-                    greek_text += char
-            
-            if found_greek_start:
-                st.write(spanish_text.strip())
-                st.write(greek_text.strip())
+            spanish_text = result.iloc[0]['texto_espanol']
+            greek_text = result.iloc[0]['texto_griego']
+
+            if greek_text:
+                st.write(spanish_text)
+                st.write(greek_text)
             else:
                 st.warning("No se pudo separar el texto en español y griego. Verifica el formato del archivo.")
         else: